@@ -2,49 +2,637 @@
 
 import openpyxl
 from openpyxl.styles import PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import from_excel, WINDOWS_EPOCH, CALENDAR_MAC_1904
+from openpyxl.xml.functions import fromstring
 import subprocess
 import os
+import re
+import csv
+import json
+import pickle
+import sqlite3
+import tempfile
+import shutil
+import queue
+import zipfile
+import ctypes
+import ctypes.util
+import select
+import socket
+import socketserver
+import http.server
+import struct
+import codecs
+from array import array
+import heapq
+import abc
+import hashlib
+import secrets
+import stat
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
 import threading
-from typing import List, Dict, Any, Optional, Callable
+import time
+import datetime
+import sys
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlsplit, parse_qs
+from collections import deque, OrderedDict, Counter
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator, Tuple
 
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo de archivos entre instancias
+    fcntl = None
 
-class ExcelHandler:
-    """Maneja todas las operaciones relacionadas con archivos Excel"""
+
+# Índices de columnas dentro de 'data' ('Link', 'Formato', 'Duration', 'Size', 'File', 'Text')
+COL_LINK = 0
+COL_DURATION = 2
+COL_SIZE = 3
+COL_FILE = 4
+COL_TEXT = 5
+
+_SIZE_UNITS = {
+    '': 1, 'b': 1,
+    'k': 1024, 'kb': 1024, 'kib': 1024,
+    'm': 1024 ** 2, 'mb': 1024 ** 2, 'mib': 1024 ** 2,
+    'g': 1024 ** 3, 'gb': 1024 ** 3, 'gib': 1024 ** 3,
+    't': 1024 ** 4, 'tb': 1024 ** 4, 'tib': 1024 ** 4,
+}
+_SIZE_RE = re.compile(r'^\s*([0-9]+(?:[.,][0-9]+)?)\s*([a-zA-Z]*)\s*$')
+
+
+def parse_size_bytes(value) -> Optional[int]:
+    """
+    Convierte el valor de la columna Size a bytes
+    
+    Acepta números (bytes) o textos como '734.2 MB', '1,5 GB' o '512KB'.
+    
+    Returns:
+        Tamaño en bytes o None si no se puede interpretar
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if value >= 0 else None
+    match = _SIZE_RE.match(str(value))
+    if not match:
+        return None
+    unit = _SIZE_UNITS.get(match.group(2).lower())
+    if unit is None:
+        return None
+    return int(float(match.group(1).replace(',', '.')) * unit)
+
+
+def parse_duration_seconds(value) -> Optional[float]:
+    """
+    Convierte el valor de la columna Duration a segundos
+    
+    Acepta números (segundos), 'HH:MM:SS', 'MM:SS' o objetos time/timedelta.
+    
+    Returns:
+        Duración en segundos o None si no se puede interpretar
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if value >= 0 else None
+    if hasattr(value, 'total_seconds'):
+        return value.total_seconds()
+    if hasattr(value, 'hour') and hasattr(value, 'minute'):
+        return value.hour * 3600 + value.minute * 60 + getattr(value, 'second', 0)
+    try:
+        parts = [float(part) for part in str(value).strip().split(':')]
+    except ValueError:
+        return None
+    if not parts or len(parts) > 3:
+        return None
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds
+
+
+_PRIVATE_LINK_RE = re.compile(r't\.me/c/(\d+)/(?:\d+/)?(\d+)')
+_PRIVATE_POST_RE = re.compile(r'tg://privatepost\?channel=(\d+)&post=(\d+)')
+
+
+def parse_telegram_link(link) -> Optional[Tuple[int, int]]:
+    """
+    Extrae (canal, post) de un enlace de canal privado
+    
+    Acepta 'https://t.me/c/<canal>/<post>' (con o sin esquema/hilo) y
+    'tg://privatepost?channel=<canal>&post=<post>'.
+    
+    Returns:
+        Tupla (canal, post) como enteros o None si el enlace no es de ese tipo
+    """
+    if not isinstance(link, str):
+        return None
+    match = _PRIVATE_LINK_RE.search(link) or _PRIVATE_POST_RE.search(link)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def annotate_link(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Añade al registro el canal y el post de su enlace ('channel'/'post', None si no es privado)"""
+    parsed = parse_telegram_link(item.get('link'))
+    item['channel'], item['post'] = parsed if parsed else (None, None)
+    return item
+
+
+_PUBLIC_LINK_RE = re.compile(r't(?:elegram)?\.me/(?:s/)?([A-Za-z][A-Za-z0-9_]{3,})/\d+')
+
+
+def channel_key(item: Dict[str, Any]) -> str:
+    """
+    Canal de origen de un registro ya anotado
+    
+    Returns:
+        ID del canal privado ('1234567890'), '@usuario' de un canal público
+        o '' si el enlace no es de ningún canal
+    """
+    if item['channel'] is not None:
+        return str(item['channel'])
+    match = _PUBLIC_LINK_RE.search(item['link']) if isinstance(item['link'], str) else None
+    return '@' + match.group(1).lower() if match else ''
+
+
+def channel_label(key: str) -> str:
+    """Nombre a mostrar de una clave de channel_key"""
+    if not key:
+        return "(sin canal)"
+    return key if key.startswith('@') else f"c/{key}"
+
+
+_TDL_PROGRESS_RE = re.compile(
+    r'(?P<percent>\d+(?:\.\d+)?)%\s*\[(?P<done>[\d.]+\s*[KMGT]?i?B) in (?P<elapsed>[\d.hms]+?)s?;'
+    r'\s*~ETA:\s*(?P<eta>[\d.hms]+?)s?;\s*(?P<rate>[\d.]+\s*[KMGT]?i?B)/s\]'
+)
+_CLOCK_PART_RE = re.compile(r'([\d.]+)([hms]?)')
+# Formas en que tdl informa de que otro proceso tiene su almacenamiento bolt: el error de
+# bolt ('database is locked'), el timeout de bolt al abrirlo y el bloqueo de archivo de Windows
+_TDL_LOCK_RE = re.compile(r'\blocked\b|open storage:.*\btimeout\b|used by another process', re.I)
+# Espera anunciada por Telegram ('FLOOD_WAIT (30)', 'FLOOD_WAIT_30', 'A wait of 30 seconds is required'),
+# que tdl cumple durmiendo dentro del mismo proceso
+_TDL_FLOOD_WAIT_RE = re.compile(r'FLOOD_WAIT\D{0,3}(\d+)|wait of (\d+) seconds', re.I)
+_CLOCK_UNITS = {'h': 3600, 'm': 60, 's': 1, '': 1}
+
+
+def _clock_seconds(text: str) -> float:
+    """Segundos de un tiempo de tdl como '42', '3.2' o '1m5'"""
+    return sum(float(number) * _CLOCK_UNITS[unit] for number, unit in _CLOCK_PART_RE.findall(text))
+
+
+def parse_tdl_progress(line: str) -> Optional[Dict[str, Any]]:
+    """
+    Interpreta una línea de progreso de tdl dl/up
+    
+    Formato: 'nombre ... 45.0% [12.34 MB in 3.2s; ~ETA: 4s; 3.81 MB/s]'
+    
+    Returns:
+        {'name', 'percent', 'bytes', 'rate', 'eta'} o None si la línea no es de progreso
+    """
+    match = _TDL_PROGRESS_RE.search(line)
+    if not match:
+        return None
+    return {
+        'name': line[:match.start()].strip().rstrip('.').strip(),
+        'percent': float(match.group('percent')),
+        'bytes': parse_size_bytes(match.group('done')) or 0,
+        'rate': parse_size_bytes(match.group('rate')) or 0,
+        'eta': _clock_seconds(match.group('eta')),
+    }
+
+
+class AdaptiveTimeout:
+    """
+    Calcula timeouts por trabajo a partir del tamaño/duración de la fila
+    y del throughput observado para cada cuenta
+    """
+    
+    DEFAULT_THROUGHPUT = 2 * 1024 ** 2  # bytes/s supuestos hasta tener observaciones
+    VIDEO_BITRATE = 256 * 1024  # bytes/s para estimar tamaño a partir de la duración
+    EWMA_ALPHA = 0.3
+    
+    def __init__(self, floor: float = 15, ceiling: float = 900, overhead: float = 10,
+                 margin: float = 3.0, min_margin: float = 1.5, max_margin: float = 8.0):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.overhead = overhead
+        self.initial_margin = margin
+        self.min_margin = min_margin
+        self.max_margin = max_margin
+        self._throughput = {}  # cuenta -> bytes/s (EWMA)
+        self._margin = {}  # cuenta -> factor de seguridad
+        self.kills = deque(maxlen=200)  # timeouts registrados
+        self._lock = threading.Lock()
+    
+    def estimate_bytes(self, size_bytes: Optional[int], duration_seconds: Optional[float]) -> Optional[int]:
+        """Estima el tamaño del trabajo; usa la duración si no hay tamaño"""
+        if size_bytes:
+            return size_bytes
+        if duration_seconds:
+            return int(duration_seconds * self.VIDEO_BITRATE)
+        return None
+    
+    def timeout_for(self, account: int, size_bytes: Optional[int] = None,
+                    duration_seconds: Optional[float] = None) -> float:
+        """
+        Calcula el timeout para un trabajo
+        
+        Args:
+            account: Número de cuenta de Telegram (data_number)
+            size_bytes: Tamaño del contenido, si se conoce
+            duration_seconds: Duración del video, si se conoce
+            
+        Returns:
+            Timeout en segundos, acotado entre floor y ceiling
+        """
+        estimated = self.estimate_bytes(size_bytes, duration_seconds)
+        with self._lock:
+            throughput = self._throughput.get(account, self.DEFAULT_THROUGHPUT)
+            margin = self._margin.get(account, self.initial_margin)
+        if estimated is None:
+            timeout = self.overhead * margin
+        else:
+            timeout = self.overhead + estimated / throughput * margin
+        return max(self.floor, min(self.ceiling, timeout))
+
+    def throughput(self, account: int) -> float:
+        """Bytes/s aprendidos de los comandos de tdl de la cuenta (DEFAULT_THROUGHPUT sin historial)"""
+        with self._lock:
+            return self._throughput.get(account, self.DEFAULT_THROUGHPUT)
+
+    def record_success(self, account: int, size_bytes: Optional[int], elapsed: float,
+                       duration_seconds: Optional[float] = None):
+        """Registra un trabajo completado y ajusta throughput y margen"""
+        estimated = self.estimate_bytes(size_bytes, duration_seconds)
+        with self._lock:
+            margin = self._margin.get(account, self.initial_margin)
+            self._margin[account] = max(self.min_margin, margin * 0.95)
+            transfer_time = elapsed - self.overhead / 2
+            if estimated and transfer_time > 0:
+                self._update_throughput(account, estimated / transfer_time)
+    
+    def record_timeout(self, account: int, size_bytes: Optional[int], timeout: float,
+                       duration_seconds: Optional[float] = None):
+        """
+        Registra un trabajo cancelado por timeout
+        
+        El throughput real fue como mucho tamaño/timeout, así que la estimación
+        se corrige hacia abajo y el margen de la cuenta crece.
+        """
+        estimated = self.estimate_bytes(size_bytes, duration_seconds)
+        with self._lock:
+            self.kills.append({
+                'account': account,
+                'size_bytes': estimated,
+                'timeout': timeout,
+                'time': time.time()
+            })
+            margin = self._margin.get(account, self.initial_margin)
+            self._margin[account] = min(self.max_margin, margin * 1.5)
+            if estimated:
+                bound = estimated / timeout
+                if bound < self._throughput.get(account, self.DEFAULT_THROUGHPUT):
+                    self._update_throughput(account, bound)
+    
+    def _update_throughput(self, account: int, observed: float):
+        current = self._throughput.get(account)
+        if current is None:
+            self._throughput[account] = observed
+        else:
+            self._throughput[account] = (1 - self.EWMA_ALPHA) * current + self.EWMA_ALPHA * observed
+
+
+class ThroughputEstimator:
+    """
+    Rendimiento aprendido por cuenta y operación ('forward', 'batch', 'download', 'upload')
+    
+    Cada trabajo terminado, bien o mal, aporta sus filas, bytes y segundos a
+    una regresión lineal con olvido exponencial: segundos por fila = coste fijo
+    + bytes / throughput. Así el tiempo de cualquier conjunto de filas se
+    proyecta solo con su número y sus bytes. También se llevan las tasas de
+    fallo y de fallback (reenvío como texto). El modelo se guarda en JSON y se
+    recarga al arrancar, de modo que las estimaciones valen desde el primer
+    trabajo de la sesión.
+    
+    Es el único modelo de duración: lo usan tanto las proyecciones (EtaTracker)
+    como el orden de la cola (coste de los trabajos con 'sjf'). Mientras una
+    operación no tiene tamaños suficientemente variados para ajustar la
+    pendiente, los segundos por byte salen del throughput que AdaptiveTimeout
+    mide en cada comando de tdl de la cuenta.
+    """
+    
+    DECAY = 0.97  # peso que conserva el historial con cada observación nueva
+    PRIOR_SECONDS = 5.0  # coste fijo por fila supuesto sin historial
+    MIN_SPREAD = 0.05  # variación relativa de tamaños por debajo de la cual no se ajusta el throughput
+    SAVE_EVERY = 30.0  # segundos mínimos entre guardados
+    
+    def __init__(self, path: Optional[str] = None, timeouts: Optional[AdaptiveTimeout] = None):
+        """
+        Args:
+            path: Archivo JSON donde persiste el modelo (None: solo en memoria)
+            timeouts: Modelo de timeouts del que tomar el throughput por defecto
+        """
+        self.path = os.path.expanduser(path) if path else None
+        self.timeouts = timeouts
+        self._models = {}  # 'cuenta:operación' -> sumas ponderadas de la regresión
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self._dirty = False
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, encoding='utf-8') as handle:
+                    self._models = json.load(handle).get('models', {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudo leer el modelo de rendimiento {self.path}: {str(e)}")
+    
+    def _model(self, account: int, operation: str) -> Dict[str, float]:
+        key = f"{account}:{operation}"
+        model = self._models.get(key)
+        if model is None:
+            model = self._models[key] = dict.fromkeys(('w', 'x', 'y', 'xx', 'xy', 'outcomes', 'failed', 'fallback'),
+                                                      0.0)
+            model['jobs'] = 0
+        return model
+    
+    def observe(self, account: int, operation: str, rows: int, size_bytes: int, seconds: float,
+                success: bool = True, fallback: bool = False):
+        """
+        Registra un trabajo terminado
+        
+        Args:
+            account, operation: Cuenta de tdl y tipo de trabajo
+            rows: Filas que cubría el trabajo (posts de un lote)
+            size_bytes: Bytes estimados de esas filas (0 si no se conocen)
+            seconds: Duración total del trabajo, reintentos y fallbacks incluidos
+            success: Si terminó bien
+            fallback: Si hubo que enviar el enlace como texto
+        """
+        if rows <= 0 or seconds <= 0:
+            return
+        mean_bytes = size_bytes / rows
+        with self._lock:
+            model = self._model(account, operation)
+            for name in ('w', 'x', 'y', 'xx', 'xy', 'outcomes', 'failed', 'fallback'):
+                model[name] *= self.DECAY
+            # Las filas de un lote cuentan como rows puntos de tamaño y duración medios
+            model['w'] += rows
+            model['x'] += size_bytes
+            model['y'] += seconds
+            model['xx'] += size_bytes * mean_bytes
+            model['xy'] += mean_bytes * seconds
+            model['outcomes'] += 1
+            model['failed'] += not success
+            model['fallback'] += bool(fallback)
+            model['jobs'] += 1
+            self._dirty = True
+        if self.path and time.monotonic() - self._saved_at > self.SAVE_EVERY:
+            self.save()
+    
+    def _default_slope(self, account: int) -> float:
+        """Segundos por byte según el throughput medido por AdaptiveTimeout"""
+        if self.timeouts is None:
+            return 1 / AdaptiveTimeout.DEFAULT_THROUGHPUT
+        return 1 / self.timeouts.throughput(account)
+    
+    def _coefficients(self, model: Dict[str, float], default_slope: float) -> Tuple[float, float]:
+        """
+        (segundos fijos por fila, segundos por byte) del ajuste por mínimos cuadrados
+        
+        Sin historial se usan PRIOR_SECONDS y default_slope; si los tamaños
+        observados apenas varían, se mantiene default_slope y solo se ajusta el
+        coste fijo.
+        """
+        w, x, y, xx, xy = model['w'], model['x'], model['y'], model['xx'], model['xy']
+        if w <= 0:
+            return self.PRIOR_SECONDS, default_slope
+        denominator = w * xx - x * x
+        if denominator <= (self.MIN_SPREAD * x) ** 2:
+            slope = default_slope if x else 0.0
+        else:
+            slope = max((w * xy - x * y) / denominator, 0.0)
+        fixed = (y - slope * x) / w
+        if fixed < 0:
+            fixed, slope = 0.0, (xy / xx if xx else 0.0)
+        return fixed, slope
+    
+    def predict(self, account: int, operation: str, rows: int, size_bytes: int = 0) -> float:
+        """Segundos esperados para rows filas que suman size_bytes"""
+        if rows <= 0:
+            return 0.0
+        default_slope = self._default_slope(account)
+        with self._lock:
+            fixed, slope = self._coefficients(self._model(account, operation), default_slope)
+        return rows * fixed + size_bytes * slope
+    
+    def summary(self, account: int, operation: str, mean_bytes: float = 0) -> Dict[str, Any]:
+        """
+        Rendimiento actual de una cuenta y operación
+        
+        Returns:
+            Dict {'rows_per_minute' (para filas de mean_bytes), 'bytes_per_second',
+            'failure_rate', 'fallback_rate', 'jobs' (observados en total)}
+        """
+        default_slope = self._default_slope(account)
+        with self._lock:
+            model = self._model(account, operation)
+            fixed, slope = self._coefficients(model, default_slope)
+            outcomes = model['outcomes']
+            summary = {
+                'failure_rate': model['failed'] / outcomes if outcomes else 0.0,
+                'fallback_rate': model['fallback'] / outcomes if outcomes else 0.0,
+                'jobs': model['jobs'],
+            }
+        row_seconds = fixed + mean_bytes * slope
+        summary['rows_per_minute'] = 60 / row_seconds if row_seconds > 0 else None
+        summary['bytes_per_second'] = 1 / slope if slope > 0 else None
+        return summary
+    
+    def save(self):
+        """Guarda el modelo si ha cambiado (escritura atómica)"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({'version': 1, 'models': self._models})
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        temporary = None
+        try:
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            # Un temporal propio por guardado: dos guardados a la vez no comparten archivo
+            handle, temporary = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.', suffix='.tmp',
+                                                 dir=directory)
+            with os.fdopen(handle, 'w', encoding='utf-8') as stream:
+                stream.write(data)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el modelo de rendimiento: {str(e)}")
+            if temporary is not None and os.path.exists(temporary):
+                os.remove(temporary)
+
+
+class EtaTracker:
+    """
+    Tiempo restante y hora de fin de una operación por lotes, con el modelo vigente
+    
+    Se registran las filas planificadas (add) y las terminadas (finish) de cada
+    etapa (cuenta, operación). Lo pendiente se proyecta con ThroughputEstimator,
+    que sigue aprendiendo durante la operación: las etapas de una misma cuenta
+    se suman (tdl las turna) y entre cuentas distintas cuenta la más lenta.
+    Las etapas que repiten filas de otra (la subida tras la descarga) se
+    registran con counted=False para no contarlas dos veces en el avance.
+    """
+    
+    def __init__(self, estimator: ThroughputEstimator, label: str):
+        self.estimator = estimator
+        self.label = label
+        self.started = time.time()
+        self.total = 0
+        self.done = 0
+        self._stages = {}  # (cuenta, operación) -> [filas, bytes, filas terminadas, bytes terminados]
+        self._lock = threading.Lock()
+    
+    def add(self, account: int, operation: str, rows: int, size_bytes: int = 0, counted: bool = True):
+        with self._lock:
+            stage = self._stages.setdefault((account, operation), [0, 0, 0, 0])
+            stage[0] += rows
+            stage[1] += size_bytes
+            if counted:
+                self.total += rows
+    
+    def finish(self, account: int, operation: str, rows: int, size_bytes: int = 0, counted: bool = True):
+        with self._lock:
+            stage = self._stages.setdefault((account, operation), [0, 0, 0, 0])
+            stage[2] += rows
+            stage[3] += size_bytes
+            if counted:
+                self.done += rows
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict {'label', 'done', 'total', 'remaining_seconds', 'finish_at' (epoch),
+            'elapsed', 'rows_per_minute', 'bytes_per_second', 'fallback_rate', 'failure_rate'}
+            de la etapa con más trabajo pendiente
+        """
+        with self._lock:
+            stages = {key: list(values) for key, values in self._stages.items()}
+            done, total = self.done, self.total
+        by_account = Counter()
+        slowest, slowest_seconds = None, -1.0
+        for (account, operation), (rows, size_bytes, done_rows, done_bytes) in stages.items():
+            seconds = self.estimator.predict(account, operation, max(0, rows - done_rows),
+                                             max(0, size_bytes - done_bytes))
+            by_account[account] += seconds
+            if seconds > slowest_seconds:
+                slowest, slowest_seconds = (account, operation, size_bytes / rows if rows else 0), seconds
+        remaining = max(by_account.values(), default=0.0)
+        now = time.time()
+        snapshot = {'label': self.label, 'done': done, 'total': total, 'remaining_seconds': remaining,
+                    'finish_at': now + remaining, 'elapsed': now - self.started}
+        if slowest is not None:
+            summary = self.estimator.summary(*slowest)
+            snapshot.update({name: summary[name] for name in
+                             ('rows_per_minute', 'bytes_per_second', 'fallback_rate', 'failure_rate')})
+        return snapshot
+
+
+def describe_eta(snapshot: Dict[str, Any]) -> str:
+    """Texto breve de una proyección de EtaTracker: tiempo restante, hora de fin y ritmo"""
+    remaining = int(max(0.0, snapshot['finish_at'] - time.time()))
+    hours, rest = divmod(remaining, 3600)
+    clock = f"{hours}h{rest // 60:02d}m" if hours else f"{rest // 60}m{rest % 60:02d}s"
+    finish = datetime.datetime.fromtimestamp(snapshot['finish_at'])
+    finish_text = finish.strftime('%H:%M' if finish.date() == datetime.date.today() else '%d/%m %H:%M')
+    text = f"⏱ {clock} restantes (fin ≈ {finish_text})"
+    if snapshot.get('rows_per_minute'):
+        text += f" · {snapshot['rows_per_minute']:.0f} filas/min"
+    if snapshot.get('fallback_rate'):
+        text += f" · {snapshot['fallback_rate']:.0%} como texto"
+    return text
+
+
+GREEN_RGB = '90EE90'  # color de las filas procesadas
+
+
+def is_green_fill(fill) -> bool:
+    """
+    Indica si un relleno es el verde que marca las filas procesadas
+    
+    Acepta el color con o sin canal alfa ('90EE90', 'FF90EE90', '0090EE90'),
+    que es como openpyxl lo devuelve según quién guardó el archivo.
+    """
+    if fill and fill.start_color:
+        rgb = getattr(fill.start_color, "rgb", None)
+        return isinstance(rgb, str) and len(rgb) in (6, 8) and rgb[-6:].upper() == GREEN_RGB
+    return False
+
+
+def green_style_ids(fills, cell_styles) -> set:
+    """
+    Índices de estilo de celda cuyo relleno es el verde de procesado
+    
+    Se calcula una vez por archivo a partir de la tabla de estilos, de forma que
+    el estado de cada fila se decide con una búsqueda en un conjunto de enteros.
+    """
+    green_fills = {index for index, fill in enumerate(fills) if is_green_fill(fill)}
+    return {index for index, style in enumerate(cell_styles) if style.fillId in green_fills}
+
+
+class InputSource(abc.ABC):
+    """
+    Base de las fuentes de datos (xlsx, CSV/TSV, JSON de tdl-export)
+    
+    Cada fuente produce registros en el formato de DataManager
+    ({'excel_row', 'data', 'link', 'is_clicked'}) y sabe guardar las marcas
+    de procesado en su propio formato.
+    """
+    
+    PROGRESS_EVERY = 5000  # filas entre avisos de progreso
     
     def __init__(self):
-        self.workbook = None
-        self.worksheet = None
         self.file_path = None
-        self.green_fill = PatternFill(start_color='90EE90', end_color='90EE90', fill_type='solid')
+        self.headers = None  # fila de cabecera del último archivo leído, si la tiene
+        self._stream = None  # archivo binario abierto durante la lectura, para el progreso
+    
+    def bytes_read(self) -> int:
+        """Posición de lectura en el archivo (bytes) durante iter_records; 0 si no se está leyendo"""
+        stream = self._stream
+        try:
+            if isinstance(stream, InputSource):
+                return stream.bytes_read()
+            return stream.tell() if stream is not None and not stream.closed else 0
+        except (OSError, ValueError):
+            return 0
     
-    def load_file(self, file_path: str) -> Dict[str, Any]:
+    def load_file(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
         """
-        Carga un archivo Excel y extrae los datos
+        Carga un archivo y extrae los datos
         
         Args:
-            file_path: Ruta del archivo Excel
+            file_path: Ruta del archivo
+            progress_callback: Función opcional que recibe el número de filas leídas
             
         Returns:
             Dict con información del archivo cargado
         """
         try:
-            self.file_path = file_path
-            self.workbook = openpyxl.load_workbook(file_path)
-            self.worksheet = self.workbook.active
-            
-            all_data = []
-            if self.worksheet is not None:
-                for row_num, row in enumerate(self.worksheet.iter_rows(min_row=2, values_only=True), start=2):
-                    if row and row[0]:
-                        cell = self.worksheet.cell(row=row_num, column=1)
-                        is_green = self._is_cell_green(cell)
-                        
-                        all_data.append({
-                            'excel_row': row_num,
-                            'data': row,
-                            'link': row[0],
-                            'is_clicked': is_green
-                        })
+            all_data = list(self.iter_records(file_path, progress_callback))
             
             return {
                 'success': True,
@@ -61,293 +649,4376 @@ class ExcelHandler:
                 'message': f'Error al cargar el archivo: {str(e)}'
             }
     
-    def _is_cell_green(self, cell) -> bool:
-        """Verifica si una celda tiene el formato verde (ya procesada)"""
-        if cell and cell.fill and cell.fill.start_color:
-            return getattr(cell.fill.start_color, "rgb", None) == '90EE90'
-        return False
+    @abc.abstractmethod
+    def iter_records(self, file_path: str,
+                     progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
+        """Recorre las filas del archivo como registros de DataManager"""
     
+    @abc.abstractmethod
     def mark_as_processed(self, excel_row: int) -> bool:
-        """
-        Marca una fila como procesada (color verde)
-        
-        Args:
-            excel_row: Número de fila en Excel
-            
-        Returns:
-            True si se marcó correctamente, False en caso contrario
-        """
-        try:
-            if self.worksheet is not None and self.workbook is not None and self.file_path is not None:
-                self.worksheet.cell(row=excel_row, column=1).fill = self.green_fill
-                self.workbook.save(self.file_path)
-                return True
-            return False
-        except Exception as e:
-            print(f"Error al marcar como procesado: {str(e)}")
-            return False
+        """Guarda la marca de procesado de una fila"""
+    
+    def mark_rows_as_processed(self, excel_rows: Iterable[int]) -> bool:
+        """Guarda las marcas de varias filas; las fuentes con guardado costoso lo hacen una sola vez"""
+        results = [self.mark_as_processed(row) for row in excel_rows]
+        return all(results)
+    
+    @abc.abstractmethod
+    def unmark_rows_as_processed(self, excel_rows: Iterable[int]) -> bool:
+        """Quita la marca de procesado de varias filas"""
 
 
-class TelegramOperations:
-    """Maneja todas las operaciones relacionadas con Telegram"""
+class ProcessedSidecar:
+    """
+    Estado de procesado de fuentes sin formato de celda (CSV, JSON)
     
-    @staticmethod
-    def open_link(link: str) -> bool:
-        """
-        Abre un enlace en Telegram
-        
-        Args:
-            link: URL del enlace de Telegram
-            
-        Returns:
-            True si se abrió correctamente, False en caso contrario
-        """
+    Se guarda junto al archivo como '<archivo>.processed': una línea por fila
+    marcada ('-fila' la desmarca). Solo se añade al final, así que marcar
+    una fila no reescribe nada. Las líneas que no se pueden leer, como la
+    última cortada por un cierre inesperado, se ignoran.
+    """
+    
+    SUFFIX = '.processed'
+    
+    def __init__(self, source_path: str):
+        self.path = source_path + self.SUFFIX
+        self.rows = set()
+        self._lock = threading.Lock()
+        self._complete_size = None  # bytes hasta la última línea completa, si la última quedó cortada
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as handle:
+                size = 0
+                for line in handle:
+                    if not line.endswith(b'\n'):
+                        # Cada marca se escribe con su salto de línea: sin él, el número puede estar cortado
+                        print(f"⚠️ Última línea incompleta en {self.path}: {line!r}")
+                        self._complete_size = size
+                        break
+                    size += len(line)
+                    line = line.strip()
+                    try:
+                        if line.startswith(b'-'):
+                            self.rows.discard(int(line[1:]))
+                        elif line:
+                            self.rows.add(int(line))
+                    except ValueError:
+                        print(f"⚠️ Línea ilegible en {self.path}: {line!r}")
+    
+    def __contains__(self, row: int) -> bool:
+        return row in self.rows
+    
+    def add(self, row: int):
+        with self._lock:
+            if row not in self.rows:
+                self.rows.add(row)
+                self._append(str(row))
+    
+    def discard(self, row: int):
+        with self._lock:
+            if row in self.rows:
+                self.rows.discard(row)
+                self._append(f"-{row}")
+    
+    def _append(self, line: str):
+        if self._complete_size is not None:
+            # La línea cortada se quita antes de añadir; si no, se leería junto con la nueva
+            os.truncate(self.path, self._complete_size)
+            self._complete_size = None
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(line + '\n')
+
+
+class SidecarSource(InputSource):
+    """Fuente cuyas marcas de procesado se guardan en un ProcessedSidecar"""
+    
+    def __init__(self):
+        super().__init__()
+        self.sidecar = None
+    
+    def mark_as_processed(self, excel_row: int) -> bool:
+        if self.sidecar is None:
+            return False
         try:
-            if link.startswith('https://t.me/c/'):
-                parts = link.replace('https://t.me/c/', '').split('/')
-                if len(parts) >= 2:
-                    channel = parts[0]
-                    post = parts[1]
-                    telegram_link = f"tg://privatepost?channel={channel}&post={post}"
-                    subprocess.run(['open', telegram_link])
-                else:
-                    subprocess.run(['open', link])
-            elif link.startswith('tg://privatepost'):
-                subprocess.run(['open', link])
-            else:
-                subprocess.run(['open', link])
+            self.sidecar.add(excel_row)
             return True
         except Exception as e:
-            print(f"Error al abrir el enlace: {str(e)}")
+            print(f"Error al marcar como procesado: {str(e)}")
             return False
     
-    @staticmethod
-    def download_with_tlg(link: str) -> bool:
-        """
-        Descarga contenido usando el comando tlg
-        
-        Args:
-            link: URL del contenido a descargar
-            
-        Returns:
-            True si se ejecutó correctamente, False en caso contrario
-        """
+    def unmark_rows_as_processed(self, excel_rows: Iterable[int]) -> bool:
+        if self.sidecar is None:
+            return False
         try:
-            applescript = f'''
-            tell application "iTerm"
-                if (count of windows) = 0 then
-                    create window with default profile
-                end if
-                
-                tell current window
-                    create tab with default profile
-                    tell current session
-                        write text "tlg 1 {link}"
-                    end tell
-                end tell
-            end tell
-            '''
-            
-            subprocess.run(['osascript', '-e', applescript])
+            for row in excel_rows:
+                self.sidecar.discard(row)
             return True
         except Exception as e:
-            print(f"Error al ejecutar tlg: {str(e)}")
+            print(f"Error al desmarcar: {str(e)}")
             return False
+
+
+class CsvSource(SidecarSource):
+    """Lee listas CSV/TSV en streaming; la primera fila es la cabecera"""
     
-    @staticmethod
-    def forward_with_tdl(link: str, data_number: int = 1, target_chat: str = "2532518781") -> bool:
+    def __init__(self, delimiter: Optional[str] = None):
         """
-        Reenvía contenido usando tdl con fallback a mensaje de texto
-        
         Args:
-            link: URL del contenido a reenviar
-            data_number: Número de cuenta de Telegram
-            target_chat: ID del chat destino
-            
-        Returns:
-            True si se reenviió correctamente, False en caso contrario
+            delimiter: Separador; si es None se usa tabulador para .tsv y se detecta en el resto
         """
-        try:
-            storage_path = os.path.expanduser(f"~/.tdl/oktelegram{data_number}")
+        super().__init__()
+        self.delimiter = delimiter
+    
+    def _detect_delimiter(self, file_path: str) -> str:
+        if self.delimiter:
+            return self.delimiter
+        if file_path.lower().endswith('.tsv'):
+            return '\t'
+        # El separador más frecuente en la cabecera (csv.Sniffer es muy lento con muestras grandes)
+        with open(file_path, newline='', encoding='utf-8-sig') as handle:
+            header = handle.readline()
+        counts = {delimiter: header.count(delimiter) for delimiter in ',;\t|'}
+        best = max(counts, key=counts.get)
+        return best if counts[best] else ','
+    
+    def iter_records(self, file_path: str,
+                     progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
+        self.file_path = file_path
+        self.sidecar = ProcessedSidecar(file_path)
+        delimiter = self._detect_delimiter(file_path)
+        count = 0
+        with open(file_path, newline='', encoding='utf-8-sig') as handle:
+            self._stream = handle.buffer
+            reader = csv.reader(handle, delimiter=delimiter)
+            header = next(reader, None)
+            self.headers = tuple(header) if header else None
+            processed = self.sidecar.rows
+            for row_num, fields in enumerate(reader, start=2):
+                if fields and fields[0]:
+                    # Celdas vacías como None, igual que openpyxl
+                    row = tuple([field or None for field in fields]) if '' in fields else tuple(fields)
+                    count += 1
+                    yield {
+                        'excel_row': row_num,
+                        'data': row,
+                        'link': row[0],
+                        'is_clicked': row_num in processed
+                    }
+                    if progress_callback and count % self.PROGRESS_EVERY == 0:
+                        progress_callback(count)
+
+
+class TdlJsonSource(SidecarSource):
+    """
+    Lee exportaciones de tdl ({"id": canal, "messages": [...]}) en streaming
+    
+    Los mensajes se decodifican uno a uno a medida que se lee el archivo, sin
+    cargar el documento completo. Cada mensaje se convierte en una fila con
+    el enlace t.me/c/<canal>/<post>; las marcas van al sidecar igual que en CSV.
+    """
+    
+    CHUNK_SIZE = 1024 * 1024
+    
+    def iter_records(self, file_path: str,
+                     progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
+        self.file_path = file_path
+        self.sidecar = ProcessedSidecar(file_path)
+        count = 0
+        for chat_id, message in self._iter_messages(file_path):
+            if not isinstance(message, dict) or 'id' not in message:
+                continue
+            link = f"https://t.me/c/{chat_id}/{message['id']}"
+            file_name = message.get('file') or None
+            extension = os.path.splitext(file_name)[1].lstrip('.') if file_name else None
+            row_num = count + 2  # misma numeración que una hoja con cabecera
+            count += 1
+            yield {
+                'excel_row': row_num,
+                'data': (link, extension or None, message.get('duration'), message.get('size'),
+                         file_name, message.get('text') or None),
+                'link': link,
+                'is_clicked': row_num in self.sidecar
+            }
+            if progress_callback and count % self.PROGRESS_EVERY == 0:
+                progress_callback(count)
+    
+    def _iter_messages(self, file_path: str) -> Iterator[Tuple[Any, Any]]:
+        """Recorre el objeto de primer nivel y devuelve (id del chat, mensaje) por cada mensaje"""
+        decoder = json.JSONDecoder()
+        with open(file_path, encoding='utf-8-sig') as handle:
+            self._stream = handle.buffer
+            buffer = ''
+            pos = 0
+            eof = False
             
-            # Intento directo de reenvío
-            success = TelegramOperations._attempt_direct_forward(link, data_number, target_chat, storage_path)
+            def fill():
+                nonlocal buffer, pos, eof
+                chunk = handle.read(self.CHUNK_SIZE)
+                if not chunk:
+                    eof = True
+                buffer = buffer[pos:] + chunk
+                pos = 0
             
-            if not success:
-                print("🔄 Forward failed, attempting to send as text message...")
-                success = TelegramOperations._attempt_send_text(link, data_number, target_chat, storage_path)
+            def skip_ws():
+                nonlocal pos
+                while True:
+                    while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                        pos += 1
+                    if pos < len(buffer) or eof:
+                        return
+                    fill()
             
-            return success
+            def expect(char):
+                nonlocal pos
+                skip_ws()
+                if pos >= len(buffer) or buffer[pos] != char:
+                    raise ValueError(f"JSON de tdl-export inválido: se esperaba '{char}'")
+                pos += 1
             
-        except Exception as e:
-            print(f"Error en forward_with_tdl: {str(e)}")
-            return False
-    
-    @staticmethod
-    def _attempt_direct_forward(link: str, data_number: int, target_chat: str, storage_path: str) -> bool:
-        """Intenta reenviar directamente usando tdl forward"""
-        try:
-            forward_cmd = [
-                'tdl', 'forward',
-                '--storage', f'type=bolt,path={storage_path}',
-                '--from', link,
-                '--to', target_chat,
-                '--mode', 'direct'
-            ]
+            def decode():
+                nonlocal pos
+                skip_ws()
+                while True:
+                    try:
+                        value, end = decoder.raw_decode(buffer, pos)
+                        if end < len(buffer) or eof:
+                            pos = end
+                            return value
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                    fill()
+            
+            def peek():
+                skip_ws()
+                return buffer[pos] if pos < len(buffer) else ''
+            
+            fill()
+            expect('{')
+            chat_id = None
+            while peek() != '}':
+                key = decode()
+                expect(':')
+                if key != 'messages':
+                    value = decode()
+                    if key == 'id':
+                        chat_id = value
+                else:
+                    expect('[')
+                    while peek() != ']':
+                        message = decode()
+                        if chat_id is None:
+                            raise ValueError("JSON de tdl-export inválido: falta 'id' antes de 'messages'")
+                        yield chat_id, message
+                        if peek() == ',':
+                            pos += 1
+                    expect(']')
+                if peek() == ',':
+                    pos += 1
 
-            print(f"🚀 Executing forward command: {' '.join(forward_cmd)}")
 
-            result = subprocess.run(
-                forward_cmd,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
+_SHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_ROW_TAG = f'{{{_SHEET_NS}}}row'
+_CELL_TAG = f'{{{_SHEET_NS}}}c'
+_VALUE_TAG = f'{{{_SHEET_NS}}}v'
+_FORMULA_TAG = f'{{{_SHEET_NS}}}f'
+_INLINE_TAG = f'{{{_SHEET_NS}}}is'
+_TEXT_TAG = f'{{{_SHEET_NS}}}t'
+_RICH_TAG = f'{{{_SHEET_NS}}}r'
+_SHARED_STRING_TAG = f'{{{_SHEET_NS}}}si'
+_DIMENSION_RE = re.compile(rb'<(?:\w+:)?dimension\b[^>]*?\bref="([^"]*)"')
+_SHEET_DATA_RE = re.compile(rb'<(?:\w+:)?sheetData\b')
 
-            if result.returncode == 0:
-                print("✅ Forward successful!")
-                return True
-            else:
-                print(f"⚠️ Forward failed with code {result.returncode}")
-                print(f"Error output: {result.stderr}")
-                return False
+# Estado de cada proceso del pool de FastXlsxReader (fijado por _fast_xlsx_init)
+_fast_worker_context = None
 
-        except subprocess.TimeoutExpired:
-            print("⏰ Forward command timed out")
-            return False
-        except Exception as e:
-            print(f"❌ Forward command error: {str(e)}")
-            return False
+
+def _fast_xlsx_init(context):
+    global _fast_worker_context
+    _fast_worker_context = context
+
+
+def _fast_xlsx_parse_chunk(args):
+    """Tarea del pool: parsea un rango de bytes del XML de la hoja ya descomprimido"""
+    xml_path, start, end, prefix, suffix = args
+    with open(xml_path, 'rb') as handle:
+        handle.seek(start)
+        body = handle.read(end - start)
+    source = _ChainedBytes([prefix, body, suffix])
+    return list(_parse_sheet_rows(source, _fast_worker_context, resolve_strings=False))
+
+
+class _ChainedBytes:
+    """Objeto tipo archivo de solo lectura sobre varios bloques de bytes (y opcionalmente un archivo detrás)"""
+    
+    def __init__(self, blocks, tail=None):
+        self._blocks = deque(blocks)
+        self._tail = tail
+    
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = b''.join(self._blocks)
+            self._blocks.clear()
+            return data + (self._tail.read() if self._tail is not None else b'')
+        out = []
+        while size > 0 and self._blocks:
+            block = self._blocks.popleft()
+            if len(block) > size:
+                self._blocks.appendleft(block[size:])
+                block = block[:size]
+            out.append(block)
+            size -= len(block)
+        if size > 0 and self._tail is not None:
+            out.append(self._tail.read(size))
+        return b''.join(out)
+
+
+def _inline_text(element) -> Optional[str]:
+    """Texto de un <is> (texto plano y runs enriquecidos, sin fonética)"""
+    snippets = []
+    for child in element:
+        if child.tag == _TEXT_TAG and child.text is not None:
+            snippets.append(child.text)
+        elif child.tag == _RICH_TAG:
+            text = child.findtext(_TEXT_TAG)
+            if text is not None:
+                snippets.append(text)
+    return ''.join(snippets)
+
+
+def _cell_value(data_type: str, raw: Optional[str], style_id: int, context: Dict[str, Any]):
+    """Convierte el <v> de una celda como openpyxl (las cadenas compartidas las resuelve quien llama)"""
+    if not raw:
+        return None
+    if data_type == 'n':
+        value = float(raw) if ('.' in raw or 'E' in raw or 'e' in raw) else int(raw)
+        if style_id in context['date_formats']:
+            try:
+                value = from_excel(value, context['epoch'], timedelta=style_id in context['timedelta_formats'])
+            except (OverflowError, ValueError):
+                value = '#VALUE!'
+        return value
+    if data_type == 'b':
+        return bool(int(raw))
+    if data_type == 'd':
+        return datetime.datetime.fromisoformat(raw.rstrip('Z'))
+    return raw
+
+
+_SCAN_BLOCK = 1024 ** 2
+_SCAN_ENCODING_RE = re.compile(rb'^\s*<\?xml[^>]*\bencoding=["\']([\w.-]+)')
+_SCAN_NS_DECL_RE = re.compile(rb'\bxmlns(?::\w+)?="[^"]*"')
+_SCAN_SHARED_RE = re.compile(r'<si>(?:<t(?: xml:space="preserve")?>([^<]*)</t></si>|(.*?)</si>)|<si\s*/>', re.S)
+_SCAN_ROW_RE = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+_SCAN_ROW_NUMBER_RE = re.compile(r'\sr="(\d+)"')
+# Forma habitual de una celda (atributos r, s, t en ese orden; <v> o <is><t> sin anidar) y, si no, la general
+_SCAN_CELL_RE = re.compile(
+    r'<c r="([A-Z]+)\d+"(?: s="(\d+)")?(?: t="(\w+)")?(?:/>|>(?:<v>([^<]*)</v>|<is><t>([^<]*)</t></is>)</c>)'
+    r'|<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_SCAN_CELL_ATTR_RE = re.compile(r'(?<![\w:])([rst])="([^"]*)"')
+_XML_ENTITY_RE = re.compile(r'&(?:#(\d+)|#x([0-9a-fA-F]+)|(\w+));')
+_XML_ENTITIES = {'lt': '<', 'gt': '>', 'amp': '&', 'quot': '"', 'apos': "'"}
+
+
+def _plain_xml(source, root_tag: bytes):
+    """
+    Mira el principio de un XML para decidir si se puede recorrer con expresiones regulares
+    
+    Returns:
+        (source equivalente con el principio ya leído, declaraciones xmlns de la raíz o None si
+        el XML usa prefijos en las etiquetas o no está en UTF-8)
+    """
+    head = source.read(_SCAN_BLOCK)
+    source = _ChainedBytes([head], source)
+    root = re.search(rb'<(\w+:)?' + root_tag + rb'\b([^>]*)>', head)
+    encoding = _SCAN_ENCODING_RE.match(head)
+    if (root is None or root.group(1) or head.startswith((b'\xff\xfe', b'\xfe\xff'))
+            or (encoding is not None and encoding.group(1).lower() not in (b'utf-8', b'utf8'))):
+        return source, None
+    return source, b' '.join(_SCAN_NS_DECL_RE.findall(root.group(2))).decode('utf-8')
+
+
+def _scan_xml(source, pattern):
+    """Recorre un XML UTF-8 por bloques y devuelve cada coincidencia completa de pattern"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    while True:
+        block = source.read(_SCAN_BLOCK)
+        pending += decoder.decode(block, final=not block)
+        consumed = 0
+        for match in pattern.finditer(pending):
+            consumed = match.end()
+            yield match
+        pending = pending[consumed:]
+        if not block:
+            return
+
+
+def _read_shared_strings(source) -> List[str]:
+    """
+    Tabla de cadenas compartidas, igual que read_string_table de openpyxl pero sin
+    construir sus objetos Text (texto plano y runs enriquecidos, sin fonética)
+    """
+    source, declarations = _plain_xml(source, b'sst')
+    strings = []
+    if declarations is None:
+        for _, element in ET.iterparse(source, events=('end',)):
+            if element.tag == _SHARED_STRING_TAG:
+                strings.append(_inline_text(element).replace('x005F_', ''))
+                element.clear()
+        return strings
+    
+    si_open = f'<si {declarations}>'
+    for match in _scan_xml(source, _SCAN_SHARED_RE):
+        text = match.group(1)
+        if text is not None:
+            text = _xml_text(text)
+        elif match.group(2) is not None:
+            text = _inline_text(ET.fromstring(si_open + match.group(2) + '</si>'))
+        else:
+            text = ''
+        strings.append(text.replace('x005F_', ''))
+    return strings
+
+
+def _xml_text(text: str) -> str:
+    """Texto de XML tal como lo entrega ElementTree (entidades resueltas, saltos de línea normalizados)"""
+    if '&' in text:
+        text = _XML_ENTITY_RE.sub(
+            lambda match: chr(int(match.group(1))) if match.group(1)
+            else chr(int(match.group(2), 16)) if match.group(2)
+            else _XML_ENTITIES.get(match.group(3), match.group(0)), text)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _parse_sheet_rows(source, context: Dict[str, Any], resolve_strings: bool = True):
+    """
+    Recorre las filas del XML de una hoja y extrae sus valores
+    
+    Con context['width'] (la <dimension> de la hoja) cada fila tiene ese
+    número de columnas, como en openpyxl; sin ella, llega hasta su última
+    celda. Convierte los valores igual que openpyxl (números, booleanos, fechas según
+    el formato del estilo, fórmulas como '=...'). Si resolve_strings es False,
+    las cadenas compartidas se devuelven como índices para resolverlas en el
+    proceso principal.
+    
+    Las hojas UTF-8 sin prefijos de espacio de nombres (las que escriben Excel
+    y openpyxl) se recorren con expresiones regulares sobre el texto, sin crear
+    elementos; solo las celdas con otra forma (fórmulas, texto enriquecido,
+    atributos en otro orden) pasan por ElementTree. Las demás hojas se parsean
+    enteras con ElementTree.
+    
+    Returns:
+        Iterador de tuplas (fila, valores, columnas con índice de cadena compartida, estilo de A)
+    """
+    source, declarations = _plain_xml(source, b'worksheet')
+    if declarations is not None:
+        yield from _scan_sheet_rows(source, context, resolve_strings, f'<c {declarations}>')
+    else:
+        yield from _parse_sheet_tree(source, context, resolve_strings)
+
+
+def _column_index(letters: str, columns: Dict[str, int]) -> int:
+    """Índice (desde 0) de una columna por sus letras, con caché en columns"""
+    col = columns.get(letters)
+    if col is None:
+        col = columns[letters] = column_index_from_string(letters) - 1
+    return col
+
+
+def _scan_sheet_rows(source, context: Dict[str, Any], resolve_strings: bool, cell_open: str):
+    strings = context.get('strings')
+    width = context.get('width')
+    columns = {}
+    row_counter = 0
+    for match in _scan_xml(source, _SCAN_ROW_RE):
+        number = _SCAN_ROW_NUMBER_RE.search(match.group(1))
+        row_counter = int(number.group(1)) if number else row_counter + 1
+        values = [None] * (width or 0)
+        shared_cols = []
+        style_a = 0
+        col_counter = 0
+        for letters, style, data_type, raw, inline, attrs, body in _SCAN_CELL_RE.findall(match.group(2) or ''):
+            formula = None
+            if not letters:
+                # Forma general: atributos en cualquier orden, fórmulas, texto enriquecido...
+                found = dict(_SCAN_CELL_ATTR_RE.findall(attrs))
+                letters = found.get('r', '').rstrip('0123456789')
+                style, data_type = found.get('s', ''), found.get('t', '')
+                raw = inline = None
+                if body:
+                    for child in ET.fromstring(cell_open + body + '</c>'):
+                        if child.tag == _VALUE_TAG:
+                            raw = child.text
+                        elif child.tag == _FORMULA_TAG:
+                            formula = child.text or ''
+                        elif child.tag == _INLINE_TAG:
+                            inline = _inline_text(child)
+            else:
+                inline = _xml_text(inline) if data_type == 'inlineStr' else None
+            col = _column_index(letters, columns) if letters else col_counter
+            col_counter = col + 1
+            if width is not None and col >= width:
+                continue
+            
+            style_id = int(style) if style else 0
+            if col == 0:
+                style_a = style_id
+            data_type = data_type or 'n'
+            if formula is not None:
+                value = '=' + formula
+            elif data_type == 'inlineStr':
+                value = inline
+            elif data_type == 's' and raw:
+                if resolve_strings:
+                    value = strings[int(raw)]
+                else:
+                    value = int(raw)
+                    shared_cols.append(col)
+            else:
+                value = _cell_value(data_type, _xml_text(raw) if raw else raw, style_id, context)
+            if col >= len(values):
+                values.extend([None] * (col + 1 - len(values)))
+            values[col] = value
+        yield row_counter, values, shared_cols, style_a
+
+
+def _parse_sheet_tree(source, context: Dict[str, Any], resolve_strings: bool = True):
+    """_parse_sheet_rows con ElementTree, para hojas con prefijos o en otra codificación"""
+    strings = context.get('strings')
+    width = context.get('width')
+    columns = {}
+    row_counter = 0
+    
+    for _, element in ET.iterparse(source, events=('end',)):
+        if element.tag != _ROW_TAG:
+            continue
+        
+        row_attr = element.get('r')
+        row_counter = int(row_attr) if row_attr else row_counter + 1
+        values = [None] * (width or 0)
+        shared_cols = []
+        style_a = 0
+        col_counter = 0
+        for cell in element:
+            if cell.tag != _CELL_TAG:
+                continue
+            ref = cell.get('r')
+            col = _column_index(ref.rstrip('0123456789'), columns) if ref else col_counter
+            col_counter = col + 1
+            if width is not None and col >= width:
+                continue
+            
+            style_attr = cell.get('s')
+            style_id = int(style_attr) if style_attr else 0
+            if col == 0:
+                style_a = style_id
+            data_type = cell.get('t', 'n')
+            raw = None
+            formula = None
+            inline = None
+            for child in cell:
+                tag = child.tag
+                if tag == _VALUE_TAG:
+                    raw = child.text
+                elif tag == _FORMULA_TAG:
+                    formula = child
+                elif tag == _INLINE_TAG:
+                    inline = child
+            
+            if formula is not None:
+                value = '=' + (formula.text or '')
+            elif data_type == 'inlineStr':
+                value = _inline_text(inline) if inline is not None else None
+            elif data_type == 's' and raw:
+                if resolve_strings:
+                    value = strings[int(raw)]
+                else:
+                    value = int(raw)
+                    shared_cols.append(col)
+            else:
+                value = _cell_value(data_type, raw, style_id, context)
+            if col >= len(values):
+                values.extend([None] * (col + 1 - len(values)))
+            values[col] = value
+        
+        # Las filas ya leídas quedan vacías dentro de <sheetData> hasta el final de la hoja
+        element.clear()
+        yield row_counter, values, shared_cols, style_a
+
+
+class FastXlsxReader(InputSource):
+    """
+    Lector rápido de xlsx que no crea objetos de celda de openpyxl
+    
+    Abre el zip directamente, precarga la tabla de cadenas compartidas y los
+    estilos, y recorre el XML de la hoja activa con un parser incremental
+    extrayendo los valores y el índice de estilo de la columna A. Las hojas
+    grandes se descomprimen a un archivo temporal y se reparten por rangos de
+    bytes (en límites de <row>) entre un pool de procesos.
+    
+    Produce los mismos registros que ExcelHandler.load_file en modo read-only:
+    todas las filas con el ancho de la <dimension> de la hoja o, si no la
+    declara, hasta la última celda de cada fila. Las marcas se guardan con
+    ExcelHandler.
+    """
+    
+    PARALLEL_MIN_BYTES = 32 * 1024 ** 2  # XML de hoja a partir del cual se usa el pool
+    COPY_CHUNK = 4 * 1024 ** 2
+    
+    def __init__(self, workers: Optional[int] = None, parallel: bool = True):
+        """
+        Args:
+            workers: Procesos del pool (por defecto, núcleos disponibles)
+            parallel: Permitir el parseo en paralelo de hojas grandes
+        """
+        super().__init__()
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel = parallel
+        self.green_styles = set()
+    
+    def mark_as_processed(self, excel_row: int) -> bool:
+        """Solo lectura: las marcas se guardan con ExcelHandler"""
+        return False
+    
+    def unmark_rows_as_processed(self, excel_rows: Iterable[int]) -> bool:
+        """Solo lectura: las marcas se guardan con ExcelHandler"""
+        return False
+    
+    def has_dimension(self, file_path: str) -> bool:
+        """
+        Indica si la hoja activa declara <dimension> antes de los datos
+        
+        Sin ella, openpyxl en modo read-only recorre la hoja entera al abrirla
+        para calcular su tamaño, antes de devolver la primera fila.
+        """
+        with zipfile.ZipFile(file_path) as archive:
+            return self._sheet_dimension(archive, self._find_active_sheet(archive)[0]) is not None
     
     @staticmethod
-    def _attempt_send_text(link: str, data_number: int, target_chat: str, storage_path: str) -> bool:
-        """Fallback: Envía el enlace como mensaje de texto"""
+    def _sheet_dimension(archive: zipfile.ZipFile, sheet_path: str) -> Optional[str]:
+        """Rango de <dimension> declarado antes de los datos de la hoja ('A1:F200'), o None"""
+        with archive.open(sheet_path) as sheet:
+            head = sheet.read(64 * 1024)
+        data_start = _SHEET_DATA_RE.search(head)
+        dimension = _DIMENSION_RE.search(head)
+        if dimension is None or (data_start is not None and dimension.start() > data_start.start()):
+            return None
+        return dimension.group(1).decode('ascii', 'replace')
+    
+    @staticmethod
+    def _dimension_width(dimension: Optional[str]) -> Optional[int]:
+        """Número de columnas de un rango como 'A1:F200' (None si no se puede interpretar)"""
+        letters = (dimension or '').split(':')[-1].replace('$', '').rstrip('0123456789')
         try:
-            forward_cmd = [
-                'tdl', 'forward',
-                '--storage', f'type=bolt,path={storage_path}',
-                '--from', link,
-                '--to', target_chat,
-                '--mode', 'clone',
-                '--edit', f'"{link}"'
-            ]
+            return column_index_from_string(letters) if letters else None
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _resolve_target(base_dir: str, target: str) -> str:
+        if target.startswith('/'):
+            return target.lstrip('/')
+        return os.path.normpath(os.path.join(base_dir, target)).replace(os.sep, '/')
+    
+    def _find_active_sheet(self, archive: zipfile.ZipFile) -> Tuple[str, Any]:
+        """Devuelve (ruta del XML de la hoja activa, época de fechas)"""
+        workbook_part = 'xl/workbook.xml'
+        if '_rels/.rels' in archive.namelist():
+            for rel in ET.fromstring(archive.read('_rels/.rels')):
+                if rel.get('Type', '').endswith('/officeDocument'):
+                    workbook_part = self._resolve_target('', rel.get('Target'))
+        workbook = ET.fromstring(archive.read(workbook_part))
+        
+        properties = workbook.find(f'{{{_SHEET_NS}}}workbookPr')
+        date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+        epoch = CALENDAR_MAC_1904 if date1904 else WINDOWS_EPOCH
+        
+        active = 0
+        view = workbook.find(f'{{{_SHEET_NS}}}bookViews/{{{_SHEET_NS}}}workbookView')
+        if view is not None and view.get('activeTab'):
+            active = int(view.get('activeTab'))
+        sheets = workbook.findall(f'{{{_SHEET_NS}}}sheets/{{{_SHEET_NS}}}sheet')
+        sheet_id = sheets[min(active, len(sheets) - 1)].get(f'{{{_REL_NS}}}id')
+        
+        base_dir = os.path.dirname(workbook_part)
+        rels_path = f"{base_dir}/_rels/{os.path.basename(workbook_part)}.rels"
+        for rel in ET.fromstring(archive.read(rels_path)):
+            if rel.get('Id') == sheet_id:
+                return self._resolve_target(base_dir, rel.get('Target')), epoch
+        raise ValueError("No se encontró la hoja activa en el archivo")
+    
+    def _read_styles(self, archive: zipfile.ZipFile) -> Stylesheet:
+        if 'xl/styles.xml' not in archive.namelist():
+            return Stylesheet()
+        return Stylesheet.from_tree(fromstring(archive.read('xl/styles.xml')))
+    
+    def _read_strings(self, archive: zipfile.ZipFile) -> List[str]:
+        if 'xl/sharedStrings.xml' not in archive.namelist():
+            return []
+        with archive.open('xl/sharedStrings.xml') as handle:
+            return _read_shared_strings(handle)
+    
+    def iter_records(self, file_path: str,
+                     progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
+        self.file_path = file_path
+        with open(file_path, 'rb') as handle, zipfile.ZipFile(handle) as archive:
+            self._stream = handle
+            sheet_path, epoch = self._find_active_sheet(archive)
+            stylesheet = self._read_styles(archive)
+            self.green_styles = green_style_ids(stylesheet.fills, stylesheet.cell_styles)
+            context = {
+                'date_formats': stylesheet.date_formats,
+                'timedelta_formats': stylesheet.timedelta_formats,
+                'epoch': epoch,
+                'width': self._dimension_width(self._sheet_dimension(archive, sheet_path)),
+            }
+            sheet_size = archive.getinfo(sheet_path).file_size
             
-            print(f"📤 Executing text forward command: {' '.join(forward_cmd)}")
+            if self.parallel and self.workers > 1 and sheet_size >= self.PARALLEL_MIN_BYTES:
+                rows = self._iter_parallel(archive, sheet_path, context)
+            else:
+                context['strings'] = self._read_strings(archive)
+                rows = _parse_sheet_rows(archive.open(sheet_path), context)
             
-            result = subprocess.run(
-                forward_cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            count = 0
+            green_styles = self.green_styles
+            for row_num, values, _, style_a in rows:
+                if row_num == 1:
+                    self.headers = tuple(values)
+                if row_num < 2 or not values or not values[0]:
+                    continue
+                count += 1
+                row = tuple(values)
+                yield {
+                    'excel_row': row_num,
+                    'data': row,
+                    'link': row[0],
+                    'is_clicked': style_a in green_styles
+                }
+                if progress_callback and count % self.PROGRESS_EVERY == 0:
+                    progress_callback(count)
+    
+    def _iter_parallel(self, archive: zipfile.ZipFile, sheet_path: str, context: Dict[str, Any]):
+        """Descomprime la hoja, la divide en rangos de filas y los parsea en el pool"""
+        handle, xml_path = tempfile.mkstemp(prefix='fast-xlsx-', suffix='.xml')
+        try:
+            with os.fdopen(handle, 'wb') as out, archive.open(sheet_path) as sheet:
+                while True:
+                    block = sheet.read(self.COPY_CHUNK)
+                    if not block:
+                        break
+                    out.write(block)
             
-            if result.returncode == 0:
-                print("✅ Text message sent successfully!")
-                return True
-            else:
-                print(f"⚠️ Text forward failed, trying alternative method...")
-                return TelegramOperations._attempt_send_via_echo(link, data_number, target_chat, storage_path)
-                
-        except Exception as e:
-            print(f"❌ Text forward error: {str(e)}")
-            return TelegramOperations._attempt_send_via_echo(link, data_number, target_chat, storage_path)
+            ranges, prefix, suffix = self._split_ranges(xml_path)
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_fast_xlsx_init,
+                                     initargs=(context,)) as pool:
+                tasks = [(xml_path, start, end, prefix, suffix) for start, end in ranges]
+                chunks = pool.map(_fast_xlsx_parse_chunk, tasks)
+                # Las cadenas compartidas se cargan mientras el pool trabaja
+                strings = self._read_strings(archive)
+                for chunk in chunks:
+                    for row_num, values, shared_cols, style_a in chunk:
+                        for col in shared_cols:
+                            values[col] = strings[values[col]]
+                        yield row_num, values, shared_cols, style_a
+        finally:
+            try:
+                os.remove(xml_path)
+            except OSError:
+                pass
+    
+    def _split_ranges(self, xml_path: str) -> Tuple[List[Tuple[int, int]], bytes, bytes]:
+        """
+        Divide <sheetData> en rangos de bytes que empiezan en una etiqueta <row
+        
+        Returns:
+            (rangos, prefijo XML hasta <sheetData>, sufijo de cierre)
+        """
+        size = os.path.getsize(xml_path)
+        with open(xml_path, 'rb') as handle:
+            head = handle.read(min(size, 1024 * 1024))
+            match = re.search(rb'<((?:\w+:)?)sheetData[^>]*>', head)
+            if match is None or head[match.end() - 2:match.end()] == b'/>':
+                return [], b'', b''
+            prefix = head[:match.end()]
+            tag_prefix = match.group(1)
+            row_open = b'<' + tag_prefix + b'row'
+            suffix = b'</' + tag_prefix + b'sheetData></' + tag_prefix + b'worksheet>'
+            
+            first_row = head.find(row_open, match.end())
+            if first_row < 0:
+                return [], prefix, suffix
+            end_marker = b'</' + tag_prefix + b'sheetData>'
+            handle.seek(max(0, size - 1024 * 1024))
+            tail = handle.read()
+            data_end = size - len(tail) + tail.rfind(end_marker)
+            
+            boundaries = [first_row]
+            step = max(1, (data_end - first_row) // (self.workers * 4))
+            position = first_row + step
+            while position < data_end:
+                boundary = self._next_row_offset(handle, position, data_end, row_open)
+                if boundary < 0:
+                    break
+                boundaries.append(boundary)
+                position = boundary + step
+            boundaries.append(data_end)
+        return list(zip(boundaries[:-1], boundaries[1:])), prefix, suffix
     
     @staticmethod
-    def _attempt_send_via_echo(link: str, data_number: int, target_chat: str, storage_path: str) -> bool:
-        """Método alternativo usando archivo temporal"""
+    def _next_row_offset(handle, position: int, limit: int, row_open: bytes) -> int:
+        """Posición de la siguiente etiqueta de fila desde position (-1 si no hay antes de limit)"""
+        window_size = 64 * 1024
+        while position < limit:
+            handle.seek(position)
+            window = handle.read(min(window_size, limit - position))
+            hits = [found for found in (window.find(row_open + b' '), window.find(row_open + b'>'))
+                    if found >= 0]
+            if hits:
+                return position + min(hits)
+            if len(window) <= len(row_open):
+                break
+            position += len(window) - len(row_open)
+        return -1
+
+
+class XlsxStylePatcher:
+    """
+    Guarda las marcas de procesado editando el zip del xlsx sin cargar el workbook
+    
+    Solo se reescriben dos miembros: en styles.xml se añade (o reutiliza) el
+    relleno 90EE90 y un formato de celda por cada estilo base marcado, y en el
+    XML de la hoja se cambia el atributo s= de las celdas de la columna A
+    afectadas, en streaming. El resto de miembros se copia en streaming con la
+    API pública de zipfile, con su compresión original. Antes de sustituir el
+    original, el archivo nuevo se comprueba (mismos miembros, CRC correctos);
+    si algo falla, el original no se toca.
+    """
+    
+    CHUNK = 1024 ** 2
+    TARGETED_ROWS = 2000  # hasta aquí el patrón solo reconoce las filas a guardar
+    _CELL_A = re.compile(rb'<c\b[^>]*?\br="A(\d+)"[^>]*>')
+    _STYLE_ATTR = re.compile(rb'\bs="(\d+)"')
+    _FILLS = re.compile(r'(<fills\b[^>]*?)(?:/>|>(.*?)</fills>)', re.S)
+    _CELL_XFS = re.compile(r'(<cellXfs\b[^>]*?)(?:/>|>(.*?)</cellXfs>)', re.S)
+    _FILL = re.compile(r'<fill\b[^>]*?(?:/>|>.*?</fill>)', re.S)
+    _XF = re.compile(r'<xf\b[^>]*?(?:/>|>.*?</xf>)', re.S)
+    _FG_RGB = re.compile(r'<fgColor\b[^>]*?\brgb="([0-9A-Fa-f]{6,8})"')
+    GREEN_FILL_XML = ('<fill><patternFill patternType="solid"><fgColor rgb="0090EE90"/>'
+                      '<bgColor rgb="0090EE90"/></patternFill></fill>')
+    
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+    
+    def apply(self, rows: Dict[int, bool]) -> bool:
+        """
+        Args:
+            rows: Número de fila de Excel -> True para marcar en verde, False para quitarlo
+            
+        Returns:
+            True si se guardaron todas las filas; False si el archivo no se puede
+            parchear (sin tocarlo), para que el llamador use openpyxl
+        """
+        if not rows:
+            return True
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        handle, temp_path = tempfile.mkstemp(prefix='.~patch-', suffix='.xlsx', dir=directory)
+        os.close(handle)
         try:
-            temp_file = os.path.join('/tmp', 'temp_link.txt')
-            with open(temp_file, 'w') as f:
-                f.write(link)
+            with zipfile.ZipFile(self.file_path) as source:
+                sheet_path = FastXlsxReader()._find_active_sheet(source)[0]
+                if 'xl/styles.xml' not in source.namelist():
+                    return False
+                styles = _PatchedStyles(source.read('xl/styles.xml').decode('utf-8'))
+                if not styles.valid:
+                    return False
+                found = set()
+                with zipfile.ZipFile(temp_path, 'w') as target:
+                    styles_info = sheet_done = None
+                    for info in source.infolist():
+                        if info.filename == 'xl/styles.xml' and not sheet_done:
+                            styles_info = info  # depende de la hoja: se escribe después de ella
+                        elif info.filename == 'xl/styles.xml':
+                            target.writestr(self._new_info(info), styles.render().encode('utf-8'))
+                        elif info.filename == sheet_path:
+                            self._patch_sheet(source, target, info, rows, styles, found)
+                            sheet_done = True
+                        else:
+                            self._copy_member(source, target, info)
+                    if styles_info is not None:
+                        target.writestr(self._new_info(styles_info), styles.render().encode('utf-8'))
+                if len(found) != len(rows) or not self._verify(source, temp_path):
+                    return False
+            shutil.copymode(self.file_path, temp_path)
+            os.replace(temp_path, self.file_path)
+            return True
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def _patch_sheet(self, source, target, info, rows, styles, found):
+        def replace(match):
+            row = int(match.group(1))
+            processed = rows.get(row)
+            if processed is None:
+                return match.group(0)
+            found.add(row)
+            tag = match.group(0)
+            style = self._STYLE_ATTR.search(tag)
+            base = int(style.group(1)) if style else 0
+            new = styles.variant(base, processed)
+            if new == base:
+                return tag
+            if style:
+                return tag[:style.start(1)] + str(new).encode() + tag[style.end(1):]
+            end = -2 if tag.endswith(b'/>') else -1
+            return tag[:end] + b' s="%d"' % new + tag[end:]
+        
+        cells = self._CELL_A
+        if len(rows) <= self.TARGETED_ROWS:
+            numbers = b'|'.join(str(row).encode() for row in rows)
+            cells = re.compile(rb'<c\b[^>]*?\br="A(' + numbers + rb')"[^>]*>')
+        large = info.file_size * 2 > zipfile.ZIP64_LIMIT
+        with source.open(info) as reader, target.open(self._new_info(info), 'w', force_zip64=large) as writer:
+            tail = b''
+            while True:
+                block = reader.read(self.CHUNK)
+                data = tail + block
+                if block:
+                    cut = data.rfind(b'<')
+                    data, tail = data[:cut], data[cut:]  # una etiqueta nunca queda partida
+                writer.write(cells.sub(replace, data))
+                if not block:
+                    break
+    
+    @staticmethod
+    def _new_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+        new = zipfile.ZipInfo(info.filename, info.date_time)
+        new.compress_type = zipfile.ZIP_DEFLATED
+        new.external_attr = info.external_attr
+        return new
+    
+    def _copy_member(self, source: zipfile.ZipFile, target: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """Copia un miembro con la API pública de zipfile, conservando su compresión"""
+        new = zipfile.ZipInfo(info.filename, info.date_time)
+        new.compress_type = info.compress_type
+        new.external_attr = info.external_attr
+        new.comment = info.comment
+        large = info.file_size * 2 > zipfile.ZIP64_LIMIT
+        with source.open(info) as reader, target.open(new, 'w', force_zip64=large) as writer:
+            shutil.copyfileobj(reader, writer, self.CHUNK)
+    
+    @staticmethod
+    def _verify(source: zipfile.ZipFile, temp_path: str) -> bool:
+        """Comprueba el archivo parcheado (mismos miembros y CRC correctos) antes de sustituir el original"""
+        with zipfile.ZipFile(temp_path) as patched:
+            if patched.namelist() != source.namelist():
+                return False
+            broken = patched.testzip()
+        if broken is not None:
+            print(f"⚠️ El xlsx parcheado tiene {broken} dañado; se descarta")
+            return False
+        return True
 
-            forward_cmd = [
-                'tdl', 'forward',
-                '--storage', f'type=bolt,path={storage_path}',
-                '--from', f'file://{temp_file}',
-                '--to', target_chat,
-                '--mode', 'clone',
-            ]
 
-            print(f"📢 Executing fallback command using echo: {' '.join(forward_cmd)}")
+class _PatchedStyles:
+    """Tabla de rellenos y formatos de celda de styles.xml con los cambios de XlsxStylePatcher"""
+    
+    def __init__(self, xml: str):
+        self.xml = xml
+        self._fills_match = XlsxStylePatcher._FILLS.search(xml)
+        self._xfs_match = XlsxStylePatcher._CELL_XFS.search(xml)
+        self.valid = self._fills_match is not None and self._xfs_match is not None
+        if not self.valid:
+            return
+        self.fills = XlsxStylePatcher._FILL.findall(self._fills_match.group(2) or '')
+        self.xfs = XlsxStylePatcher._XF.findall(self._xfs_match.group(2) or '')
+        self.valid = bool(self.xfs)
+        self._green_fills = set()
+        for index, fill in enumerate(self.fills):
+            rgb = XlsxStylePatcher._FG_RGB.search(fill)
+            if rgb and rgb.group(1)[-6:].upper() == GREEN_RGB:
+                self._green_fills.add(index)
+        self._xf_ids = {}
+        for index, xf in enumerate(self.xfs):
+            self._xf_ids.setdefault(xf, index)
+        self._variants = {}
+        self.changed = False
+    
+    @staticmethod
+    def _set_attr(xf: str, name: str, value: str) -> str:
+        end = xf.index('>')
+        start_tag = xf[:end]
+        pattern = re.compile(rf'\b{name}="[^"]*"')
+        if pattern.search(start_tag):
+            start_tag = pattern.sub(f'{name}="{value}"', start_tag, count=1)
+        elif start_tag.endswith('/'):
+            start_tag = f'{start_tag[:-1]} {name}="{value}"/'
+        else:
+            start_tag = f'{start_tag} {name}="{value}"'
+        return start_tag + xf[end:]
+    
+    def _green_fill(self) -> int:
+        if not self._green_fills:
+            self.fills.append(XlsxStylePatcher.GREEN_FILL_XML)
+            self._green_fills.add(len(self.fills) - 1)
+            self.changed = True
+        return min(self._green_fills)
+    
+    def variant(self, base: int, processed: bool) -> int:
+        """Índice del formato igual a base pero con (o sin) el relleno verde"""
+        key = (base, processed)
+        if key in self._variants:
+            return self._variants[key]
+        xf = self.xfs[base] if base < len(self.xfs) else self.xfs[0]
+        fill = re.search(r'\bfillId="(\d+)"', xf[:xf.index('>')])
+        is_green = fill is not None and int(fill.group(1)) in self._green_fills
+        if is_green == processed:
+            result = base
+        else:
+            xf = self._set_attr(xf, 'fillId', str(self._green_fill() if processed else 0))
+            xf = self._set_attr(xf, 'applyFill', '1')
+            result = self._xf_ids.get(xf)
+            if result is None:
+                self.xfs.append(xf)
+                result = self._xf_ids[xf] = len(self.xfs) - 1
+                self.changed = True
+        self._variants[key] = result
+        return result
+    
+    def render(self) -> str:
+        if not self.changed:
+            return self.xml
+        fills_tag = self._set_attr(self._fills_match.group(1) + '>', 'count', str(len(self.fills)))
+        xfs_tag = self._set_attr(self._xfs_match.group(1) + '>', 'count', str(len(self.xfs)))
+        fills = fills_tag + ''.join(self.fills) + '</fills>'
+        xfs = xfs_tag + ''.join(self.xfs) + '</cellXfs>'
+        (first, first_text), (second, second_text) = sorted([
+            (self._fills_match, fills), (self._xfs_match, xfs)
+        ], key=lambda pair: pair[0].start())
+        return (self.xml[:first.start()] + first_text + self.xml[first.end():second.start()]
+                + second_text + self.xml[second.end():])
 
-            result = subprocess.run(
-                forward_cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
 
-            os.remove(temp_file)
+def open_input_source(file_path: str, keep_workbook: bool = True,
+                      fast_reader: bool = False, zip_saves: bool = False) -> InputSource:
+    """Crea la fuente adecuada según la extensión del archivo"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in ('.csv', '.tsv', '.txt'):
+        return CsvSource()
+    if extension == '.json':
+        return TdlJsonSource()
+    return ExcelHandler(keep_workbook=keep_workbook, fast_reader=fast_reader, zip_saves=zip_saves)
 
-            if result.returncode == 0:
-                print("✅ Fallback message sent successfully!")
-                return True
-            else:
-                print(f"❌ Fallback failed, return code: {result.returncode}, error: {result.stderr}")
-                return False
 
+class ExcelHandler(InputSource):
+    """Maneja todas las operaciones relacionadas con archivos Excel"""
+    
+    def __init__(self, keep_workbook: bool = True, fast_reader: bool = False,
+                 workers: Optional[int] = None, zip_saves: bool = False):
+        """
+        Args:
+            keep_workbook: Mantener el workbook en memoria tras la carga; si es False
+                           se lee en modo read-only y se reabre solo para guardar marcas
+            fast_reader: Leer con FastXlsxReader; el workbook se abre únicamente al
+                         guardar marcas
+            workers: Procesos para el parseo en paralelo del lector rápido
+            zip_saves: Guardar las marcas con XlsxStylePatcher en lugar de workbook.save
+                       (openpyxl queda como respaldo si el archivo no se puede parchear)
+        """
+        super().__init__()
+        self.workbook = None
+        self.worksheet = None
+        self.keep_workbook = keep_workbook
+        self.fast_reader = fast_reader
+        self.workers = workers
+        self.zip_saves = zip_saves
+        self.green_fill = PatternFill(start_color='90EE90', end_color='90EE90', fill_type='solid')
+    
+    def iter_records(self, file_path: str,
+                     progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre las filas del archivo como registros de DataManager sin acumularlas
+        
+        Con keep_workbook=False el archivo se lee en modo read-only y el workbook
+        se libera al terminar.
+        
+        Args:
+            file_path: Ruta del archivo Excel
+            progress_callback: Función opcional que recibe el número de filas leídas
+            
+        Returns:
+            Iterador de registros {'excel_row', 'data', 'link', 'is_clicked'}
+        """
+        self.file_path = file_path
+        fast_reader = self.fast_reader
+        if not fast_reader and not self.keep_workbook:
+            # openpyxl recorrería la hoja entera antes de la primera fila
+            fast_reader = not FastXlsxReader().has_dimension(file_path)
+        if fast_reader:
+            self.workbook = None
+            self.worksheet = None
+            reader = FastXlsxReader(workers=self.workers)
+            self._stream = reader  # bytes_read delega en el lector
+            try:
+                yield from reader.iter_records(file_path, progress_callback)
+            finally:
+                self._stream = None
+            self.headers = reader.headers
+            return
+        if self.keep_workbook:
+            self.workbook = openpyxl.load_workbook(file_path)
+            self.worksheet = self.workbook.active
+            worksheet = self.worksheet
+        else:
+            self.workbook = None
+            self.worksheet = None
+            self._stream = open(file_path, 'rb')
+            read_only_workbook = openpyxl.load_workbook(self._stream, read_only=True)
+            worksheet = read_only_workbook.active
+        
+        try:
+            if worksheet is None:
+                return
+            workbook = worksheet.parent
+            green_styles = green_style_ids(workbook._fills, workbook._cell_styles)
+            count = 0
+            self.headers = None
+            for row_num, cells in enumerate(worksheet.iter_rows(), start=1):
+                row = tuple(cell.value for cell in cells)
+                if row_num == 1:
+                    self.headers = row
+                elif row and row[0]:
+                    is_green = self._style_id(cells[0]) in green_styles
+                    count += 1
+                    yield {
+                        'excel_row': row_num,
+                        'data': row,
+                        'link': row[0],
+                        'is_clicked': is_green
+                    }
+                    if progress_callback and count % self.PROGRESS_EVERY == 0:
+                        progress_callback(count)
+        finally:
+            if not self.keep_workbook:
+                read_only_workbook.close()
+                self._stream.close()
+                self._stream = None
+    
+    def _ensure_workbook(self) -> bool:
+        """Abre el workbook completo si no está cargado (necesario para guardar)"""
+        if self.workbook is None and self.file_path is not None:
+            self.workbook = openpyxl.load_workbook(self.file_path)
+            self.worksheet = self.workbook.active
+        return self.workbook is not None and self.worksheet is not None
+    
+    def _release_workbook(self):
+        """Libera el workbook si no se debe mantener en memoria"""
+        if not self.keep_workbook:
+            self.workbook = None
+            self.worksheet = None
+    
+    @staticmethod
+    def _style_id(cell) -> int:
+        """Índice de estilo de la celda sin materializar sus objetos de estilo"""
+        style_id = getattr(cell, '_style_id', None)  # celdas de modo read-only
+        if style_id is None:
+            style_id = cell.parent.parent._cell_styles.add(cell._style)
+        return style_id
+    
+    def _is_cell_green(self, cell) -> bool:
+        """Verifica si una celda tiene el formato verde (ya procesada)"""
+        return bool(cell) and is_green_fill(cell.fill)
+    
+    def mark_as_processed(self, excel_row: int) -> bool:
+        """
+        Marca una fila como procesada (color verde)
+        
+        Args:
+            excel_row: Número de fila en Excel
+            
+        Returns:
+            True si se marcó correctamente, False en caso contrario
+        """
+        return self._fill_rows([excel_row], self.green_fill)
+    
+    def mark_rows_as_processed(self, excel_rows: Iterable[int]) -> bool:
+        """Marca varias filas como procesadas con un solo guardado del workbook"""
+        return self._fill_rows(excel_rows, self.green_fill)
+    
+    def unmark_rows_as_processed(self, excel_rows: Iterable[int]) -> bool:
+        """Quita el verde de varias filas con un solo guardado del workbook"""
+        return self._fill_rows(excel_rows, PatternFill(fill_type=None))
+    
+    def _fill_rows(self, excel_rows: Iterable[int], fill: PatternFill) -> bool:
+        excel_rows = list(excel_rows)
+        if self.zip_saves and self.file_path is not None and self._patch_rows(excel_rows, fill):
+            return True
+        try:
+            if self.file_path is not None and self._ensure_workbook():
+                for excel_row in excel_rows:
+                    self.worksheet.cell(row=excel_row, column=1).fill = fill
+                self.workbook.save(self.file_path)
+                return True
+            return False
         except Exception as e:
-            print(f"❌ Error during echo-based fallback: {str(e)}")
+            print(f"Error al guardar las marcas: {str(e)}")
+            return False
+        finally:
+            self._release_workbook()
+    
+    def _patch_rows(self, excel_rows: List[int], fill: PatternFill) -> bool:
+        """Guarda las marcas editando el zip; el workbook en memoria, si lo hay, se actualiza igual"""
+        processed = fill.fill_type is not None
+        try:
+            if not XlsxStylePatcher(self.file_path).apply(dict.fromkeys(excel_rows, processed)):
+                return False
+        except Exception as e:  # cualquier sorpresa del zip o del XML: se guarda con openpyxl
+            print(f"⚠️ No se pudo parchear {self.file_path}, se guarda con openpyxl: {str(e)}")
             return False
+        if self.worksheet is not None:
+            for excel_row in excel_rows:
+                self.worksheet.cell(row=excel_row, column=1).fill = fill
+        return True
 
 
-class DataManager:
-    """Maneja la paginación y filtrado de datos"""
+class StallDetected(subprocess.SubprocessError):
+    """Un proceso de tdl dejó de avanzar durante stall_seconds y se terminó"""
+    
+    def __init__(self, cmd: List[str], stall_seconds: float, progress: Optional[Dict[str, Any]] = None):
+        self.cmd = cmd
+        self.stall_seconds = stall_seconds
+        self.progress = progress
+        super().__init__(f"tdl {cmd[1] if len(cmd) > 1 else ''} sin progreso durante {stall_seconds:.0f}s")
+
+
+def run_tdl_process(cmd: List[str], timeout: float,
+                    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                    stall_seconds: Optional[float] = None) -> subprocess.CompletedProcess:
+    """
+    Ejecuta un comando leyendo stdout y stderr mientras corre
+    
+    Cada línea de progreso (tdl las separa con saltos de línea o retornos de
+    carro) se pasa a on_progress ya interpretada. Si tras la primera línea de
+    progreso pasan stall_seconds sin actividad (bytes que avanzan o cualquier
+    línea que no sea una barra repetida), el proceso se mata y se lanza
+    StallDetected; los comandos que no informan de progreso (forward directo)
+    solo están limitados por el timeout. Un FLOOD_WAIT anunciado detiene el
+    reloj de atasco y alarga el timeout durante la espera, que tdl cumple
+    durmiendo sin dar señales.
+    
+    Returns:
+        CompletedProcess con stdout y stderr como texto
+        
+    Raises:
+        subprocess.TimeoutExpired, StallDetected
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out_fd, err_fd = process.stdout.fileno(), process.stderr.fileno()
+    chunks = {out_fd: [], err_fd: []}
+    partial = {out_fd: b'', err_fd: b''}
+    open_fds = {out_fd, err_fd}
+    transferred = {}  # archivo -> bytes (tdl muestra una barra por archivo)
+    progress = None
+    started = last_advance = time.monotonic()
+    deadline = started + timeout
+    
+    def text(fd):
+        return b''.join(chunks[fd]).decode('utf-8', 'replace')
+    
+    try:
+        while open_fds:
+            now = time.monotonic()
+            if now > deadline:
+                raise subprocess.TimeoutExpired(cmd, timeout, text(out_fd), text(err_fd))
+            if stall_seconds and progress is not None and now - last_advance > stall_seconds:
+                raise StallDetected(cmd, stall_seconds, progress)
+            ready, _, _ = select.select(list(open_fds), [], [], 0.25)
+            for fd in ready:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    open_fds.discard(fd)
+                    continue
+                chunks[fd].append(chunk)
+                lines = re.split(rb'[\r\n]', partial[fd] + chunk)
+                partial[fd] = lines.pop()
+                for line in lines:
+                    decoded = line.decode('utf-8', 'replace') if line.strip() else ''
+                    parsed = parse_tdl_progress(decoded) if decoded else None
+                    if parsed is None:
+                        if decoded:
+                            flood = _TDL_FLOOD_WAIT_RE.search(decoded)
+                            wait = int(flood.group(1) or flood.group(2)) if flood else 0
+                            # El reloj de atasco empieza a contar al acabar la espera
+                            last_advance = max(last_advance, time.monotonic() + wait)
+                            deadline += wait
+                        continue
+                    if progress is None or parsed['bytes'] != transferred.get(parsed['name']):
+                        last_advance = time.monotonic()
+                    transferred[parsed['name']] = parsed['bytes']
+                    progress = parsed
+                    if on_progress:
+                        on_progress(parsed)
+        returncode = process.wait(timeout=max(0.1, deadline - time.monotonic()))
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        process.stdout.close()
+        process.stderr.close()
+    return subprocess.CompletedProcess(cmd, returncode, text(out_fd), text(err_fd))
+
+
+class TelegramOperations:
+    """Maneja todas las operaciones relacionadas con Telegram"""
+    
+    @staticmethod
+    def open_link(link: str) -> bool:
+        """
+        Abre un enlace en Telegram
+        
+        Args:
+            link: URL del enlace de Telegram
+            
+        Returns:
+            True si se abrió correctamente, False en caso contrario
+        """
+        try:
+            parsed = parse_telegram_link(link) if link.startswith('https://t.me/c/') else None
+            if parsed:
+                channel, post = parsed
+                telegram_link = f"tg://privatepost?channel={channel}&post={post}"
+                subprocess.run(['open', telegram_link])
+            else:
+                subprocess.run(['open', link])
+            return True
+        except Exception as e:
+            print(f"Error al abrir el enlace: {str(e)}")
+            return False
+    
+    @staticmethod
+    def download_with_tlg(link: str) -> bool:
+        """
+        Descarga contenido usando el comando tlg
+        
+        Args:
+            link: URL del contenido a descargar
+            
+        Returns:
+            True si se ejecutó correctamente, False en caso contrario
+        """
+        try:
+            applescript = f'''
+            tell application "iTerm"
+                if (count of windows) = 0 then
+                    create window with default profile
+                end if
+                
+                tell current window
+                    create tab with default profile
+                    tell current session
+                        write text "tlg 1 {link}"
+                    end tell
+                end tell
+            end tell
+            '''
+            
+            subprocess.run(['osascript', '-e', applescript])
+            return True
+        except Exception as e:
+            print(f"Error al ejecutar tlg: {str(e)}")
+            return False
+    
+    @staticmethod
+    def download_with_tdl(link: str, directory: str, data_number: int = 1, threads: int = 4, limit: int = 2,
+                          size_bytes: Optional[int] = None, duration_seconds: Optional[float] = None,
+                          timeouts: Optional[AdaptiveTimeout] = None,
+                          on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                          stall_seconds: Optional[float] = None) -> bool:
+        """
+        Descarga un enlace con tdl dl en directory
+        
+        Args:
+            link: URL del contenido
+            directory: Carpeta de destino
+            data_number: Número de cuenta de Telegram
+            threads, limit: Opciones -t y -l de tdl
+            size_bytes, duration_seconds, timeouts, on_progress, stall_seconds: Como en forward_with_tdl
+            
+        Returns:
+            True si tdl terminó correctamente, False en caso contrario
+            
+        Raises:
+            StallDetected: tdl dejó de avanzar
+        """
+        storage_path = os.path.expanduser(f"~/.tdl/oktelegram{data_number}")
+        download_cmd = [
+            'tdl', 'dl',
+            '--storage', f'type=bolt,path={storage_path}',
+            '-u', link,
+            '-d', directory,
+            '-t', str(threads),
+            '-l', str(limit)
+        ]
+        job = {
+            'account': data_number,
+            'size_bytes': size_bytes,
+            'duration_seconds': duration_seconds,
+            'timeouts': timeouts,
+            'on_progress': on_progress,
+            'stall_seconds': stall_seconds
+        }
+        try:
+            print(f"⬇️ Executing download command: {' '.join(download_cmd)}")
+            result = TelegramOperations._run_tdl(download_cmd, 60, job)
+        except subprocess.TimeoutExpired as e:
+            print(f"⏰ Download command timed out after {e.timeout:.0f}s")
+            return False
+        except StallDetected:
+            raise
+        except Exception as e:
+            print(f"❌ Download command error: {str(e)}")
+            return False
+        if result.returncode == 0:
+            print("✅ Download successful!")
+            return True
+        print(f"⚠️ Download failed with code {result.returncode}")
+        print(f"Error output: {result.stderr}")
+        return False
+    
+    @staticmethod
+    def forward_with_tdl(link: str, data_number: int = 1, target_chat: str = "2532518781",
+                         size_bytes: Optional[int] = None, duration_seconds: Optional[float] = None,
+                         timeouts: Optional[AdaptiveTimeout] = None,
+                         on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                         stall_seconds: Optional[float] = None,
+                         report: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Reenvía contenido usando tdl con fallback a mensaje de texto
+        
+        Args:
+            link: URL del contenido a reenviar
+            data_number: Número de cuenta de Telegram
+            target_chat: ID del chat destino
+            size_bytes: Tamaño del contenido (columna Size), para el timeout adaptativo
+            duration_seconds: Duración del contenido (columna Duration)
+            timeouts: Modelo de timeouts adaptativos; sin él se usan los timeouts fijos
+            on_progress: Función opcional que recibe el progreso interpretado de tdl
+            stall_seconds: Segundos sin progreso tras los que se mata tdl
+            report: Dict opcional que recibe 'fallback': True si se recurrió al envío como texto
+            
+        Returns:
+            True si se reenviió correctamente, False en caso contrario
+            
+        Raises:
+            StallDetected: tdl dejó de avanzar; el llamador puede reprogramar el trabajo
+        """
+        try:
+            storage_path = os.path.expanduser(f"~/.tdl/oktelegram{data_number}")
+            job = {
+                'account': data_number,
+                'size_bytes': size_bytes,
+                'duration_seconds': duration_seconds,
+                'timeouts': timeouts,
+                'on_progress': on_progress,
+                'stall_seconds': stall_seconds
+            }
+            
+            # Intento directo de reenvío
+            success = TelegramOperations._attempt_direct_forward(link, data_number, target_chat, storage_path, job)
+            
+            if not success:
+                print("🔄 Forward failed, attempting to send as text message...")
+                if report is not None:
+                    report['fallback'] = True
+                # El texto no transfiere el contenido: sin tamaño no cuenta para el throughput
+                text_job = dict(job, size_bytes=None, duration_seconds=None)
+                success = TelegramOperations._attempt_send_text(link, data_number, target_chat, storage_path,
+                                                                text_job)
+            
+            return success
+            
+        except StallDetected:
+            raise
+        except Exception as e:
+            print(f"Error en forward_with_tdl: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _run_tdl(cmd: List[str], default_timeout: float,
+                 job: Optional[Dict[str, Any]] = None) -> subprocess.CompletedProcess:
+        """
+        Ejecuta un comando tdl con el timeout adaptativo del trabajo
+        
+        Registra en el modelo la duración de los comandos exitosos y los
+        timeouts, para que los siguientes cálculos se ajusten; solo los trabajos
+        con tamaño o duración actualizan el throughput. La salida se lee
+        mientras corre: el progreso va a job['on_progress'] y los procesos sin
+        avance durante job['stall_seconds'] se matan (StallDetected).
+        """
+        job = job or {}
+        on_progress, stall_seconds = job.get('on_progress'), job.get('stall_seconds')
+        timeouts = job.get('timeouts')
+        if timeouts is None:
+            return run_tdl_process(cmd, default_timeout, on_progress, stall_seconds)
+        
+        timeout = job.get('timeout') or timeouts.timeout_for(job['account'], job['size_bytes'],
+                                                              job['duration_seconds'])
+        started = time.monotonic()
+        try:
+            result = run_tdl_process(cmd, timeout, on_progress, stall_seconds)
+        except subprocess.TimeoutExpired:
+            timeouts.record_timeout(job['account'], job['size_bytes'], timeout, job['duration_seconds'])
+            raise
+        if result.returncode == 0:
+            timeouts.record_success(job['account'], job['size_bytes'], time.monotonic() - started,
+                                    job['duration_seconds'])
+        return result
+    
+    @staticmethod
+    def _attempt_direct_forward(link: str, data_number: int, target_chat: str, storage_path: str,
+                                job: Optional[Dict[str, Any]] = None) -> bool:
+        """Intenta reenviar directamente usando tdl forward"""
+        try:
+            forward_cmd = [
+                'tdl', 'forward',
+                '--storage', f'type=bolt,path={storage_path}',
+                '--from', link,
+                '--to', target_chat,
+                '--mode', 'direct'
+            ]
+
+            print(f"🚀 Executing forward command: {' '.join(forward_cmd)}")
+
+            result = TelegramOperations._run_tdl(forward_cmd, 60, job)
+
+            if result.returncode == 0:
+                print("✅ Forward successful!")
+                return True
+            else:
+                print(f"⚠️ Forward failed with code {result.returncode}")
+                print(f"Error output: {result.stderr}")
+                return False
+
+        except subprocess.TimeoutExpired as e:
+            print(f"⏰ Forward command timed out after {e.timeout:.0f}s")
+            return False
+        except StallDetected:
+            raise
+        except Exception as e:
+            print(f"❌ Forward command error: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _attempt_send_text(link: str, data_number: int, target_chat: str, storage_path: str,
+                           job: Optional[Dict[str, Any]] = None) -> bool:
+        """Fallback: Envía el enlace como mensaje de texto"""
+        try:
+            forward_cmd = [
+                'tdl', 'forward',
+                '--storage', f'type=bolt,path={storage_path}',
+                '--from', link,
+                '--to', target_chat,
+                '--mode', 'clone',
+                '--edit', f'"{link}"'
+            ]
+            
+            print(f"📤 Executing text forward command: {' '.join(forward_cmd)}")
+            
+            result = TelegramOperations._run_tdl(forward_cmd, 30, job)
+            
+            if result.returncode == 0:
+                print("✅ Text message sent successfully!")
+                return True
+            else:
+                print(f"⚠️ Text forward failed, trying alternative method...")
+                return TelegramOperations._attempt_send_via_echo(link, data_number, target_chat, storage_path, job)
+                
+        except StallDetected:
+            raise
+        except Exception as e:
+            print(f"❌ Text forward error: {str(e)}")
+            return TelegramOperations._attempt_send_via_echo(link, data_number, target_chat, storage_path, job)
+    
+    @staticmethod
+    def _attempt_send_via_echo(link: str, data_number: int, target_chat: str, storage_path: str,
+                               job: Optional[Dict[str, Any]] = None) -> bool:
+        """Método alternativo usando archivo temporal"""
+        try:
+            temp_file = os.path.join('/tmp', 'temp_link.txt')
+            with open(temp_file, 'w') as f:
+                f.write(link)
+
+            forward_cmd = [
+                'tdl', 'forward',
+                '--storage', f'type=bolt,path={storage_path}',
+                '--from', f'file://{temp_file}',
+                '--to', target_chat,
+                '--mode', 'clone',
+            ]
+
+            print(f"📢 Executing fallback command using echo: {' '.join(forward_cmd)}")
+
+            try:
+                result = TelegramOperations._run_tdl(forward_cmd, 30, job)
+            finally:
+                os.remove(temp_file)
+
+            if result.returncode == 0:
+                print("✅ Fallback message sent successfully!")
+                return True
+            else:
+                print(f"❌ Fallback failed, return code: {result.returncode}, error: {result.stderr}")
+                return False
+
+        except StallDetected:
+            raise
+        except Exception as e:
+            print(f"❌ Error during echo-based fallback: {str(e)}")
+            return False
+    
+    @staticmethod
+    def forward_batch(batch: Dict[str, Any], data_number: int = 1, target_chat: str = "2532518781",
+                      timeouts: Optional[AdaptiveTimeout] = None,
+                      on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      stall_seconds: Optional[float] = None,
+                      report: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Reenvía todos los posts de un lote de un canal con una sola invocación de tdl
+        
+        Los mensajes se pasan como JSON de tdl-export en el orden del lote, así
+        que la resolución del canal se hace una vez y los álbumes van juntos.
+        
+        Args:
+            batch: Lote de BatchPlanner
+            data_number: Número de cuenta de Telegram
+            target_chat: ID del chat destino
+            timeouts: Modelo de timeouts adaptativos; el timeout del lote es la suma de los de sus
+                      trabajos, sin pasar del techo del modelo
+            on_progress, stall_seconds: Como en forward_with_tdl
+            report: Dict opcional que recibe 'untouched': True si tdl seguro que no llegó a enviar
+                    nada (no arrancó o no pudo abrir su almacenamiento). tdl forward no informa
+                    de cada mensaje, así que en cualquier otro fallo el lote puede estar entregado
+                    en parte
+            
+        Returns:
+            True si tdl terminó correctamente, False en caso contrario
+            
+        Raises:
+            StallDetected: tdl dejó de avanzar
+        """
+        handle, export_path = tempfile.mkstemp(prefix=f"tdl-batch-{batch['channel']}-", suffix='.json')
+        os.close(handle)
+        untouched = True
+        try:
+            storage_path = os.path.expanduser(f"~/.tdl/oktelegram{data_number}")
+            with TdlExportWriter(export_path) as writer:
+                writer.write_all(item for _, item in batch['items'])
+                writer.close()
+            
+            job = {
+                'account': data_number,
+                'size_bytes': batch['size_bytes'] or None,
+                'duration_seconds': None,
+                'timeouts': timeouts,
+                'on_progress': on_progress,
+                'stall_seconds': stall_seconds
+            }
+            if timeouts is not None:
+                job['timeout'] = min(timeouts.ceiling, sum(
+                    timeouts.timeout_for(data_number, *row_size_and_duration(item)) for _, item in batch['items']
+                ))
+            
+            forward_cmd = [
+                'tdl', 'forward',
+                '--storage', f'type=bolt,path={storage_path}',
+                '--from', export_path,
+                '--to', target_chat,
+                '--mode', 'direct'
+            ]
+            
+            print(f"📦 Executing batch forward ({len(batch['items'])} posts of {batch['channel']}): {' '.join(forward_cmd)}")
+            
+            untouched = False
+            result = TelegramOperations._run_tdl(forward_cmd, 60 + 30 * len(batch['items']), job)
+            
+            if result.returncode == 0:
+                print("✅ Batch forward successful!")
+                return True
+            # Sin almacenamiento tdl no llega a conectarse, así que no envió nada
+            untouched = bool(_TDL_LOCK_RE.search(result.stderr or ''))
+            print(f"⚠️ Batch forward failed with code {result.returncode}")
+            print(f"Error output: {result.stderr}")
+            return False
+            
+        except subprocess.TimeoutExpired as e:
+            print(f"⏰ Batch forward timed out after {e.timeout:.0f}s")
+            return False
+        except StallDetected:
+            raise
+        except Exception as e:
+            # FileNotFoundError/PermissionError: el ejecutable de tdl no se pudo lanzar
+            untouched = untouched or isinstance(e, (FileNotFoundError, PermissionError))
+            print(f"❌ Batch forward error: {str(e)}")
+            return False
+        finally:
+            if report is not None:
+                report['untouched'] = untouched
+            try:
+                os.remove(export_path)
+            except OSError:
+                pass
+
+
+def row_size_and_duration(item: Dict[str, Any]) -> Tuple[Optional[int], Optional[float]]:
+    """Tamaño en bytes y duración en segundos de un registro (columnas Size y Duration)"""
+    row = item['data'] if item else ()
+    size_bytes = parse_size_bytes(row[COL_SIZE]) if len(row) > COL_SIZE else None
+    duration = parse_duration_seconds(row[COL_DURATION]) if len(row) > COL_DURATION else None
+    return size_bytes, duration
+
+
+class BatchPlanner:
+    """
+    Agrupa trabajos pendientes por canal de origen para reenviarlos en lote
+    
+    Cada invocación de tdl paga la resolución del canal de origen, así que los
+    enlaces se agrupan por canal y se ordenan por ID de post (los álbumes quedan
+    contiguos). Los grupos muy grandes se parten en lotes de max_batch posts,
+    y los enlaces que no son de canal privado quedan como lotes individuales.
+    """
+    
+    def __init__(self, max_batch: int = 200):
+        self.max_batch = max_batch
+    
+    def plan(self, entries: Iterable[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Args:
+            entries: Pares (índice en all_data, registro)
+            
+        Returns:
+            Lotes {'channel', 'items': [(índice, registro)], 'size_bytes'} en el orden
+            en que aparece cada canal en la hoja
+        """
+        groups = OrderedDict()  # canal -> [(post, índice, registro)]
+        singles = []
+        for index, item in entries:
+            channel = item.get('channel')
+            if channel is None:
+                annotate_link(item)
+                channel = item['channel']
+            if channel is None:
+                singles.append((index, item))
+            else:
+                groups.setdefault(channel, []).append((item['post'], index, item))
+        
+        batches = []
+        for channel, members in groups.items():
+            members.sort(key=lambda member: (member[0], member[1]))
+            for start in range(0, len(members), self.max_batch):
+                chunk = [(index, item) for _, index, item in members[start:start + self.max_batch]]
+                batches.append(self._batch(channel, chunk))
+        batches.extend(self._batch(None, [entry]) for entry in singles)
+        return batches
+    
+    @staticmethod
+    def _batch(channel: Optional[int], items: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+        size_bytes = 0
+        for _, item in items:
+            size_bytes += row_size_and_duration(item)[0] or 0
+        return {'channel': channel, 'items': items, 'size_bytes': size_bytes}
+
+
+class OperationQueue:
+    """
+    Cola de operaciones de Telegram con un carril interactivo y uno de lotes
+
+    Los trabajos interactivos (Opt+Click) se atienden antes que cualquier
+    trabajo de lote pendiente, y `reserved_interactive` hilos nunca se ocupan
+    con lotes. Los lotes se ordenan según la política: 'fifo' (orden de la
+    hoja) o 'sjf' (primero el de menor coste estimado, en segundos). Con 'sjf'
+    cada trabajo gana `aging` segundos de prioridad por segundo de espera, así
+    que un video grande no queda postergado indefinidamente por trabajos
+    pequeños que siguen llegando. Los trabajos con el mismo recurso (p. ej. la
+    cuenta de tdl, cuyo almacenamiento bolt no admite dos procesos) nunca se
+    ejecutan a la vez. Un trabajo que lanza StallDetected vuelve a su carril
+    con su prioridad original hasta max_reschedules veces; los trabajos que no
+    se pueden repetir enteros (lotes de reenvío) tratan el atasco ellos mismos.
+    """
+
+    INTERACTIVE = 'interactive'
+    BATCH = 'batch'
+    POLICIES = ('fifo', 'sjf')
+
+    def __init__(self, workers: int = 2, policy: str = 'sjf', aging: float = 1.0,
+                 reserved_interactive: int = 1, max_reschedules: int = 2):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Política de cola desconocida: {policy}")
+        self.workers = max(1, workers)
+        self.policy = policy
+        self.aging = aging
+        self.max_reschedules = max_reschedules
+        self.batch_slots = max(1, self.workers - reserved_interactive)
+        self.stats = {lane: {'completed': 0, 'rescheduled': 0, 'wait_seconds': 0.0, 'run_seconds': 0.0}
+                      for lane in (self.INTERACTIVE, self.BATCH)}
+        self._interactive = deque()
+        self._batch = []  # heap de (clave, secuencia, trabajo)
+        self._sequence = 0
+        self._busy = Counter()  # recurso -> trabajos en ejecución
+        self._running_batch = 0
+        self._threads = []
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def submit(self, func: Callable[[], Any], lane: str = BATCH, cost: float = 0.0, resource=None) -> Future:
+        """
+        Encola un trabajo
+
+        Args:
+            func: Función sin argumentos que realiza el trabajo
+            lane: INTERACTIVE o BATCH
+            cost: Duración estimada en segundos (ordena el carril de lotes con 'sjf')
+            resource: Recurso exclusivo del trabajo, o None
+
+        Returns:
+            Future con el resultado de func
+        """
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("La cola de operaciones está cerrada")
+            job = {'func': func, 'future': future, 'lane': lane, 'resource': resource,
+                   'queued_at': time.monotonic(), 'attempts': 0}
+            # Con envejecimiento lineal la prioridad efectiva en el instante t es
+            # coste - aging * (t - queued_at); el término en t es común a todos,
+            # así que basta una clave fija en el heap.
+            job['key'] = cost + self.aging * job['queued_at'] if self.policy == 'sjf' else 0
+            self._enqueue(job)
+            self._ensure_workers()
+            self._condition.notify_all()
+        return future
+
+    def _enqueue(self, job: Dict[str, Any], front: bool = False):
+        if job['lane'] == self.INTERACTIVE:
+            if front:
+                self._interactive.appendleft(job)
+            else:
+                self._interactive.append(job)
+        else:
+            self._sequence += 1
+            heapq.heappush(self._batch, (job['key'], self._sequence, job))
+
+    def pending(self) -> Dict[str, int]:
+        """Trabajos en espera por carril"""
+        with self._condition:
+            return {self.INTERACTIVE: len(self._interactive), self.BATCH: len(self._batch)}
+
+    def shutdown(self, wait: bool = False):
+        """Cancela los trabajos pendientes y detiene los hilos al terminar los que están en curso"""
+        with self._condition:
+            self._closed = True
+            pending = [job for job in self._interactive] + [entry[2] for entry in self._batch]
+            self._interactive.clear()
+            self._batch = []
+            self._condition.notify_all()
+        for job in pending:
+            if job['attempts']:
+                job['future'].set_exception(RuntimeError("La cola de operaciones está cerrada"))
+            else:
+                job['future'].cancel()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _ensure_workers(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _take(self) -> Optional[Dict[str, Any]]:
+        """Siguiente trabajo ejecutable (con el lock tomado), o None"""
+        for job in self._interactive:
+            if job['resource'] is None or not self._busy[job['resource']]:
+                self._interactive.remove(job)
+                return job
+        if self._running_batch >= self.batch_slots:
+            return None
+        skipped = []
+        job = None
+        while self._batch:
+            entry = heapq.heappop(self._batch)
+            resource = entry[2]['resource']
+            if resource is None or not self._busy[resource]:
+                job = entry[2]
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._batch, entry)
+        return job
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                job = self._take()
+                while job is None:
+                    if self._closed:
+                        return
+                    self._condition.wait()
+                    job = self._take()
+                self._busy[job['resource']] += 1
+                if job['lane'] == self.BATCH:
+                    self._running_batch += 1
+
+            started = time.monotonic()
+            future = job['future']
+            stalled = None
+            # Un trabajo reprogramado ya tiene su Future en marcha
+            if job['attempts'] or future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(job['func']())
+                except StallDetected as exc:
+                    stalled = exc
+                except BaseException as exc:
+                    future.set_exception(exc)
+
+            with self._condition:
+                self._busy[job['resource']] -= 1
+                if job['lane'] == self.BATCH:
+                    self._running_batch -= 1
+                stats = self.stats[job['lane']]
+                stats['run_seconds'] += time.monotonic() - started
+                if stalled is not None and job['attempts'] < self.max_reschedules and not self._closed:
+                    job['attempts'] += 1
+                    stats['rescheduled'] += 1
+                    self._enqueue(job, front=True)
+                else:
+                    if stalled is not None:
+                        future.set_exception(stalled)
+                    stats['completed'] += 1
+                    stats['wait_seconds'] += started - job['queued_at']
+                self._condition.notify_all()
+
+
+class TdlExportWriter:
+    """
+    Escribe enlaces como JSON compatible con tdl-export de forma incremental
+    
+    Un archivo de tdl-export describe un solo chat, así que se genera un archivo
+    por canal ('<nombre>-<canal>.json'); si todos los enlaces son del mismo canal
+    el resultado queda directamente en output_path. Los mensajes se escriben a
+    medida que llegan, por lo que la memoria no depende del número de filas.
+    """
+    
+    MAX_OPEN_FILES = 64
+    
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        base, ext = os.path.splitext(output_path)
+        self._base = base
+        self._ext = ext or '.json'
+        self._open_files = OrderedDict()  # canal -> archivo abierto (LRU)
+        self._counts = {}  # canal -> mensajes escritos
+        self.written = 0
+        self.skipped = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _path_for(self, channel: int) -> str:
+        return f"{self._base}-{channel}{self._ext}"
+    
+    def _file_for(self, channel: int):
+        handle = self._open_files.get(channel)
+        if handle is not None:
+            self._open_files.move_to_end(channel)
+            return handle
+        if len(self._open_files) >= self.MAX_OPEN_FILES:
+            _, oldest = self._open_files.popitem(last=False)
+            oldest.close()
+        if channel in self._counts:
+            handle = open(self._path_for(channel), 'a', encoding='utf-8')
+        else:
+            handle = open(self._path_for(channel), 'w', encoding='utf-8')
+            handle.write('{"id": %d, "messages": [' % channel)
+            self._counts[channel] = 0
+        self._open_files[channel] = handle
+        return handle
+    
+    def write(self, item: Dict[str, Any]) -> bool:
+        """
+        Añade un registro de DataManager a la exportación
+        
+        Returns:
+            True si se escribió, False si el enlace no es de un canal privado
+        """
+        if item.get('channel') is not None:
+            channel, post = item['channel'], item['post']
+        else:
+            parsed = parse_telegram_link(item.get('link'))
+            if parsed is None:
+                self.skipped += 1
+                return False
+            channel, post = parsed
+        message = {'id': post, 'type': 'message'}
+        row = item.get('data') or ()
+        if len(row) > COL_FILE and row[COL_FILE]:
+            message['file'] = str(row[COL_FILE])
+        if len(row) > COL_TEXT and row[COL_TEXT]:
+            message['text'] = str(row[COL_TEXT])
+        
+        handle = self._file_for(channel)
+        if self._counts[channel]:
+            handle.write(',')
+        handle.write('\n    ' + json.dumps(message, ensure_ascii=False))
+        self._counts[channel] += 1
+        self.written += 1
+        return True
+    
+    def write_all(self, items: Iterable[Dict[str, Any]]) -> int:
+        """Escribe todos los registros de un iterable y devuelve cuántos se exportaron"""
+        written = 0
+        for item in items:
+            if self.write(item):
+                written += 1
+        return written
+    
+    def close(self) -> List[str]:
+        """
+        Cierra todos los archivos
+        
+        Returns:
+            Lista de rutas generadas
+        """
+        for handle in self._open_files.values():
+            handle.close()
+        self._open_files.clear()
+        
+        paths = []
+        for channel in self._counts:
+            path = self._path_for(channel)
+            with open(path, 'a', encoding='utf-8') as handle:
+                handle.write('\n]}\n')
+            paths.append(path)
+        
+        if len(paths) == 1:
+            os.replace(paths[0], self.output_path)
+            paths = [self.output_path]
+        self._counts = {}
+        return paths
+
+
+class XlsxSelectionWriter:
+    """
+    Escribe una selección de registros como xlsx nuevo con openpyxl en modo write-only
+    
+    Las filas se vuelcan al archivo a medida que llegan, así que la memoria no
+    depende del número de filas. Se conserva el orden de columnas original y el
+    relleno verde de las filas procesadas; opcionalmente se añaden columnas con
+    el resultado de la última operación, su duración y la hora de procesado.
+    """
+    
+    DEFAULT_HEADERS = ('Link', 'Formato', 'Duration', 'Size', 'File', 'Text')
+    OUTCOME_HEADERS = ('Resultado', 'Segundos', 'Procesado')
+    
+    def __init__(self, output_path: str, headers: Optional[Tuple] = None, outcome_columns: bool = False):
+        """
+        Args:
+            output_path: Archivo xlsx a generar
+            headers: Cabecera del archivo de origen (DEFAULT_HEADERS si es None)
+            outcome_columns: Añadir las columnas Resultado/Segundos/Procesado
+        """
+        self.output_path = output_path
+        self.outcome_columns = outcome_columns
+        self.headers = tuple(headers) if headers else self.DEFAULT_HEADERS
+        self.written = 0
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._worksheet = self._workbook.create_sheet()
+        self._green_fill = PatternFill(start_color='90EE90', end_color='90EE90', fill_type='solid')
+        self._width = len(self.headers)
+        header = list(self.headers)
+        if outcome_columns:
+            header += list(self.OUTCOME_HEADERS)
+        self._worksheet.append(header)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    @staticmethod
+    def _clean(value):
+        if isinstance(value, str):
+            return ILLEGAL_CHARACTERS_RE.sub('', value)
+        return value
+    
+    def write(self, item: Dict[str, Any]):
+        """Añade un registro de DataManager como fila"""
+        values = [self._clean(value) for value in item['data']]
+        link = WriteOnlyCell(self._worksheet, value=values[0] if values else item['link'])
+        if item['is_clicked']:
+            link.fill = self._green_fill
+        row = [link] + values[1:]
+        if self.outcome_columns:
+            row += [None] * (self._width - len(row))
+            processed_at = item.get('processed_at')
+            row += [
+                item.get('outcome'),
+                round(item['elapsed'], 2) if item.get('elapsed') is not None else None,
+                datetime.datetime.fromtimestamp(processed_at) if processed_at else None
+            ]
+        self._worksheet.append(row)
+        self.written += 1
+    
+    def write_all(self, items: Iterable[Dict[str, Any]]) -> int:
+        """Escribe todos los registros de un iterable y devuelve cuántos se exportaron"""
+        for item in items:
+            self.write(item)
+        return self.written
+    
+    def close(self):
+        """Termina el archivo (write-only solo permite guardar una vez)"""
+        if self._workbook is not None:
+            self._workbook.save(self.output_path)
+            self._workbook = None
+
+
+class TransferPipeline:
+    """
+    Descarga enlaces con tdl dl y sube cada descarga con tdl up mientras siguen las demás
+    
+    Las dos etapas corren en hilos separados unidos por una cola, así que el
+    rendimiento total se acerca al de la etapa más lenta en lugar de a la suma
+    de ambas. Cada enlace se descarga en su propia carpeta dentro de work_dir.
+    El presupuesto de disco limita los bytes descargados y aún no subidos: la
+    etapa de descarga espera antes de empezar un enlace que no cabe (siempre se
+    permite uno en curso, aunque sea más grande que el presupuesto).
+    
+    tdl bloquea su almacenamiento bolt mientras corre, así que con la misma
+    cuenta en ambas etapas las invocaciones se turnan; los fallos por bloqueo
+    se reintentan. Con upload_account distinto las etapas se solapan del todo.
+    
+    Si una subida falla, la carpeta descargada se conserva (aunque remove
+    esté activo) junto a un marcador '<carpeta>.done' con el enlace; sus rutas
+    quedan en stats['kept'] y al reintentar ese enlace se sube sin volver a
+    descargarlo.
+    """
+    
+    LOCK_RETRIES = 20
+    LOCK_BACKOFF = 0.5
+    DEFAULT_ITEM_BYTES = 50 * 1024 ** 2  # Estimación para filas sin columna Size
+    
+    def __init__(self, work_dir: str, target_chat: str, download_account: int = 1,
+                 upload_account: Optional[int] = None, threads: int = 4, limit: int = 2,
+                 disk_budget: int = 2 * 1024 ** 3, remove: bool = True,
+                 timeouts: Optional[AdaptiveTimeout] = None,
+                 stall_seconds: Optional[float] = None, stall_retries: int = 2):
+        self.work_dir = work_dir
+        self.target_chat = target_chat
+        self.download_account = download_account
+        self.upload_account = upload_account if upload_account is not None else download_account
+        self.threads = threads
+        self.limit = limit
+        self.disk_budget = disk_budget
+        self.remove = remove
+        self.timeouts = timeouts
+        self.stall_seconds = stall_seconds
+        self.stall_retries = stall_retries
+        self.stats = {'downloaded': 0, 'uploaded': 0, 'download_failed': 0, 'upload_failed': 0, 'bytes': 0,
+                      'download_seconds': 0.0, 'upload_seconds': 0.0, 'throttled_seconds': 0.0, 'stalls': 0,
+                      'reused': 0, 'kept': []}
+        self._stats_lock = threading.Lock()  # las dos etapas actualizan stats desde hilos distintos
+        self._on_progress = None
+        self._reserved = 0
+        self._budget = threading.Condition()
+        self._handoff = queue.Queue(maxsize=64)
+        self._cancelled = threading.Event()
+    
+    def cancel(self):
+        """Deja de empezar descargas nuevas; lo ya descargado se sigue subiendo"""
+        self._cancelled.set()
+    
+    def run(self, entries: Iterable[Tuple[int, Dict[str, Any]]],
+            on_result: Optional[Callable[[int, Dict[str, Any], str, bool, float], None]] = None,
+            on_progress: Optional[Callable[[int, Dict[str, Any], str, Dict[str, Any]], None]] = None
+            ) -> Dict[str, Any]:
+        """
+        Args:
+            entries: Pares (índice en all_data, registro)
+            on_result: Función opcional (índice, registro, etapa 'dl' o 'up', éxito, segundos)
+            on_progress: Función opcional (índice, registro, etapa, progreso de parse_tdl_progress)
+            
+        Returns:
+            Estadísticas de la ejecución
+        """
+        self._on_progress = on_progress
+        os.makedirs(self.work_dir, exist_ok=True)
+        free = shutil.disk_usage(self.work_dir).free
+        self.disk_budget = max(1, min(self.disk_budget, int(free * 0.9)))
+        started = time.monotonic()
+        uploader = threading.Thread(target=self._upload_stage, args=(on_result,), daemon=True)
+        uploader.start()
+        try:
+            self._download_stage(entries, on_result)
+        finally:
+            self._handoff.put(None)
+            uploader.join()
+        self.stats['seconds'] = time.monotonic() - started
+        return self.stats
+    
+    def _download_stage(self, entries, on_result):
+        for index, item in entries:
+            if self._cancelled.is_set():
+                break
+            size_bytes, duration = row_size_and_duration(item)
+            reserved = self._reserve(size_bytes or self.DEFAULT_ITEM_BYTES)
+            item_dir = os.path.join(self.work_dir, str(index))
+            if self._kept_download(item_dir, item['link']):
+                # Descarga conservada de una subida fallida: se sube sin volver a descargar
+                actual = self._dir_bytes(item_dir)
+                self._adjust(reserved, actual)
+                self._count('reused')
+                self._count('downloaded')
+                self._handoff.put((index, item, item_dir, actual))
+                if on_result:
+                    on_result(index, item, 'dl', True, 0.0)
+                continue
+            self._discard(item_dir)  # restos de una descarga a medias
+            cmd = [
+                'tdl', 'dl',
+                '--storage', f'type=bolt,path={self._storage(self.download_account)}',
+                '-u', item['link'],
+                '-d', item_dir,
+                '-t', str(self.threads),
+                '-l', str(self.limit)
+            ]
+            job = self._job(self.download_account, size_bytes, duration, index, item, 'dl')
+            # Una descarga atascada se repite desde cero, sin el archivo parcial
+            success, seconds = self._run_stage(cmd, 60, job, 'download_seconds',
+                                               before_retry=lambda: self._discard(item_dir))
+            if success:
+                actual = self._dir_bytes(item_dir)
+                self._adjust(reserved, actual)
+                self._count('downloaded')
+                self._handoff.put((index, item, item_dir, actual))
+            else:
+                self._discard(item_dir)
+                self._release(reserved)
+                self._count('download_failed')
+            if on_result:
+                on_result(index, item, 'dl', success, seconds)
+    
+    def _upload_stage(self, on_result):
+        while True:
+            entry = self._handoff.get()
+            if entry is None:
+                return
+            index, item, item_dir, size = entry
+            cmd = [
+                'tdl', 'up',
+                '--storage', f'type=bolt,path={self._storage(self.upload_account)}',
+                '-p', item_dir,
+                '-c', self.target_chat,
+                '-t', str(self.threads),
+                '-l', str(self.limit)
+            ]
+            if self.remove:
+                cmd.append('--rm')
+            job = self._job(self.upload_account, size or None, row_size_and_duration(item)[1], index, item, 'up')
+            success, seconds = self._run_stage(cmd, 60, job, 'upload_seconds')
+            if success:
+                self._count('uploaded')
+                self._count('bytes', size)
+                self._forget_download(item_dir)
+                if self.remove:
+                    self._discard(item_dir)
+            else:
+                self._count('upload_failed')
+                self._keep_download(item_dir, item['link'])
+                print(f"📁 Upload failed, download kept in {item_dir} for the next run")
+            self._release(size)
+            if on_result:
+                on_result(index, item, 'up', success, seconds)
+    
+    def _run_stage(self, cmd, default_timeout, job, busy_key, before_retry=None) -> Tuple[bool, float]:
+        """
+        Ejecuta una etapa reintentando mientras el almacenamiento de tdl esté
+        bloqueado o mientras tdl se atasque (hasta stall_retries veces)
+        
+        Returns:
+            Tupla (éxito, segundos)
+        """
+        started = time.monotonic()
+        success = self._run_with_retries(cmd, default_timeout, job, before_retry)
+        elapsed = time.monotonic() - started
+        self._count(busy_key, elapsed)
+        return success, elapsed
+    
+    def _run_with_retries(self, cmd, default_timeout, job, before_retry=None) -> bool:
+        try:
+            stalls = 0
+            for attempt in range(self.LOCK_RETRIES):
+                try:
+                    result = TelegramOperations._run_tdl(cmd, default_timeout, job)
+                except subprocess.TimeoutExpired as e:
+                    print(f"⏰ {cmd[1]} timed out after {e.timeout:.0f}s")
+                    return False
+                except StallDetected as e:
+                    self._count('stalls')
+                    stalls += 1
+                    if stalls > self.stall_retries or self._cancelled.is_set():
+                        print(f"⚠️ {e}, giving up")
+                        return False
+                    print(f"🔁 {e}, restarting")
+                    if before_retry:
+                        before_retry()
+                    continue
+                if result.returncode == 0:
+                    return True
+                if not _TDL_LOCK_RE.search(result.stderr or ''):
+                    print(f"⚠️ {cmd[1]} failed with code {result.returncode}: {result.stderr.strip()}")
+                    return False
+                time.sleep(self.LOCK_BACKOFF * (attempt + 1))
+            print(f"⚠️ {cmd[1]} gave up waiting for the tdl storage lock")
+            return False
+        except Exception as e:
+            print(f"❌ {cmd[1]} error: {str(e)}")
+            return False
+    
+    def _job(self, account, size_bytes, duration, index, item, stage):
+        on_progress = None
+        if self._on_progress:
+            def on_progress(progress):
+                self._on_progress(index, item, stage, progress)
+        return {'account': account, 'size_bytes': size_bytes, 'duration_seconds': duration,
+                'timeouts': self.timeouts, 'on_progress': on_progress, 'stall_seconds': self.stall_seconds}
+    
+    @staticmethod
+    def _storage(account: int) -> str:
+        return os.path.expanduser(f"~/.tdl/oktelegram{account}")
+    
+    def _count(self, key: str, amount: float = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+    
+    def _keep_download(self, item_dir: str, link: str):
+        """Deja la descarga de una subida fallida para el próximo intento"""
+        try:
+            with open(item_dir + '.done', 'w', encoding='utf-8') as handle:
+                handle.write(link)
+        except OSError as e:
+            print(f"⚠️ Could not mark {item_dir} as downloaded: {str(e)}")
+        with self._stats_lock:
+            self.stats['kept'].append(item_dir)
+    
+    @staticmethod
+    def _forget_download(item_dir: str):
+        try:
+            os.remove(item_dir + '.done')
+        except OSError:
+            pass
+    
+    def _kept_download(self, item_dir: str, link: str) -> bool:
+        """True si item_dir tiene la descarga completa de link que dejó una subida fallida"""
+        try:
+            with open(item_dir + '.done', encoding='utf-8') as handle:
+                if handle.read() != link:
+                    return False
+        except OSError:
+            return False
+        if self._dir_bytes(item_dir) > 0:
+            return True
+        self._forget_download(item_dir)
+        return False
+    
+    def _reserve(self, size: int) -> int:
+        """Espera hasta que size bytes quepan en el presupuesto de disco y los reserva"""
+        waited = time.monotonic()
+        with self._budget:
+            while self._reserved and self._reserved + size > self.disk_budget:
+                self._budget.wait()
+            self._reserved += size
+        self._count('throttled_seconds', time.monotonic() - waited)
+        return size
+    
+    def _adjust(self, reserved: int, actual: int):
+        with self._budget:
+            self._reserved += actual - reserved
+            self._budget.notify_all()
+    
+    def _release(self, size: int):
+        with self._budget:
+            self._reserved -= size
+            self._budget.notify_all()
+    
+    @staticmethod
+    def _dir_bytes(path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+    
+    @classmethod
+    def _discard(cls, path: str):
+        shutil.rmtree(path, ignore_errors=True)
+        cls._forget_download(path)
+
+
+_SET_BYTES = bytes(1 if value else 0 for value in range(256))  # byte con algún bit a 1
+_CLEAR_BYTES = bytes(1 if value != 0xFF else 0 for value in range(256))  # byte con algún bit a 0
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if value & (1 << bit)) for value in range(256))
+
+
+class StatusBitset:
+    """
+    Estado de procesado de todas las filas como un bit por índice de all_data
+    
+    Mantiene el número de bits a 1 por bloque, así que contar procesados
+    (total o en un rango), rank/select y buscar el siguiente pendiente o
+    procesado saltan los bloques completos sin recorrer registros.
+    """
+    
+    BLOCK_BYTES = 512  # 4096 filas por bloque
+    
+    def __init__(self, size: int = 0):
+        self.size = size
+        self._bits = bytearray((size + 7) // 8)
+        self._block_counts = [0] * ((len(self._bits) + self.BLOCK_BYTES - 1) // self.BLOCK_BYTES)
+        self._total = 0
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def resize(self, size: int):
+        """Amplía el bitset (los bits nuevos empiezan a 0)"""
+        if size <= self.size:
+            return
+        self.size = size
+        self._bits.extend(bytes((size + 7) // 8 - len(self._bits)))
+        blocks = (len(self._bits) + self.BLOCK_BYTES - 1) // self.BLOCK_BYTES
+        self._block_counts.extend([0] * (blocks - len(self._block_counts)))
+    
+    def __getitem__(self, index: int) -> bool:
+        return 0 <= index < self.size and bool(self._bits[index >> 3] & (1 << (index & 7)))
+    
+    def set(self, index: int, value: bool) -> bool:
+        """Cambia un bit; devuelve True si su valor cambió"""
+        if not 0 <= index < self.size:
+            return False
+        byte, mask = index >> 3, 1 << (index & 7)
+        current = bool(self._bits[byte] & mask)
+        if current == bool(value):
+            return False
+        delta = 1 if value else -1
+        self._bits[byte] ^= mask
+        self._block_counts[byte // self.BLOCK_BYTES] += delta
+        self._total += delta
+        return True
+    
+    def set_many(self, indexes: Iterable[int], value: bool) -> List[int]:
+        """Cambia varios bits; devuelve los índices cuyo valor cambió"""
+        value = bool(value)
+        bits, counts, size = self._bits, self._block_counts, self.size
+        block_bits = self.BLOCK_BYTES * 8
+        delta = 1 if value else -1
+        changed = []
+        for index in indexes:
+            if not 0 <= index < size:
+                continue
+            byte, mask = index >> 3, 1 << (index & 7)
+            if bool(bits[byte] & mask) != value:
+                bits[byte] ^= mask
+                counts[index // block_bits] += delta
+                changed.append(index)
+        self._total += delta * len(changed)
+        return changed
+    
+    def count(self) -> int:
+        """Número de bits a 1"""
+        return self._total
+    
+    def rank(self, index: int) -> int:
+        """Número de bits a 1 en [0, index)"""
+        index = max(0, min(index, self.size))
+        byte = index >> 3
+        block = byte // self.BLOCK_BYTES
+        total = sum(self._block_counts[:block])
+        total += int.from_bytes(self._bits[block * self.BLOCK_BYTES:byte], 'little').bit_count()
+        if index & 7:
+            total += (self._bits[byte] & ((1 << (index & 7)) - 1)).bit_count()
+        return total
+    
+    def count_range(self, start: int, end: int) -> int:
+        """Número de bits a 1 en [start, end)"""
+        return self.rank(end) - self.rank(start)
+    
+    def select(self, k: int) -> Optional[int]:
+        """Índice del k-ésimo bit a 1 (desde 0), o None si no hay tantos"""
+        if not 0 <= k < self._total:
+            return None
+        for block, count in enumerate(self._block_counts):
+            if k < count:
+                break
+            k -= count
+        position = block * self.BLOCK_BYTES
+        while True:
+            ones = self._bits[position].bit_count()
+            if k < ones:
+                break
+            k -= ones
+            position += 1
+        value = self._bits[position]
+        for bit in range(8):
+            if value & (1 << bit):
+                if k == 0:
+                    return position * 8 + bit
+                k -= 1
+    
+    def _next(self, start: int, value: bool) -> Optional[int]:
+        table = _SET_BYTES if value else _CLEAR_BYTES
+        full = self.BLOCK_BYTES * 8
+        byte = max(0, start) >> 3
+        while byte < len(self._bits):
+            block = byte // self.BLOCK_BYTES
+            count = self._block_counts[block]
+            block_end = min(len(self._bits), (block + 1) * self.BLOCK_BYTES)
+            if (count == 0 if value else count == full):
+                byte = block_end
+                continue
+            found = self._bits[byte:block_end].translate(table).find(1)
+            while found >= 0:
+                position = byte + found
+                for bit in range(8):
+                    index = position * 8 + bit
+                    if index >= start and index < self.size and self[index] == value:
+                        return index
+                found = self._bits[position + 1:block_end].translate(table).find(1)
+                if found >= 0:
+                    found += position + 1 - byte
+            byte = block_end
+        return None
+    
+    def next_set(self, start: int = 0) -> Optional[int]:
+        """Primer índice >= start con el bit a 1"""
+        return self._next(start, True)
+    
+    def next_clear(self, start: int = 0) -> Optional[int]:
+        """Primer índice >= start con el bit a 0"""
+        return self._next(start, False)
+    
+    def _iter(self, value: bool) -> Iterator[int]:
+        bits, size = self._bits, self.size
+        full = self.BLOCK_BYTES * 8
+        flip = 0 if value else 0xFF
+        for block, count in enumerate(self._block_counts):
+            if (count == 0 if value else count == full):
+                continue
+            start = block * self.BLOCK_BYTES
+            for position in range(start, min(len(bits), start + self.BLOCK_BYTES)):
+                byte = bits[position] ^ flip
+                if byte:
+                    base = position * 8
+                    for bit in _BYTE_BITS[byte]:
+                        if base + bit < size:
+                            yield base + bit
+    
+    def iter_set(self) -> Iterator[int]:
+        """Índices con el bit a 1 en orden"""
+        return self._iter(True)
+    
+    def iter_clear(self) -> Iterator[int]:
+        """Índices con el bit a 0 en orden"""
+        return self._iter(False)
+
+
+class ChannelIndex:
+    """
+    Agregados por canal de origen (filas, procesadas, tamaño y duración)
+    
+    Se construyen en una pasada al añadir las filas y se actualizan solo con
+    los índices cuyo estado cambia, así que el resumen cuesta lo mismo que
+    el número de canales. Cada canal guarda además sus índices de all_data
+    en orden para recorrer sus filas sin filtrar el conjunto.
+    """
+    
+    CACHE_VALUES = 65536  # textos de Size/Duration distintos que se recuerdan ya convertidos
+    
+    def __init__(self):
+        self._groups = []  # {'key', 'label', 'total', 'processed', 'size_bytes', 'duration', 'members'}
+        self._by_key = {}  # clave -> posición en _groups
+        self._by_channel = {}  # ID de canal privado -> posición en _groups (atajo de _by_key)
+        self._group_of = array('I')  # índice en all_data -> posición en _groups
+        self._sizes = {}  # texto de Size -> bytes
+        self._durations = {}  # texto de Duration -> segundos
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._groups)
+    
+    def _parse(self, cache: Dict[Any, Any], parse: Callable, value):
+        """Convierte un valor de Size/Duration recordando los textos ya vistos"""
+        try:
+            parsed = cache[value] = parse(value)
+            if len(cache) > self.CACHE_VALUES:
+                cache.clear()
+        except TypeError:  # valores no hashables (celdas con fechas/horas raras)
+            parsed = parse(value)
+        return parsed
+    
+    def extend(self, items: Iterable[Dict[str, Any]]):
+        """Añade registros ya anotados a continuación de los existentes"""
+        with self._lock:
+            groups, by_key, by_channel = self._groups, self._by_key, self._by_channel
+            group_of, sizes, durations = self._group_of, self._sizes, self._durations
+            index = len(group_of)
+            for item in items:
+                channel = item['channel']
+                position = by_channel.get(channel) if channel is not None else None
+                if position is None:
+                    key = channel_key(item)
+                    position = by_key.get(key)
+                    if position is None:
+                        position = by_key[key] = len(groups)
+                        groups.append({'key': key, 'label': channel_label(key), 'total': 0, 'processed': 0,
+                                       'size_bytes': 0, 'duration': 0.0, 'members': array('I')})
+                    if channel is not None:
+                        by_channel[channel] = position
+                group = groups[position]
+                group_of.append(position)
+                group['members'].append(index)
+                group['total'] += 1
+                if item['is_clicked']:
+                    group['processed'] += 1
+                row = item['data']
+                if len(row) > COL_SIZE:
+                    try:
+                        size_bytes = sizes[row[COL_SIZE]]
+                    except (KeyError, TypeError):
+                        size_bytes = self._parse(sizes, parse_size_bytes, row[COL_SIZE])
+                    if size_bytes:
+                        group['size_bytes'] += size_bytes
+                if len(row) > COL_DURATION:
+                    try:
+                        duration = durations[row[COL_DURATION]]
+                    except (KeyError, TypeError):
+                        duration = self._parse(durations, parse_duration_seconds, row[COL_DURATION])
+                    if duration:
+                        group['duration'] += duration
+                index += 1
+    
+    def update_status(self, indexes: Iterable[int], processed: bool):
+        """Aplica un cambio de estado a los índices que cambiaron (StatusBitset.set_many)"""
+        delta = 1 if processed else -1
+        with self._lock:
+            groups, group_of = self._groups, self._group_of
+            for index in indexes:
+                groups[group_of[index]]['processed'] += delta
+    
+    def key_of(self, index: int) -> Optional[str]:
+        """Canal de la fila con ese índice en all_data"""
+        if 0 <= index < len(self._group_of):
+            return self._groups[self._group_of[index]]['key']
+        return None
+    
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Una entrada por canal, en el orden en que aparecen en la hoja
+        
+        Returns:
+            Dicts {'key', 'label', 'total', 'processed', 'unprocessed', 'size_bytes', 'duration'}
+        """
+        with self._lock:
+            return [self._row(group) for group in self._groups]
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Entrada del resumen de un canal (None si no hay filas de ese canal)"""
+        with self._lock:
+            position = self._by_key.get(key)
+            return self._row(self._groups[position]) if position is not None else None
+    
+    @staticmethod
+    def _row(group: Dict[str, Any]) -> Dict[str, Any]:
+        row = {name: value for name, value in group.items() if name != 'members'}
+        row['unprocessed'] = group['total'] - group['processed']
+        return row
+    
+    def members(self, key: str, start: int = 0, end: Optional[int] = None) -> array:
+        """Índices en all_data de las filas de un canal (o de la porción [start, end))"""
+        with self._lock:
+            position = self._by_key.get(key)
+            if position is None:
+                return array('I')
+            return self._groups[position]['members'][start:end]
+
+
+class DataManager:
+    """Maneja la paginación y filtrado de datos"""
+    
+    def __init__(self, page_size: int = 20):
+        self.all_data = []
+        self.current_page = 0
+        self.page_size = page_size
+        self.total_rows = 0
+        self.status = StatusBitset()  # bit de procesado por índice de all_data
+        self.channels = ChannelIndex()  # agregados por canal de origen
+        self._link_index = None  # link -> índice en all_data, construido bajo demanda
+    
+    def reset(self):
+        """Vacía el conjunto para una carga progresiva (seguida de append_data y finish_load)"""
+        self.set_data(())
+    
+    def finish_load(self):
+        """Termina una carga progresiva"""
+        pass
+    
+    def set_data(self, data: Iterable[Dict[str, Any]]):
+        """Establece los datos principales (con canal y post ya extraídos de cada enlace)"""
+        self.all_data = [annotate_link(item) for item in data]
+        self.total_rows = len(self.all_data)
+        self.status = StatusBitset(self.total_rows)
+        self.status.set_many((i for i, item in enumerate(self.all_data) if item['is_clicked']), True)
+        self.channels = ChannelIndex()
+        self.channels.extend(self.all_data)
+        self.current_page = 0
+        self._link_index = None
+    
+    def append_data(self, data: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Añade registros al final sin tocar los existentes
+        
+        Returns:
+            Rango [inicio, fin) de los índices añadidos
+        """
+        start = self.total_rows
+        added = [annotate_link(item) for item in data]
+        self.all_data.extend(added)
+        if self._link_index is not None:
+            for offset, item in enumerate(added):
+                self._link_index.setdefault(item['link'], start + offset)
+        self.status.resize(start + len(added))
+        self.status.set_many((start + offset for offset, item in enumerate(added) if item['is_clicked']), True)
+        self.channels.extend(added)
+        self.total_rows = start + len(added)
+        return start, self.total_rows
+    
+    def get_item(self, index: int) -> Optional[Dict[str, Any]]:
+        """Obtiene el registro con ese índice o None si no existe"""
+        if 0 <= index < self.total_rows:
+            return self.all_data[index]
+        return None
+    
+    def get_current_page_data(self) -> List[Dict[str, Any]]:
+        """Obtiene los datos de la página actual"""
+        return self.get_page_data(self.current_page)
+    
+    def get_page_data(self, page: int, page_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Obtiene los datos de una página concreta sin cambiar la página actual"""
+        page_size = page_size or self.page_size
+        start_idx = page * page_size
+        end_idx = min(start_idx + page_size, self.total_rows)
+        return self.all_data[start_idx:end_idx]
+    
+    def page_start(self, page: int, page_size: Optional[int] = None) -> int:
+        """Índice en all_data de la primera fila de una página"""
+        return page * (page_size or self.page_size)
+    
+    def channel_members(self, key: Optional[str], unprocessed: bool = False):
+        """Índices en all_data de las filas de un canal (solo las pendientes si unprocessed)"""
+        members = self.channels.members(key or '')
+        if unprocessed:
+            status = self.status
+            members = [index for index in members if not status[index]]
+        return members
+    
+    def get_channel_page(self, key: str, page: int, page_size: Optional[int] = None) -> List[Tuple[int, Dict[str, Any]]]:
+        """Pares (índice en all_data, registro) de una página de las filas de un canal"""
+        page_size = page_size or self.page_size
+        indexes = self.channels.members(key, page * page_size, (page + 1) * page_size)
+        return [(index, self.get_item(index)) for index in indexes]
+    
+    def find_index_by_link(self, link: str) -> Optional[int]:
+        """Obtiene el índice en all_data de la primera fila con ese enlace"""
+        if self._link_index is None:
+            index = {}
+            for i, item in enumerate(self.all_data):
+                index.setdefault(item['link'], i)
+            self._link_index = index
+        return self._link_index.get(link)
+    
+    def get_pagination_info(self) -> Dict[str, Any]:
+        """Obtiene información de paginación"""
+        total_pages = (self.total_rows + self.page_size - 1) // self.page_size if self.total_rows else 0
+        current_page_display = self.current_page + 1 if self.total_rows else 0
+        
+        return {
+            'current_page': current_page_display,
+            'total_pages': total_pages,
+            'total_records': self.total_rows,
+            'can_go_prev': self.current_page > 0,
+            'can_go_next': self.current_page < total_pages - 1
+        }
+    
+    def next_page(self) -> bool:
+        """Avanza a la siguiente página"""
+        total_pages = (self.total_rows + self.page_size - 1) // self.page_size
+        if self.current_page < total_pages - 1:
+            self.current_page += 1
+            return True
+        return False
+    
+    def prev_page(self) -> bool:
+        """Retrocede a la página anterior"""
+        if self.current_page > 0:
+            self.current_page -= 1
+            return True
+        return False
+    
+    def get_ready_links(self) -> List[Dict[str, Any]]:
+        """Obtiene todos los enlaces que han sido procesados"""
+        return list(self.iter_selection('ready'))
+    
+    def count_processed(self, start: int = 0, end: Optional[int] = None) -> int:
+        """Filas procesadas en [start, end) (todas por defecto)"""
+        if start == 0 and end is None:
+            return self.status.count()
+        return self.status.count_range(start, self.total_rows if end is None else end)
+    
+    def next_unprocessed(self, start: int = 0, wrap: bool = True) -> Optional[int]:
+        """Índice de la primera fila pendiente desde start (volviendo al principio si wrap)"""
+        index = self.status.next_clear(start)
+        if index is None and wrap and start > 0:
+            index = self.status.next_clear(0)
+        return index
+    
+    def iter_selection(self, kind: str = 'all', query: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre una selección de registros sin construir listas intermedias
+        
+        Args:
+            kind: 'all', 'ready' (procesados), 'unprocessed', 'page' (página actual),
+                  'today' (procesados hoy en esta sesión), 'search' (coincidencias
+                  de query en Link/File/Text), 'channel' (filas del canal query) o
+                  'channel_unprocessed' (sus pendientes)
+            query: Texto a buscar cuando kind es 'search'; clave de channel_key
+                   cuando kind es 'channel'
+            
+        Returns:
+            Iterador de registros
+        """
+        for _, item in self.iter_indexed_selection(kind, query):
+            yield item
+    
+    def iter_indexed_selection(self, kind: str = 'all',
+                               query: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Como iter_selection, pero produce pares (índice en all_data, registro)"""
+        if kind == 'page':
+            start = self.page_start(self.current_page)
+            yield from enumerate(self.get_current_page_data(), start)
+        elif kind == 'ready':
+            yield from ((i, self.all_data[i]) for i in self.status.iter_set())
+        elif kind == 'unprocessed':
+            yield from ((i, self.all_data[i]) for i in self.status.iter_clear())
+        elif kind == 'today':
+            midnight = start_of_today()
+            for i in self.status.iter_set():
+                item = self.all_data[i]
+                if item.get('processed_at', 0) >= midnight:
+                    yield i, item
+        elif kind in ('channel', 'channel_unprocessed'):
+            yield from ((i, self.all_data[i]) for i in self.channel_members(query, kind == 'channel_unprocessed'))
+        elif kind == 'search':
+            needle = (query or '').lower()
+            yield from ((i, item) for i, item in enumerate(self.all_data) if needle in search_text(item))
+        elif kind == 'all':
+            yield from enumerate(self.all_data)
+        else:
+            raise ValueError(f"Selección desconocida: {kind}")
+    
+    def update_item_status(self, all_data_index: int, is_clicked: bool):
+        """Actualiza el estado de un elemento"""
+        if 0 <= all_data_index < self.total_rows:
+            self.update_status_many([all_data_index], is_clicked)
+    
+    def update_status_many(self, indexes: Iterable[int], is_clicked: bool) -> List[int]:
+        """
+        Actualiza el estado de varias filas en una operación
+        
+        Las filas que pasan a procesadas guardan la hora en 'processed_at'.
+        
+        Returns:
+            Índices cuyo estado cambió
+        """
+        changed = self.status.set_many(indexes, is_clicked)
+        self.channels.update_status(changed, is_clicked)
+        now = time.time()
+        for index in changed:
+            item = self.all_data[index]
+            item['is_clicked'] = is_clicked
+            if is_clicked:
+                item['processed_at'] = now
+            else:
+                item.pop('processed_at', None)
+        return changed
+    
+    def record_outcome(self, indexes: Iterable[int], outcome: str, seconds: Optional[float] = None):
+        """Guarda el resultado ('forwarded', 'failed', ...) y la duración de la última operación de cada fila"""
+        for index in indexes:
+            item = self.all_data[index]
+            item['outcome'] = outcome
+            item['elapsed'] = seconds
+    
+    def close(self):
+        """Libera los recursos del almacenamiento"""
+        pass
+
+
+def start_of_today() -> float:
+    """Marca de tiempo de las 00:00 de hoy en hora local"""
+    return datetime.datetime.combine(datetime.date.today(), datetime.time()).timestamp()
+
+
+def search_text(item: Dict[str, Any]) -> str:
+    """Texto en minúsculas sobre el que se hacen las búsquedas (Link, File y Text)"""
+    row = item['data']
+    return '\n'.join(
+        str(row[col]).lower() for col in (COL_LINK, COL_FILE, COL_TEXT)
+        if len(row) > col and row[col] is not None
+    )
+
+
+class SQLiteDataManager(DataManager):
+    """
+    DataManager con los registros en un archivo SQLite indexado
+    
+    Solo se mantienen en memoria las filas de una cache LRU de tamaño fijo,
+    así que la memoria residente no crece con el número de filas. Las páginas,
+    los enlaces listos y las búsquedas se resuelven con consultas.
+    """
+    
+    INSERT_BATCH = 5000
+    FETCH_BATCH = 2000
+    
+    def __init__(self, page_size: int = 20, store_path: Optional[str] = None, cache_rows: int = 4096):
+        """
+        Args:
+            page_size: Filas por página
+            store_path: Archivo SQLite; por defecto uno temporal que se borra al cerrar
+            cache_rows: Máximo de registros mantenidos en memoria
+        """
+        super().__init__(page_size)
+        self.cache_rows = cache_rows
+        self._owns_store = store_path is None
+        if store_path is None:
+            handle, store_path = tempfile.mkstemp(prefix='telegram-excel-', suffix='.sqlite')
+            os.close(handle)
+        self.store_path = store_path
+        self._cache = OrderedDict()  # índice -> registro
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(store_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=OFF')
+        self._conn.execute('PRAGMA synchronous=OFF')
+        self._create_schema()
+    
+    def _create_schema(self):
+        with self._lock:
+            self._conn.execute('DROP TABLE IF EXISTS rows')
+            self._conn.execute(
+                'CREATE TABLE rows ('
+                ' idx INTEGER PRIMARY KEY,'
+                ' excel_row INTEGER,'
+                ' link TEXT,'
+                ' is_clicked INTEGER,'
+                ' channel INTEGER,'
+                ' post INTEGER,'
+                ' source TEXT,'
+                ' search TEXT,'
+                ' data BLOB,'
+                ' processed_at REAL,'
+                ' outcome TEXT,'
+                ' elapsed REAL)'
+            )
+    
+    COLUMNS = 'idx, excel_row, link, is_clicked, channel, post, source, data, processed_at, outcome, elapsed'
+    
+    @staticmethod
+    def _to_item(record) -> Dict[str, Any]:
+        idx, excel_row, link, is_clicked, channel, post, source, data, processed_at, outcome, elapsed = record
+        item = {
+            'excel_row': excel_row,
+            'data': pickle.loads(data),
+            'link': link,
+            'is_clicked': bool(is_clicked),
+            'channel': channel,
+            'post': post
+        }
+        if source is not None:
+            item['source_path'] = source
+        if processed_at is not None:
+            item['processed_at'] = processed_at
+        if outcome is not None:
+            item['outcome'] = outcome
+            item['elapsed'] = elapsed
+        return item
+    
+    def _remember(self, index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        cached = self._cache.get(index)
+        if cached is not None:
+            self._cache.move_to_end(index)
+            return cached
+        self._cache[index] = item
+        while len(self._cache) > self.cache_rows:
+            self._cache.popitem(last=False)
+        return item
+    
+    def set_data(self, data: Iterable[Dict[str, Any]]):
+        """Vuelca los registros al almacenamiento en lotes, sin retenerlos en memoria"""
+        with self._lock:
+            self.reset()
+            self._insert(data)
+            self.finish_load()
+    
+    def reset(self):
+        with self._lock:
+            self._create_schema()
+            self._cache.clear()
+            self.total_rows = 0
+            self.status = StatusBitset()
+            self.channels = ChannelIndex()
+            self.current_page = 0
+    
+    def finish_load(self):
+        """Crea los índices una vez insertadas las filas (más rápido que mantenerlos al insertar)"""
+        with self._lock:
+            self._conn.execute('CREATE INDEX IF NOT EXISTS rows_link ON rows (link)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS rows_clicked ON rows (is_clicked, idx)')
+            self._conn.commit()
+    
+    def append_data(self, data: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        with self._lock:
+            start = self.total_rows
+            self._insert(data)
+            self._conn.commit()
+            return start, self.total_rows
+    
+    def _insert(self, data: Iterable[Dict[str, Any]]):
+        """Inserta registros a continuación de los existentes y amplía el bitset"""
+        count = self.total_rows
+        batch = []
+        processed = []
+        items = []  # registros del lote, para los agregados por canal
+        for item in data:
+            annotate_link(item)
+            items.append(item)
+            if item['is_clicked']:
+                processed.append(count)
+            batch.append((
+                count, item['excel_row'], item['link'], int(bool(item['is_clicked'])),
+                item['channel'], item['post'], item.get('source_path'), search_text(item),
+                pickle.dumps(tuple(item['data']), protocol=pickle.HIGHEST_PROTOCOL),
+                None, None, None
+            ))
+            count += 1
+            if len(batch) >= self.INSERT_BATCH:
+                self._conn.executemany('INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+                self.channels.extend(items)
+                batch, items = [], []
+        if batch:
+            self._conn.executemany('INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+            self.channels.extend(items)
+        self.status.resize(count)
+        self.status.set_many(processed, True)
+        self.total_rows = count
+    
+    def get_item(self, index: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cached = self._cache.get(index)
+            if cached is not None:
+                self._cache.move_to_end(index)
+                return cached
+            record = self._conn.execute(
+                f'SELECT {self.COLUMNS} FROM rows WHERE idx = ?', (index,)
+            ).fetchone()
+            return self._remember(index, self._to_item(record)) if record else None
+    
+    def get_page_data(self, page: int, page_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        page_size = page_size or self.page_size
+        start_idx = page * page_size
+        end_idx = min(start_idx + page_size, self.total_rows)
+        with self._lock:
+            if all(index in self._cache for index in range(start_idx, end_idx)):
+                return [self.get_item(index) for index in range(start_idx, end_idx)]
+            records = self._conn.execute(
+                f'SELECT {self.COLUMNS} FROM rows WHERE idx >= ? AND idx < ? ORDER BY idx',
+                (start_idx, end_idx)
+            ).fetchall()
+            return [self._remember(record[0], self._to_item(record)) for record in records]
+    
+    def find_index_by_link(self, link: str) -> Optional[int]:
+        with self._lock:
+            record = self._conn.execute(
+                'SELECT idx FROM rows WHERE link = ? ORDER BY idx LIMIT 1', (link,)
+            ).fetchone()
+        return record[0] if record else None
+    
+    def _iter_query(self, where: str = '', params: Tuple = ()) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Recorre el resultado de una consulta por bloques de idx para no retener el cursor"""
+        last = -1
+        while True:
+            with self._lock:
+                records = self._conn.execute(
+                    f'SELECT {self.COLUMNS} FROM rows WHERE idx > ? '
+                    + where + ' ORDER BY idx LIMIT ?',
+                    (last,) + params + (self.FETCH_BATCH,)
+                ).fetchall()
+            if not records:
+                return
+            for record in records:
+                yield record[0], self._to_item(record)
+            last = records[-1][0]
+    
+    def _iter_indexes(self, indexes) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Recorre las filas de una lista ordenada de índices, por bloques de FETCH_BATCH"""
+        for start in range(0, len(indexes), self.FETCH_BATCH):
+            chunk = indexes[start:start + self.FETCH_BATCH]
+            with self._lock:
+                records = self._conn.execute(
+                    f'SELECT {self.COLUMNS} FROM rows WHERE idx IN ({", ".join("?" * len(chunk))}) ORDER BY idx',
+                    tuple(chunk)
+                ).fetchall()
+            for record in records:
+                yield record[0], self._to_item(record)
+    
+    def get_channel_page(self, key: str, page: int, page_size: Optional[int] = None) -> List[Tuple[int, Dict[str, Any]]]:
+        page_size = page_size or self.page_size
+        entries = []
+        for index, item in self._iter_indexes(self.channels.members(key, page * page_size, (page + 1) * page_size)):
+            with self._lock:
+                entries.append((index, self._remember(index, item)))
+        return entries
+    
+    def iter_indexed_selection(self, kind: str = 'all',
+                               query: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        if kind == 'page':
+            start = self.page_start(self.current_page)
+            yield from enumerate(self.get_current_page_data(), start)
+        elif kind == 'ready':
+            yield from self._iter_query('AND is_clicked = 1')
+        elif kind == 'unprocessed':
+            yield from self._iter_query('AND is_clicked = 0')
+        elif kind == 'today':
+            yield from self._iter_query('AND is_clicked = 1 AND processed_at >= ?', (start_of_today(),))
+        elif kind in ('channel', 'channel_unprocessed'):
+            yield from self._iter_indexes(self.channel_members(query, kind == 'channel_unprocessed'))
+        elif kind == 'search':
+            needle = (query or '').lower()
+            escaped = needle.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            yield from self._iter_query("AND search LIKE ? ESCAPE '\\'", (f'%{escaped}%',))
+        elif kind == 'all':
+            yield from self._iter_query()
+        else:
+            raise ValueError(f"Selección desconocida: {kind}")
+    
+    def update_item_status(self, all_data_index: int, is_clicked: bool):
+        self.update_status_many([all_data_index], is_clicked)
+    
+    def update_status_many(self, indexes: Iterable[int], is_clicked: bool) -> List[int]:
+        with self._lock:
+            changed = self.status.set_many(indexes, is_clicked)
+            self.channels.update_status(changed, is_clicked)
+            processed_at = time.time() if is_clicked else None
+            self._conn.executemany(
+                'UPDATE rows SET is_clicked = ?, processed_at = ? WHERE idx = ?',
+                ((int(is_clicked), processed_at, index) for index in changed)
+            )
+            self._conn.commit()
+            for index in changed:
+                cached = self._cache.get(index)
+                if cached is not None:
+                    cached['is_clicked'] = is_clicked
+                    if is_clicked:
+                        cached['processed_at'] = processed_at
+                    else:
+                        cached.pop('processed_at', None)
+        return changed
+    
+    def record_outcome(self, indexes: Iterable[int], outcome: str, seconds: Optional[float] = None):
+        indexes = list(indexes)
+        with self._lock:
+            self._conn.executemany(
+                'UPDATE rows SET outcome = ?, elapsed = ? WHERE idx = ?',
+                ((outcome, seconds, index) for index in indexes)
+            )
+            self._conn.commit()
+            for index in indexes:
+                cached = self._cache.get(index)
+                if cached is not None:
+                    cached['outcome'] = outcome
+                    cached['elapsed'] = seconds
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+            self._cache.clear()
+        if self._owns_store:
+            try:
+                os.remove(self.store_path)
+            except OSError:
+                pass
+
+
+def format_row_values(item: Dict[str, Any]) -> Tuple:
+    """Construye los valores que muestra la tabla para un registro"""
+    values = tuple(item['data'])
+    if item['is_clicked']:
+        values = (f"✅ {item['link']}",) + values[1:]
+    return values
+
+
+def format_channel_values(entry: Dict[str, Any]) -> Tuple:
+    """Valores de una entrada de ChannelIndex.summary para tablas e informes (canal, filas, tamaño, duración)"""
+    size_bytes = entry['size_bytes']
+    size = f"{size_bytes / 1024 ** 3:.1f} GB" if size_bytes >= 1024 ** 3 else f"{size_bytes / 1024 ** 2:.0f} MB"
+    hours, rest = divmod(int(entry['duration']), 3600)
+    return (entry['label'], entry['total'], entry['processed'], entry['unprocessed'],
+            size, f"{hours}h{rest // 60:02d}m")
+
+
+class PageCache:
+    """
+    Cache LRU de páginas con las filas ya formateadas para la tabla
+    
+    Cada entrada es una lista de tuplas (índice en all_data, valores, registro).
+    Las páginas vecinas se precalculan en un hilo de fondo y los cambios de
+    estado solo vuelven a formatear la fila afectada.
+    """
+    
+    def __init__(self, data_manager: 'DataManager', capacity: int = 16):
+        self.data_manager = data_manager
+        self.capacity = capacity
+        self._pages = OrderedDict()  # (página, tamaño) -> filas formateadas
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._worker = None
+        self._generation = 0  # cambia con cada invalidación; descarta builds concurrentes
+    
+    def _build(self, page: int, page_size: int) -> List[Tuple[int, Tuple, Dict[str, Any]]]:
+        start = self.data_manager.page_start(page, page_size)
+        return [
+            (start + offset, format_row_values(item), item)
+            for offset, item in enumerate(self.data_manager.get_page_data(page, page_size))
+        ]
+    
+    def _store(self, key, rows, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._pages[key] = rows
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.capacity:
+                self._pages.popitem(last=False)
+    
+    def get(self, page: int, page_size: int) -> List[Tuple[int, Tuple, Dict[str, Any]]]:
+        """Obtiene las filas formateadas de una página, construyéndolas si no están en cache"""
+        key = (page, page_size)
+        with self._lock:
+            rows = self._pages.get(key)
+            if rows is not None:
+                self._pages.move_to_end(key)
+                return rows
+            generation = self._generation
+        rows = self._build(page, page_size)
+        self._store(key, rows, generation)
+        return rows
+    
+    def prefetch(self, page: int, page_size: int, radius: int = 1):
+        """Precalcula en segundo plano las páginas vecinas a la indicada"""
+        total_pages = (self.data_manager.total_rows + page_size - 1) // page_size
+        for neighbour in range(page - radius, page + radius + 1):
+            if neighbour != page and 0 <= neighbour < total_pages:
+                self._requests.put((neighbour, page_size))
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._worker.start()
+    
+    def _prefetch_loop(self):
+        while True:
+            try:
+                key = self._requests.get(timeout=5)
+            except queue.Empty:
+                return
+            with self._lock:
+                cached = key in self._pages
+                generation = self._generation
+            if not cached:
+                try:
+                    self._store(key, self._build(*key), generation)
+                except Exception:
+                    # El prefetch es oportunista: si falla, la página se construye al pedirla
+                    continue
+    
+    def invalidate_indexes(self, indexes: Iterable[int]):
+        """Vuelve a formatear solo las filas indicadas en las páginas que las contienen"""
+        indexes = set(indexes)
+        with self._lock:
+            self._generation += 1
+            for (page, page_size), rows in self._pages.items():
+                start = page * page_size
+                for index in indexes:
+                    offset = index - start
+                    if 0 <= offset < len(rows):
+                        item = self.data_manager.get_item(index)
+                        rows[offset] = (index, format_row_values(item), item)
+    
+    def invalidate_from(self, index: int):
+        """Descarta las páginas que llegan a index o más allá (filas añadidas al final)"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._pages if (key[0] + 1) * key[1] > index]:
+                del self._pages[key]
+    
+    def clear(self):
+        """Descarta todas las páginas (nuevos datos o cambio de paginación)"""
+        with self._lock:
+            self._generation += 1
+            self._pages.clear()
+
+
+class SessionProfiler:
+    """
+    Perfilado opcional de la sesión o de fases concretas
+    
+    Cada fase activa ('load', 'render', 'forward' o 'session' para toda la
+    ejecución) se mide con cProfile en el hilo que la ejecuta; un hilo
+    muestreador guarda las pilas de los hilos dentro de una fase para generar
+    flamegraphs. Las asignaciones por línea salen de snapshots de tracemalloc
+    al empezar y terminar la sesión; las demás fases solo anotan la variación
+    de memoria trazada. Al cerrar se escriben un archivo pstats por fase, un
+    informe de asignaciones y las pilas colapsadas.
+    
+    Desde Python 3.12 cProfile es global al proceso (sys.monitoring) y solo
+    admite un perfilador activo: un hilo que entra en una fase mientras otro
+    ya mide no abre el suyo, y su tiempo queda en el perfil de ese otro hilo
+    (y en las pilas muestreadas de su propia fase).
+    """
+    
+    PHASES = ('session', 'load', 'render', 'forward')
+    SAMPLE_INTERVAL = 0.005  # segundos entre muestras de pilas
+    TRACE_FRAMES = 25
+    
+    def __init__(self, output_dir: Optional[str] = None, phases: Iterable[str] = (), top_n: int = 30):
+        """
+        Args:
+            output_dir: Carpeta de los informes (por defecto ./profile-<fecha>)
+            phases: Fases a perfilar; 'all' equivale a todas salvo 'session'
+            top_n: Líneas del informe de asignaciones por fase
+        """
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.phases = set()
+        self.set_phases(phases)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {}  # fase -> pstats.Stats acumulado
+        self._allocations = {}  # fase -> Counter de (archivo, línea) -> bytes (solo 'session')
+        self._memory = Counter()  # fase -> variación neta de memoria trazada (bytes)
+        self._calls = Counter()  # fase -> veces medida
+        self._stacks = Counter()  # pila colapsada -> muestras
+        self._active_threads = {}  # id de hilo -> fase
+        self._sampler = None
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.phases)
+    
+    def set_phases(self, phases: Iterable[str]):
+        """Cambia las fases perfiladas (también en caliente desde la GUI)"""
+        selected = set()
+        for phase in phases:
+            if phase == 'all':
+                selected.update(p for p in self.PHASES if p != 'session')
+            elif phase in self.PHASES:
+                selected.add(phase)
+            elif phase:
+                raise ValueError(f"Fase de perfilado desconocida: {phase}")
+        self.phases = selected
+        if selected and not tracemalloc.is_tracing():
+            tracemalloc.start(self.TRACE_FRAMES)
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Mide el bloque si la fase está activa; si no, no hace nada"""
+        if name not in self.phases or getattr(self._local, 'active', None):
+            yield
+            return
+        
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Python >= 3.12 con otro perfilador ya activo en otro hilo
+            profile = None
+        tracing = tracemalloc.is_tracing()
+        before = tracemalloc.take_snapshot() if tracing and name == 'session' else None
+        memory_before = tracemalloc.get_traced_memory()[0] if tracing else None
+        thread_id = threading.get_ident()
+        try:
+            self._local.active = name
+            with self._lock:
+                self._active_threads[thread_id] = name
+                self._ensure_sampler()
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            after = tracemalloc.take_snapshot() if before is not None and tracemalloc.is_tracing() else None
+            memory_after = tracemalloc.get_traced_memory()[0] if memory_before is not None else None
+            self._local.active = None
+            with self._lock:
+                self._active_threads.pop(thread_id, None)
+                self._calls[name] += 1
+                if profile is not None:
+                    if name in self._stats:
+                        self._stats[name].add(profile)
+                    else:
+                        self._stats[name] = pstats.Stats(profile)
+                if memory_after is not None:
+                    self._memory[name] += memory_after - memory_before
+                if after is not None:
+                    allocations = self._allocations.setdefault(name, Counter())
+                    for stat in after.compare_to(before, 'lineno'):
+                        if stat.size_diff > 0:
+                            frame = stat.traceback[0]
+                            allocations[(frame.filename, frame.lineno)] += stat.size_diff
+    
+    def _ensure_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler.start()
+    
+    def _sample_loop(self):
+        """Toma muestras de las pilas de los hilos que están dentro de una fase"""
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                active = dict(self._active_threads)
+            if not active:
+                time.sleep(self.SAMPLE_INTERVAL * 10)
+                if not self.phases:
+                    return
+                continue
+            frames = sys._current_frames()
+            for thread_id, name in active.items():
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                key = ';'.join(reversed(stack))
+                with self._lock:
+                    self._stacks[key] += 1
+            time.sleep(self.SAMPLE_INTERVAL)
+    
+    def write_reports(self) -> List[str]:
+        """
+        Escribe los informes de lo medido hasta ahora
+        
+        Returns:
+            Rutas generadas (vacío si no se midió nada)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            allocations = {name: Counter(counter) for name, counter in self._allocations.items()}
+            stacks = Counter(self._stacks)
+            calls = Counter(self._calls)
+            memory = Counter(self._memory)
+        if not calls:
+            return []
+        
+        output_dir = self.output_dir or os.path.join(
+            os.getcwd(), time.strftime('profile-%Y%m%d-%H%M%S')
+        )
+        os.makedirs(output_dir, exist_ok=True)
+        paths = []
+        
+        for name, phase_stats in stats.items():
+            path = os.path.join(output_dir, f"{name}.pstats")
+            phase_stats.dump_stats(path)
+            paths.append(path)
+        
+        path = os.path.join(output_dir, 'allocations.txt')
+        with open(path, 'w', encoding='utf-8') as handle:
+            for name in calls:
+                handle.write(f"== {name} ({calls[name]} veces) ==\n")
+                if name in memory:
+                    handle.write(f"Variación neta de memoria trazada: {memory[name] / 1024:.1f} KiB\n")
+                for (filename, lineno), size in allocations.get(name, Counter()).most_common(self.top_n):
+                    handle.write(f"{size / 1024:12.1f} KiB  {filename}:{lineno}\n")
+                handle.write('\n')
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                handle.write(f"Memoria trazada: actual {current / 1024 ** 2:.1f} MiB, pico {peak / 1024 ** 2:.1f} MiB\n")
+        paths.append(path)
+        
+        path = os.path.join(output_dir, 'stacks.collapsed')
+        with open(path, 'w', encoding='utf-8') as handle:
+            for stack, count in stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+        paths.append(path)
+        return paths
+    
+    def close(self) -> List[str]:
+        """Escribe los informes y detiene el muestreo y tracemalloc"""
+        paths = self.write_reports()
+        self.phases = set()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return paths
+
+
+class UIEvent:
+    """Tipos de eventos que los hilos de trabajo publican para la GUI"""
+    
+    ROW_STATUS = 'row_status'  # key: índice en all_data
+    JOB_PROGRESS = 'job_progress'  # key: id del trabajo, payload: dict de estado
+    LOAD_PROGRESS = 'load_progress'  # payload: dict con filas leídas
+    ROWS_ADDED = 'rows_added'  # key: ruta del archivo, payload: dict de la ingesta
+    ETA = 'eta'  # key: operación ('forward', 'transfer'), payload: EtaTracker.snapshot() o None al terminar
+    CALL = 'call'  # payload: callable a ejecutar en el hilo de Tk
+    
+    MERGEABLE = (JOB_PROGRESS, LOAD_PROGRESS, ETA)
+
+
+class DispatchBus:
+    """
+    Cola segura entre hilos para enviar eventos al hilo de Tk
+    
+    Los hilos de trabajo publican con post() y la GUI vacía la cola por lotes
+    con drain(). Los eventos de progreso con el mismo (tipo, key) pendientes se
+    fusionan: se conserva la posición del primero y el payload del último.
+    Otros consumidores (el servidor de control) se suscriben con subscribe() y
+    reciben una copia de lo publicado con broadcast().
+    """
+    
+    _MERGED = object()
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = deque()  # (tipo, key, payload) o (tipo, key, _MERGED)
+        self._latest = {}  # (tipo, key) -> último payload de eventos fusionables
+        self._subscribers = []
+    
+    def post(self, event_type: str, key=None, payload=None):
+        """Publica un evento; se puede llamar desde cualquier hilo"""
+        with self._lock:
+            if event_type in UIEvent.MERGEABLE:
+                merge_key = (event_type, key)
+                if merge_key not in self._latest:
+                    self._events.append((event_type, key, self._MERGED))
+                self._latest[merge_key] = payload
+            else:
+                self._events.append((event_type, key, payload))
+    
+    def call(self, func: Callable):
+        """Programa func para ejecutarse en el hilo de Tk"""
+        self.post(UIEvent.CALL, payload=func)
+    
+    def drain(self, max_events: Optional[int] = None) -> List[Tuple[str, Any, Any]]:
+        """
+        Extrae los eventos pendientes en orden de llegada
+        
+        Args:
+            max_events: Máximo de eventos a extraer; el resto queda para el siguiente lote
+            
+        Returns:
+            Lista de tuplas (tipo, key, payload)
+        """
+        batch = []
+        with self._lock:
+            while self._events and (max_events is None or len(batch) < max_events):
+                event_type, key, payload = self._events.popleft()
+                if payload is self._MERGED:
+                    payload = self._latest.pop((event_type, key))
+                batch.append((event_type, key, payload))
+        return batch
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._events)
+    
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+    
+    def subscribe(self, max_pending: int = 10000) -> 'EventSubscription':
+        """Registra un consumidor adicional de eventos"""
+        subscription = EventSubscription(max_pending)
+        with self._lock:
+            self._subscribers = self._subscribers + [subscription]
+        return subscription
+    
+    def unsubscribe(self, subscription: 'EventSubscription'):
+        with self._lock:
+            self._subscribers = [other for other in self._subscribers if other is not subscription]
+    
+    def broadcast(self, event_type: str, key=None, payload=None):
+        """Entrega un evento a los suscriptores; no pasa por la cola de la GUI"""
+        for subscription in self._subscribers:
+            subscription.put((event_type, key, payload))
+
+
+class EventSubscription:
+    """
+    Eventos pendientes de un suscriptor de DispatchBus
+    
+    La cola está acotada: si el consumidor no da abasto se descartan los
+    eventos más antiguos y se cuentan en dropped.
+    """
+    
+    def __init__(self, max_pending: int = 10000):
+        self._events = deque(maxlen=max_pending)
+        self._condition = threading.Condition()
+        self.dropped = 0
+    
+    def put(self, event: Tuple[str, Any, Any]):
+        with self._condition:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._condition.notify()
+    
+    def get(self, timeout: Optional[float] = None) -> List[Tuple[str, Any, Any]]:
+        """Espera hasta timeout segundos y devuelve los eventos pendientes (quizá ninguno)"""
+        with self._condition:
+            if not self._events:
+                self._condition.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+
+class DirectoryWatcher:
+    """
+    Vigila una carpeta y avisa cuando aparece o cambia una lista de enlaces
+    
+    Usa inotify (Linux, vía ctypes) y, si no está disponible, sondea la carpeta
+    periódicamente. Un archivo solo se entrega cuando lleva 'debounce' segundos
+    sin cambios de tamaño ni fecha, para no leer exportaciones a medio escribir.
+    El callback se ejecuta en el hilo del vigilante.
+    """
+    
+    EXTENSIONS = ('.xlsx', '.xlsm', '.csv', '.tsv', '.json')
+    
+    _IN_MODIFY = 0x00000002
+    _IN_CLOSE_WRITE = 0x00000008
+    _IN_MOVED_TO = 0x00000080
+    _IN_CREATE = 0x00000100
+    _IN_NONBLOCK = 0o4000
+    _IN_CLOEXEC = 0o2000000
+    _EVENT_HEADER = struct.Struct('iIII')
+    
+    def __init__(self, directory: str, callback: Callable[[str], None],
+                 debounce: float = 2.0, poll_interval: float = 2.0):
+        """
+        Args:
+            directory: Carpeta a vigilar (no recursivo)
+            callback: Función que recibe la ruta de cada archivo nuevo o actualizado
+            debounce: Segundos sin cambios antes de entregar un archivo
+            poll_interval: Intervalo de sondeo si no hay inotify
+        """
+        self.directory = directory
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = None  # 'inotify' o 'polling' una vez iniciado
+        self._pending = {}  # ruta -> (última actividad, (tamaño, mtime))
+        self._known = {}  # ruta -> (tamaño, mtime) ya entregado o preexistente
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+    
+    def start(self):
+        """Empieza a vigilar; los archivos que ya existen no se entregan"""
+        if self._thread is not None:
+            return
+        self._known = self._scan()
+        self._fd = self._open_inotify()
+        self.backend = 'inotify' if self._fd is not None else 'polling'
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Deja de vigilar"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _wanted(self, name: str) -> bool:
+        return (name.lower().endswith(self.EXTENSIONS)
+                and not name.startswith(('.', '~$')))
+    
+    def _stat(self, path: str) -> Optional[Tuple[int, int]]:
+        try:
+            info = os.stat(path)
+        except OSError:
+            return None
+        return info.st_size, info.st_mtime_ns
+    
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        found = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and self._wanted(entry.name):
+                        info = entry.stat()
+                        found[entry.path] = (info.st_size, info.st_mtime_ns)
+        except OSError:
+            pass
+        return found
+    
+    def _open_inotify(self) -> Optional[int]:
+        """Crea el descriptor de inotify sobre la carpeta, o None si no está disponible"""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(self._IN_NONBLOCK | self._IN_CLOEXEC)
+            if fd < 0:
+                return None
+            mask = self._IN_CLOSE_WRITE | self._IN_MOVED_TO | self._IN_CREATE | self._IN_MODIFY
+            if libc.inotify_add_watch(fd, os.fsencode(self.directory), mask) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+    
+    def _touch(self, path: str):
+        self._pending[path] = (time.monotonic(), self._stat(path))
+    
+    def _read_inotify(self, timeout: float):
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + self._EVENT_HEADER.size <= len(data):
+            _, _, _, length = self._EVENT_HEADER.unpack_from(data, offset)
+            offset += self._EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if name and self._wanted(name):
+                self._touch(os.path.join(self.directory, name))
+    
+    def _poll(self):
+        for path, stat in self._scan().items():
+            if self._known.get(path) != stat and (path not in self._pending or self._pending[path][1] != stat):
+                self._touch(path)
+    
+    def _run(self):
+        tick = min(self.poll_interval, max(0.1, self.debounce / 4))
+        last_poll = 0.0
+        while not self._stop.is_set():
+            if self._fd is not None:
+                self._read_inotify(tick)
+            else:
+                self._stop.wait(tick)
+                if time.monotonic() - last_poll >= self.poll_interval:
+                    last_poll = time.monotonic()
+                    self._poll()
+            self._deliver_settled()
+    
+    def _deliver_settled(self):
+        """Entrega los archivos que llevan 'debounce' segundos sin cambiar"""
+        now = time.monotonic()
+        for path, (last_change, stat) in list(self._pending.items()):
+            current = self._stat(path)
+            if current is None:
+                del self._pending[path]
+                continue
+            if current != stat:
+                self._pending[path] = (now, current)
+                continue
+            if now - last_change < self.debounce:
+                continue
+            del self._pending[path]
+            if self._known.get(path) == current:
+                continue
+            self._known[path] = current
+            try:
+                self.callback(path)
+            except Exception as e:
+                print(f"Error al procesar {path}: {str(e)}")
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _ControlRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Traduce las peticiones HTTP a ControlServer.dispatch"""
+    
+    protocol_version = 'HTTP/1.1'  # conexiones persistentes para clientes que envían muchos lotes
+    
+    def do_GET(self):
+        self.server.control.dispatch(self, 'GET')
+    
+    def do_POST(self):
+        self.server.control.dispatch(self, 'POST')
+    
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class ControlServer:
+    """
+    API local de control sobre TelegramExcelFunctions (HTTP en localhost o socket Unix)
+    
+    Rutas (cuerpos JSON, 'Content-Type: application/json' en los POST):
+        POST /forward   {"links": [...]} o {"indexes": [...]}; "lane": "interactive" opcional
+        POST /download  Igual que /forward; "directory" opcional, dentro de 'download_dir'
+        POST /mark      {"links" o "indexes", "processed": true/false}
+        GET  /status    Totales, cola, trabajos del servidor y proyección de las operaciones
+                        por lotes en curso; ?jobs=1,2 detalla trabajos
+        GET  /events    Flujo NDJSON de eventos (filas, trabajos, ingestas); ?types=row_status,...
+    
+    Una petición puede traer miles de enlaces. La contrapresión viene de la
+    cola de operaciones: si ya hay max_pending trabajos en espera solo se
+    aceptan los que caben y se responde 429 con Retry-After; el cliente reenvía
+    el resto. Solo escucha en loopback o en un socket Unix con permisos 0600.
+    
+    Toda petición lleva 'Authorization: Bearer <token>'; si no se configura un
+    token se genera uno al crear el servidor. En TCP además se rechazan las
+    peticiones cuyo Host no sea el propio servidor (un navegador con DNS
+    rebinding apuntando a localhost mandaría el nombre del atacante).
+    """
+    
+    MAX_BODY = 64 * 1024 ** 2
+    JOB_HISTORY = 200000  # trabajos recordados para /status?jobs=
+    HEARTBEAT = 15.0  # segundos entre latidos del flujo de eventos
+    LOOPBACK = ('127.0.0.1', 'localhost')
+    
+    def __init__(self, functions: 'TelegramExcelFunctions', address: str = '127.0.0.1:8765',
+                 max_pending: int = 20000, token: Optional[str] = None):
+        """
+        Args:
+            functions: Instancia de TelegramExcelFunctions
+            address: 'host:puerto' en loopback o 'unix:/ruta/al/socket'
+            max_pending: Trabajos en espera en la cola a partir de los que se rechaza
+            token: Token exigido en 'Authorization: Bearer <token>' (aleatorio si no se indica)
+        """
+        self.functions = functions
+        self.address = address
+        self.max_pending = max_pending
+        self.token = token or secrets.token_urlsafe(32)
+        self._allowed_hosts = None  # None en socket Unix
+        self._jobs = OrderedDict()  # id -> {'kind', 'link', 'index', 'state'}
+        self._next_id = 1
+        self._states = Counter()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._server = None
+        self._thread = None
+        self._socket_path = None
+    
+    def start(self):
+        """Abre el socket y atiende peticiones en un hilo de fondo"""
+        if self.address.startswith('unix:'):
+            self._socket_path = os.path.expanduser(self.address[len('unix:'):])
+            if os.path.lexists(self._socket_path):
+                if not stat.S_ISSOCK(os.lstat(self._socket_path).st_mode):
+                    raise ValueError(f"{self._socket_path} ya existe y no es un socket; no se borra")
+                os.remove(self._socket_path)  # socket de una ejecución anterior
+            # El socket nace ya con 0600: no hay un momento en que otros usuarios puedan conectarse
+            previous_umask = os.umask(0o177)
+            try:
+                server = _ThreadingUnixHTTPServer(self._socket_path, _ControlRequestHandler)
+            finally:
+                os.umask(previous_umask)
+            os.chmod(self._socket_path, 0o600)
+        else:
+            host, _, port = self.address.rpartition(':')
+            host = host or '127.0.0.1'
+            if host not in self.LOOPBACK:
+                raise ValueError(f"El servidor de control solo escucha en localhost, no en {host}")
+            server = http.server.ThreadingHTTPServer((host, int(port)), _ControlRequestHandler)
+            port = server.server_address[1]
+            self._allowed_hosts = {f"{name}:{port}" for name in self.LOOPBACK}
+        server.daemon_threads = True
+        server.control = self
+        self._server = server
+        self._stopping.clear()
+        self._thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.5}, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stopping.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.remove(self._socket_path)
+    
+    @property
+    def url(self) -> str:
+        if self._socket_path:
+            return f"unix:{self._socket_path}"
+        host, port = self._server.server_address[:2] if self._server else self.address.rsplit(':', 1)
+        return f"http://{host}:{port}"
+    
+    # Peticiones
+    
+    def dispatch(self, handler: http.server.BaseHTTPRequestHandler, method: str):
+        url = urlsplit(handler.path)
+        query = parse_qs(url.query)
+        try:
+            if self._allowed_hosts is not None and handler.headers.get('Host', '').lower() not in self._allowed_hosts:
+                handler.close_connection = True  # el cuerpo queda sin leer
+                return self._reply(handler, 403, {'error': "Host no permitido"})
+            # En bytes: compare_digest rechaza (TypeError) cadenas con caracteres no ASCII
+            authorization = handler.headers.get('Authorization', '').encode('latin-1', 'replace')
+            if not secrets.compare_digest(authorization, f"Bearer {self.token}".encode()):
+                handler.close_connection = True
+                return self._reply(handler, 401, {'error': "Token incorrecto"})
+            if method == 'GET' and url.path == '/status':
+                return self._reply(handler, 200, self.status(query.get('jobs', [''])[0]))
+            if method == 'GET' and url.path == '/events':
+                return self._stream_events(handler, query.get('types', [''])[0])
+            if method == 'POST' and url.path in ('/forward', '/download', '/mark'):
+                body = self._read_json(handler)
+                if body is None:
+                    return
+                if url.path == '/mark':
+                    return self._reply(handler, 200, self.mark(body))
+                status, result = self.enqueue(url.path[1:], body)
+                headers = {'Retry-After': str(result['retry_after'])} if status == 429 else None
+                return self._reply(handler, status, result, headers)
+            return self._reply(handler, 404, {'error': f"Ruta desconocida: {method} {url.path}"})
+        except ValueError as e:
+            return self._reply(handler, 400, {'error': str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            handler.close_connection = True
+    
+    def _read_json(self, handler) -> Optional[Dict[str, Any]]:
+        if handler.headers.get_content_type() != 'application/json':
+            handler.close_connection = True
+            self._reply(handler, 415, {'error': "Se esperaba Content-Type: application/json"})
+            return None
+        length = int(handler.headers.get('Content-Length') or 0)
+        if length > self.MAX_BODY:
+            handler.close_connection = True
+            self._reply(handler, 413, {'error': f"Cuerpo mayor de {self.MAX_BODY} bytes"})
+            return None
+        try:
+            body = json.loads(handler.rfile.read(length) or b'{}')
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON inválido: {e}")
+        if not isinstance(body, dict):
+            raise ValueError("El cuerpo debe ser un objeto JSON")
+        return body
+    
+    @staticmethod
+    def _reply(handler, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json; charset=utf-8')
+        handler.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+    
+    # Operaciones
+    
+    def _targets(self, body: Dict[str, Any]) -> Tuple[List[Tuple[str, Optional[int]]], int]:
+        """(enlace, índice) de los enlaces o índices del cuerpo y cuántos no son válidos"""
+        manager = self.functions.data_manager
+        targets, invalid = [], 0
+        for link in body.get('links') or ():
+            if isinstance(link, str) and link:
+                targets.append((link, manager.find_index_by_link(link)))
+            else:
+                invalid += 1
+        for index in body.get('indexes') or ():
+            item = manager.get_item(index) if isinstance(index, int) and 0 <= index < manager.total_rows else None
+            if item is None:
+                invalid += 1
+            else:
+                targets.append((item['link'], index))
+        return targets, invalid
+    
+    def enqueue(self, kind: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Encola reenvíos o descargas hasta llenar la cola
+        
+        Returns:
+            Tupla (código HTTP, respuesta con 'accepted', 'rejected', 'invalid' y 'jobs')
+        """
+        lane = body.get('lane', OperationQueue.BATCH)
+        if lane not in (OperationQueue.INTERACTIVE, OperationQueue.BATCH):
+            raise ValueError(f"Carril desconocido: {lane}")
+        directory = self._download_directory(body.get('directory')) if kind == 'download' else None
+        targets, invalid = self._targets(body)
+        operations = self.functions.operations
+        tracked = []  # (id, future)
+        with self._lock:
+            free = max(0, self.max_pending - sum(operations.pending().values()))
+            accepted = targets[:free]
+            for link, index in accepted:
+                if kind == 'forward':
+                    future = self.functions.enqueue_forward(link, index, lane)
+                else:
+                    future = self.functions.enqueue_download(link, index, lane, directory)
+                tracked.append((self._track(kind, link, index), future))
+        # Fuera del lock: un trabajo ya terminado ejecuta el callback en este mismo hilo
+        for job_id, future in tracked:
+            future.add_done_callback(lambda done, job_id=job_id: self._finished(job_id, done))
+        jobs = [job_id for job_id, _ in tracked]
+        result = {'accepted': len(accepted), 'rejected': len(targets) - len(accepted), 'invalid': invalid,
+                  'jobs': jobs}
+        if result['rejected']:
+            result['retry_after'] = self._retry_after()
+            return 429, result
+        return 202, result
+    
+    def _download_directory(self, directory: Any) -> str:
+        """Carpeta pedida para /download (relativa a 'download_dir'); fuera de ella es un error"""
+        root = os.path.realpath(self.functions.download_root())
+        if directory in (None, ''):
+            return root
+        if not isinstance(directory, str):
+            raise ValueError("'directory' debe ser una ruta")
+        path = os.path.realpath(os.path.join(root, os.path.expanduser(directory)))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"'directory' debe estar dentro de {root}")
+        return path
+    
+    def _retry_after(self) -> int:
+        """Segundos hasta que previsiblemente quepa un lote: tiempo medio por trabajo × espera"""
+        stats = self.functions.operations.stats[OperationQueue.BATCH]
+        per_job = stats['run_seconds'] / stats['completed'] if stats['completed'] else 1.0
+        backlog = sum(self.functions.operations.pending().values()) - self.max_pending * 0.9
+        return int(min(300, max(1, per_job * max(1.0, backlog))))
+    
+    def _track(self, kind: str, link: str, index: Optional[int]) -> int:
+        """Registra un trabajo en cola (con self._lock tomado) y devuelve su id"""
+        job_id = self._next_id
+        self._next_id += 1
+        self._jobs[job_id] = {'kind': kind, 'link': link, 'index': index, 'state': 'queued'}
+        self._states['queued'] += 1
+        while len(self._jobs) > self.JOB_HISTORY:
+            _, old = self._jobs.popitem(last=False)
+            self._states[old['state']] -= 1
+        return job_id
+    
+    def _finished(self, job_id: int, future: Future):
+        if future.cancelled():
+            state = 'cancelled'
+        elif future.exception() is not None:
+            state = 'stalled' if isinstance(future.exception(), StallDetected) else 'error'
+        else:
+            state = 'done' if future.result() else 'failed'
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._states[job['state']] -= 1
+                self._states[state] += 1
+                job['state'] = state
+    
+    def mark(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        targets, invalid = self._targets(body)
+        indexes = [index for _, index in targets if index is not None]
+        changed = self.functions.set_processed(indexes, bool(body.get('processed', True)))
+        return {'changed': changed, 'matched': len(indexes), 'unknown': len(targets) - len(indexes),
+                'invalid': invalid}
+    
+    def status(self, job_ids: str = '') -> Dict[str, Any]:
+        operations = self.functions.operations
+        with self._lock:
+            result = {
+                'rows': self.functions.get_status_counts(),
+                'queue': operations.pending(),
+                'queue_stats': operations.stats,
+                'max_pending': self.max_pending,
+                'jobs': {state: count for state, count in self._states.items() if count},
+                'estimates': {label: self.functions.eta_snapshot(label) for label in list(self.functions.estimates)},
+            }
+            if job_ids:
+                wanted = [int(part) for part in job_ids.split(',') if part.strip().isdigit()]
+                result['job_states'] = {job_id: self._jobs.get(job_id) for job_id in wanted}
+        return result
+    
+    def _stream_events(self, handler, types: str):
+        """Envía eventos como líneas JSON hasta que el cliente cierra o el servidor se detiene"""
+        wanted = {part for part in types.split(',') if part}
+        subscription = self.functions.events.subscribe()
+        handler.close_connection = True
+        try:
+            handler.send_response(200)
+            handler.send_header('Content-Type', 'application/x-ndjson')
+            handler.send_header('Connection', 'close')
+            handler.end_headers()
+            while not self._stopping.is_set():
+                events = subscription.get(self.HEARTBEAT)
+                lines = [
+                    json.dumps({'type': event_type, 'key': key, 'payload': payload}, ensure_ascii=False, default=str)
+                    for event_type, key, payload in events
+                    if event_type != UIEvent.CALL and (not wanted or event_type in wanted)
+                ]
+                if not events:
+                    lines.append(json.dumps({'type': 'heartbeat', 'dropped': subscription.dropped}))
+                if lines:
+                    handler.wfile.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                    handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.functions.events.unsubscribe(subscription)
+
+
+class LeaseCoordinator:
+    """
+    Reparto de filas entre varias instancias que trabajan sobre la misma hoja
+    
+    Un SQLite compartido (modo WAL) guarda, por fila (ruta real de la hoja,
+    fila de Excel), qué instancia la tiene reservada, hasta cuándo y si ya está
+    procesada, además de un registro secuencial de marcas que las demás
+    instancias leen con poll() para reflejarlas en segundos.
+    
+    Antes de reenviar o descargar una fila, la instancia la reserva con claim():
+    solo se concede si no está procesada ni reservada por otra instancia con
+    una reserva vigente. Las reservas se renuevan mientras la instancia sigue
+    viva (renew); las de una instancia caída caducan y otra las reclama.
+    Publicar la marca de una fila (publish) o liberarla tras un fallo (release)
+    la deja libre. Los guardados de una hoja se serializan entre procesos con
+    file_lock, para que ningún guardado pise las marcas de otro.
+    """
     
-    def __init__(self, page_size: int = 20):
-        self.all_data = []
-        self.current_page = 0
-        self.page_size = page_size
-        self.total_rows = 0
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rows (
+            source TEXT NOT NULL,
+            row INTEGER NOT NULL,
+            owner TEXT,
+            expires REAL,
+            processed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (source, row)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS rows_owner ON rows (owner) WHERE owner IS NOT NULL;
+        CREATE TABLE IF NOT EXISTS marks (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            row INTEGER NOT NULL,
+            link TEXT NOT NULL,
+            processed INTEGER NOT NULL,
+            owner TEXT NOT NULL,
+            at REAL NOT NULL
+        );
+    """
+    LOG_RETENTION = 86400  # segundos que se conservan las marcas en el registro
+    POLL_LIMIT = 50000  # marcas leídas como máximo por consulta
     
-    def set_data(self, data: List[Dict[str, Any]]):
-        """Establece los datos principales"""
-        self.all_data = data
-        self.total_rows = len(data)
-        self.current_page = 0
+    def __init__(self, store_path: str, instance_id: Optional[str] = None,
+                 lease_seconds: float = 60.0, block_size: int = 100):
+        """
+        Args:
+            store_path: Archivo SQLite compartido por todas las instancias
+            instance_id: Nombre de esta instancia (por defecto 'equipo-pid')
+            lease_seconds: Duración de una reserva sin renovar
+            block_size: Filas reservadas de una vez al recorrer una selección
+        """
+        self.store_path = os.path.abspath(os.path.expanduser(store_path))
+        self.instance_id = instance_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.block_size = block_size
+        self.stats = {'claimed': 0, 'reclaimed': 0, 'denied': 0, 'published': 0,
+                      'received': 0, 'lag_seconds': 0.0}
+        self._lock = threading.Lock()
+        self._last_seq = 0
+        self._renewed_at = 0.0
+        os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.store_path, timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
     
-    def get_current_page_data(self) -> List[Dict[str, Any]]:
-        """Obtiene los datos de la página actual"""
-        start_idx = self.current_page * self.page_size
-        end_idx = min(start_idx + self.page_size, len(self.all_data))
-        return self.all_data[start_idx:end_idx]
+    @contextmanager
+    def _transaction(self):
+        """Transacción de escritura; BEGIN IMMEDIATE la serializa con las de otras instancias"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
     
-    def get_pagination_info(self) -> Dict[str, Any]:
-        """Obtiene información de paginación"""
-        total_pages = (len(self.all_data) + self.page_size - 1) // self.page_size if self.all_data else 0
-        current_page_display = self.current_page + 1 if self.all_data else 0
+    def claim(self, keys: Iterable[Tuple[str, int]], skip_processed: bool = True) -> Tuple[set, set]:
+        """
+        Reserva filas para esta instancia
         
-        return {
-            'current_page': current_page_display,
-            'total_pages': total_pages,
-            'total_records': len(self.all_data),
-            'can_go_prev': self.current_page > 0,
-            'can_go_next': self.current_page < total_pages - 1
-        }
+        Args:
+            keys: Pares (ruta real de la hoja, fila de Excel)
+            skip_processed: No conceder las filas ya procesadas (False para un reenvío explícito)
+            
+        Returns:
+            Conjuntos (filas concedidas, filas con una reserva vigente de otra instancia);
+            las procesadas no están en ninguno de los dos si skip_processed
+        """
+        now = time.time()
+        expires = now + self.lease_seconds
+        granted, held = set(), set()
+        with self._transaction() as conn:
+            for key in keys:
+                record = conn.execute('SELECT owner, expires, processed FROM rows WHERE source = ? AND row = ?',
+                                      key).fetchone()
+                if record is None:
+                    conn.execute('INSERT INTO rows (source, row, owner, expires) VALUES (?, ?, ?, ?)',
+                                 (*key, self.instance_id, expires))
+                    self.stats['claimed'] += 1
+                else:
+                    owner, owner_expires, processed = record
+                    foreign = owner is not None and owner != self.instance_id
+                    if foreign and owner_expires > now:
+                        held.add(key)
+                    if (processed and skip_processed) or key in held:
+                        self.stats['denied'] += 1
+                        continue
+                    if foreign:
+                        self.stats['reclaimed'] += 1  # reserva caducada de una instancia caída
+                    if owner != self.instance_id:
+                        self.stats['claimed'] += 1
+                    conn.execute('UPDATE rows SET owner = ?, expires = ? WHERE source = ? AND row = ?',
+                                 (self.instance_id, expires, *key))
+                granted.add(key)
+        return granted, held
     
-    def next_page(self) -> bool:
-        """Avanza a la siguiente página"""
-        total_pages = (len(self.all_data) + self.page_size - 1) // self.page_size
-        if self.current_page < total_pages - 1:
-            self.current_page += 1
-            return True
-        return False
+    def release(self, keys: Iterable[Tuple[str, int]]):
+        """Libera las reservas de esta instancia sobre esas filas (sin marcarlas)"""
+        keys = list(keys)
+        if keys:
+            with self._transaction() as conn:
+                conn.executemany('UPDATE rows SET owner = NULL, expires = NULL '
+                                 'WHERE source = ? AND row = ? AND owner = ?',
+                                 [(*key, self.instance_id) for key in keys])
     
-    def prev_page(self) -> bool:
-        """Retrocede a la página anterior"""
-        if self.current_page > 0:
-            self.current_page -= 1
-            return True
-        return False
+    def publish(self, rows: Iterable[Tuple[str, int, str]], processed: bool):
+        """
+        Registra marcas ya guardadas en la hoja para que las vean las demás instancias
+        
+        Args:
+            rows: Tripletas (ruta real de la hoja, fila de Excel, enlace)
+            processed: Nuevo estado de las filas
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany('INSERT INTO rows (source, row, processed) VALUES (?, ?, ?) '
+                             'ON CONFLICT (source, row) DO UPDATE SET processed = excluded.processed',
+                             [(source, row, int(processed)) for source, row, _ in rows])
+            conn.executemany('UPDATE rows SET owner = NULL, expires = NULL '
+                             'WHERE source = ? AND row = ? AND owner = ?',
+                             [(source, row, self.instance_id) for source, row, _ in rows])
+            conn.executemany('INSERT INTO marks (source, row, link, processed, owner, at) VALUES (?, ?, ?, ?, ?, ?)',
+                             [(source, row, link, int(processed), self.instance_id, now)
+                              for source, row, link in rows])
+        self.stats['published'] += len(rows)
     
-    def get_ready_links(self) -> List[Dict[str, Any]]:
-        """Obtiene todos los enlaces que han sido procesados"""
-        return [item for item in self.all_data if item['is_clicked']]
+    def renew(self):
+        """Prolonga las reservas de esta instancia; solo actúa cada tercio de lease_seconds"""
+        now = time.time()
+        if now - self._renewed_at < self.lease_seconds / 3:
+            return
+        self._renewed_at = now
+        with self._transaction() as conn:
+            conn.execute('UPDATE rows SET expires = ? WHERE owner = ?', (now + self.lease_seconds, self.instance_id))
+            conn.execute('DELETE FROM marks WHERE at < ?', (now - self.LOG_RETENTION,))
     
-    def update_item_status(self, all_data_index: int, is_clicked: bool):
-        """Actualiza el estado de un elemento"""
-        if 0 <= all_data_index < len(self.all_data):
-            self.all_data[all_data_index]['is_clicked'] = is_clicked
+    def seek_latest(self):
+        """Ignora las marcas ya publicadas (la hoja que se va a leer ya las contiene)"""
+        with self._lock:
+            self._last_seq = self._conn.execute('SELECT COALESCE(MAX(seq), 0) FROM marks').fetchone()[0]
+    
+    def poll(self) -> List[Tuple[str, int, str, bool]]:
+        """
+        Marcas publicadas por otras instancias desde la última consulta
+        
+        Returns:
+            Lista de (ruta real de la hoja, fila de Excel, enlace, procesada) en orden de publicación
+        """
+        with self._lock:
+            records = self._conn.execute(
+                'SELECT seq, source, row, link, processed, owner, at FROM marks WHERE seq > ? ORDER BY seq LIMIT ?',
+                (self._last_seq, self.POLL_LIMIT)
+            ).fetchall()
+            if records:
+                self._last_seq = records[-1][0]
+        now = time.time()
+        changes = []
+        for _, source, row, link, processed, owner, at in records:
+            if owner != self.instance_id:
+                changes.append((source, row, link, bool(processed)))
+                self.stats['received'] += 1
+                self.stats['lag_seconds'] += max(0.0, now - at)
+        return changes
+    
+    @contextmanager
+    def file_lock(self, path: str):
+        """Bloqueo entre procesos para guardar las marcas de una hoja (flock junto al almacén)"""
+        if fcntl is None or not path:
+            yield
+            return
+        name = hashlib.sha1(os.path.realpath(path).encode('utf-8')).hexdigest()[:16]
+        with open(f"{self.store_path}.{name}.lock", 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+    
+    def close(self):
+        """Libera las reservas pendientes de esta instancia y cierra el almacén"""
+        try:
+            with self._transaction() as conn:
+                conn.execute('UPDATE rows SET owner = NULL, expires = NULL WHERE owner = ?', (self.instance_id,))
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudieron liberar las reservas: {str(e)}")
+        self._conn.close()
 
 
 class AsyncOperationManager:
@@ -390,47 +5061,862 @@ class AppConfig:
         os.makedirs(AppConfig.DEFAULT_PATH, exist_ok=True)
 
 class TelegramExcelFunctions:
+    LOAD_CHUNK_ROWS = 5000  # filas por bloque publicado durante la carga (tras la primera página)
+    FORWARD_BLOCKS_AHEAD = 2  # bloques reservados en la cola al reenviar con coordinación
+
     def __init__(self, config):
-        self.excel_handler = ExcelHandler()
+        out_of_core = config.get('data_backend', 'memory') == 'sqlite'
+        zip_saves = config.get('xlsx_zip_saves', True)
+        coordinated = bool(config.get('coordination_store'))
+        self.excel_handler = ExcelHandler(
+            # Con varias instancias cada guardado relee la hoja para no pisar marcas ajenas
+            keep_workbook=not out_of_core and not zip_saves and not coordinated,
+            fast_reader=config.get('fast_xlsx_reader', False),
+            workers=config.get('xlsx_workers'),
+            zip_saves=zip_saves
+        )
+        self.source = self.excel_handler  # fuente del archivo cargado (xlsx, CSV/TSV o JSON)
         self.telegram_operations = TelegramOperations()
-        self.data_manager = DataManager(config['page_size'])
+        if out_of_core:
+            self.data_manager = SQLiteDataManager(
+                config['page_size'],
+                store_path=config.get('data_store_path'),
+                cache_rows=config.get('data_cache_rows', 4096)
+            )
+        else:
+            self.data_manager = DataManager(config['page_size'])
+        self.page_cache = PageCache(self.data_manager)
         self.config = config
         self.gui_callback = None
+        self.events = DispatchBus()
+        self.timeouts = AdaptiveTimeout(
+            floor=config.get('timeout_floor', 15),
+            ceiling=config.get('timeout_ceiling', 900)
+        )
+        self.profiler = SessionProfiler(config.get('profile_dir'), config.get('profile_phases', ()))
+        self.operations = OperationQueue(
+            workers=config.get('queue_workers', 2),
+            policy=config.get('queue_policy', 'sjf'),
+            aging=config.get('queue_aging', 1.0),
+            max_reschedules=config.get('stall_retries', 2)
+        )
+        self.stall_seconds = config.get('stall_seconds', 20)
+        self.estimator = ThroughputEstimator(config.get('estimator_path'), self.timeouts)
+        self.estimates = {}  # etiqueta -> EtaTracker de las operaciones por lotes en curso
+        self.sources = {}  # ruta -> fuente de los archivos añadidos por el vigilante
+        self.watcher = None
+        self.control_server = None
+        self.ingest_log = deque(maxlen=100)  # últimas ingestas {'path', 'rows', 'updated', 'seconds'}
+        self._own_writes = {}  # ruta -> (tamaño, mtime) tras guardar nuestras marcas
+        self._data_lock = threading.RLock()  # serializa cambios de estado e ingestas
+        self._load_cancel = threading.Event()
+        self.coordinator = None
+        self._real_paths = {}  # ruta -> ruta real, para identificar filas entre instancias
+        self._sync_lock = threading.Lock()  # las marcas remotas esperan a que acabe la lectura en curso
+        self._coordination_stop = threading.Event()
+        if coordinated:
+            self.coordinator = LeaseCoordinator(
+                config['coordination_store'], config.get('instance_id'),
+                lease_seconds=config.get('lease_seconds', 60),
+                block_size=config.get('lease_block', 100)
+            )
+            self._coordination_thread = threading.Thread(target=self._coordination_loop, daemon=True)
+            self._coordination_thread.start()
+
+    def load_excel_file(self, file_path=None):
+        """
+        Carga la lista indicada (o la de 'default_path'): xlsx, CSV/TSV o JSON de tdl-export
+        
+        Returns:
+            Tupla (éxito, mensaje)
+        """
+        with self.profiler.phase('load'):
+            return self._load_file(file_path)
 
-    def load_excel_file(self):
-        file_path = self.config.get('default_path')
+    def _load_file(self, file_path):
+        file_path = file_path or self.config.get('default_path')
         if not file_path:
             return False, "No se ha especificado una ruta de archivo"
-        result = self.excel_handler.load_file(file_path)
-        if result['success']:
-            self.data_manager.set_data(result['data'])
-            if self.gui_callback:
-                self.gui_callback.update_pagination()
-                self.gui_callback.load_current_page()
-            return True, result['message']
+        if os.path.isdir(file_path):
+            return False, f"La ruta es un directorio, selecciona un archivo: {file_path}"
+        
+        if file_path.lower().endswith(('.xlsx', '.xlsm')):
+            source = self.excel_handler
         else:
-            return False, result['message']
+            source = open_input_source(file_path)
+        
+        self._load_cancel.clear()
+        total_bytes = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        with self._sync_lock:
+            if self.coordinator is not None:
+                self.coordinator.seek_latest()
+            return self._read_loaded(file_path, source, total_bytes)
+
+    def _read_loaded(self, file_path, source, total_bytes):
+        records = source.iter_records(file_path)
+        try:
+            # Los errores de apertura llegan con la primera fila, antes de tocar los datos cargados
+            first = next(records, None)
+            with self._data_lock:
+                self.data_manager.reset()
+                self.source = source
+                self.sources = {}
+                self.page_cache.clear()
+            chunk = [first] if first is not None else []
+            chunk_rows = self.data_manager.page_size  # la primera página se publica en cuanto está
+            for item in records:
+                chunk.append(item)
+                if len(chunk) >= chunk_rows:
+                    self._append_loaded(chunk, source, total_bytes)
+                    chunk = []
+                    chunk_rows = self.LOAD_CHUNK_ROWS
+                if self._load_cancel.is_set():
+                    break
+            self._append_loaded(chunk, source, total_bytes)
+        except Exception as e:
+            return False, f'Error al cargar el archivo: {str(e)}'
+        finally:
+            records.close()
+            self.data_manager.finish_load()
+        
+        total = self.data_manager.total_rows
+        if self._load_cancel.is_set():
+            return True, f'Carga cancelada. {total} registros cargados'
+        return True, f'Archivo cargado correctamente. {total} registros encontrados'
+
+    def _append_loaded(self, chunk, source, total_bytes):
+        """Añade un bloque de la carga en curso y publica el avance (filas y bytes leídos)"""
+        with self._data_lock:
+            start, end = self.data_manager.append_data(chunk) if chunk else (0, 0)
+            self.page_cache.invalidate_from(start)
+        if self._emitting:
+            first = start == 0 and end > 0
+            # Clave propia para que el aviso de la primera página no se fusione con los siguientes
+            self._emit(UIEvent.LOAD_PROGRESS, 'first' if first else None, {
+                'rows': self.data_manager.total_rows,
+                'bytes': source.bytes_read() or total_bytes,
+                'total_bytes': total_bytes,
+                'first': first,
+            })
+
+    def cancel_load(self):
+        """Detiene la carga en curso; las filas ya leídas quedan cargadas"""
+        self._load_cancel.set()
+
+    def _remember_own_write(self, path):
+        """Recuerda el estado de un archivo que acabamos de guardar para no reingerirlo"""
+        if path:
+            try:
+                info = os.stat(path)
+                self._own_writes[os.path.abspath(path)] = (info.st_size, info.st_mtime_ns)
+            except OSError:
+                pass
+
+    def ingest_file(self, file_path):
+        """
+        Añade al conjunto cargado las filas de un archivo nuevo o actualizado
+        
+        Las filas cuyo enlace ya está cargado no se duplican; si el archivo las
+        trae marcadas como procesadas, se actualiza su estado en memoria.
+        
+        Returns:
+            Dict {'path', 'rows', 'updated', 'seconds', 'message'}
+        """
+        with self._sync_lock:
+            return self._ingest(os.path.abspath(file_path))
+
+    def _ingest(self, file_path):
+        started = time.monotonic()
+        result = {'path': file_path, 'rows': 0, 'updated': 0, 'seconds': 0.0}
+        changed = []
+        try:
+            info = os.stat(file_path)
+            if self._own_writes.get(file_path) == (info.st_size, info.st_mtime_ns):
+                result['message'] = "Cambio propio (marcas guardadas), ignorado"
+                return result
+            if self.source is not None and self.source.file_path and \
+                    os.path.abspath(self.source.file_path) == file_path:
+                source = self.source
+            else:
+                source = open_input_source(file_path, keep_workbook=False,
+                                           fast_reader=self.config.get('fast_xlsx_reader', False),
+                                           zip_saves=self.config.get('xlsx_zip_saves', True))
+            
+            new_items, newly_processed = [], []
+            with self.profiler.phase('load'):
+                for item in source.iter_records(file_path):
+                    index = self.data_manager.find_index_by_link(item['link'])
+                    if index is None:
+                        if source is not self.source:
+                            item['source_path'] = file_path
+                        new_items.append(item)
+                    elif item['is_clicked'] and not self.data_manager.status[index]:
+                        newly_processed.append(index)
+                
+                with self._data_lock:
+                    if source is not self.source:
+                        self.sources[file_path] = source
+                    start, end = self.data_manager.append_data(new_items) if new_items else (0, 0)
+                    changed = self.data_manager.update_status_many(newly_processed, True)
+            
+            self.page_cache.clear()
+            result.update(rows=end - start, updated=len(changed), seconds=time.monotonic() - started)
+            result['message'] = (f"{os.path.basename(file_path)}: {result['rows']} filas nuevas, "
+                                 f"{result['updated']} marcadas en {result['seconds']:.2f}s")
+        except Exception as e:
+            result.update(seconds=time.monotonic() - started, message=f"Error al ingerir {file_path}: {str(e)}")
+        self.ingest_log.append(result)
+        print(f"📥 {result['message']}")
+        if self._emitting:
+            for index in changed:
+                self._emit(UIEvent.ROW_STATUS, index, True)
+            self._emit(UIEvent.ROWS_ADDED, file_path, result)
+        return result
+
+    def start_watching(self, directory=None):
+        """
+        Vigila la carpeta (por defecto la de 'default_path') e ingiere los archivos nuevos
+        
+        Returns:
+            Tupla (éxito, mensaje)
+        """
+        directory = directory or self.config.get('watch_directory') or self.config.get('default_path')
+        if directory and not os.path.isdir(directory):
+            directory = os.path.dirname(directory)
+        if not directory or not os.path.isdir(directory):
+            return False, f"No existe la carpeta a vigilar: {directory}"
+        self.stop_watching()
+        self.watcher = DirectoryWatcher(
+            directory, self.ingest_file, debounce=self.config.get('watch_debounce', 2.0)
+        )
+        self.watcher.start()
+        return True, f"Vigilando {directory} ({self.watcher.backend})"
+
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def start_control_server(self, address=None):
+        """
+        Abre la API local de control (ver ControlServer) en address o 'control_address'
+        
+        Returns:
+            Tupla (éxito, mensaje)
+        """
+        self.stop_control_server()
+        server = ControlServer(
+            self, address or self.config.get('control_address') or '127.0.0.1:8765',
+            max_pending=self.config.get('control_max_pending', 20000),
+            token=self.config.get('control_token')
+        )
+        try:
+            server.start()
+        except (OSError, ValueError) as e:
+            return False, f"No se pudo abrir el servidor de control: {str(e)}"
+        self.control_server = server
+        return True, f"Servidor de control en {server.url} (Authorization: Bearer {server.token})"
+
+    def stop_control_server(self):
+        if self.control_server is not None:
+            self.control_server.stop()
+            self.control_server = None
+
+    def _coordination_loop(self):
+        while not self._coordination_stop.wait(self.config.get('coordination_sync', 1.0)):
+            try:
+                self.sync_coordination()
+            except sqlite3.Error as e:
+                print(f"⚠️ Error de coordinación: {str(e)}")
+
+    def sync_coordination(self):
+        """
+        Renueva las reservas de esta instancia y aplica las marcas de las demás
+        
+        Returns:
+            Número de filas cuyo estado ha cambiado
+        """
+        self.coordinator.renew()
+        if not self._sync_lock.acquire(blocking=False):
+            return 0  # hay una lectura en curso; sus marcas se recogen en la siguiente pasada
+        try:
+            latest = {}
+            for source, row, link, processed in self.coordinator.poll():
+                latest[(source, row)] = (link, processed)
+            by_state = {True: [], False: []}
+            for key, (link, processed) in latest.items():
+                index = self._find_row(key, link)
+                if index is not None:
+                    by_state[processed].append(index)
+            return sum(self._apply_remote_status(indexes, processed)
+                       for processed, indexes in by_state.items() if indexes)
+        finally:
+            self._sync_lock.release()
+
+    def _row_key(self, item):
+        """Identidad de una fila entre instancias: (ruta real de su hoja, fila de Excel)"""
+        path = item.get('source_path') or self.source.file_path
+        real_path = self._real_paths.get(path)
+        if real_path is None:
+            real_path = self._real_paths[path] = os.path.realpath(path)
+        return real_path, item['excel_row']
+
+    def _find_row(self, key, link):
+        """Índice en all_data de la fila (hoja, fila de Excel), buscándola por su enlace"""
+        index = self.data_manager.find_index_by_link(link)
+        if index is None:
+            return None
+        if self._row_key(self.data_manager.get_item(index)) == key:
+            return index
+        # Enlace repetido en varias filas: se busca la fila exacta
+        for index, item in self.data_manager.iter_indexed_selection('all'):
+            if item['link'] == link and self._row_key(item) == key:
+                return index
+        return None
+
+    def _claim_entries(self, entries, skip_processed=True, held=None):
+        """Pares (índice, registro) que esta instancia ha podido reservar; los de otras van a held"""
+        keys = [self._row_key(item) for _, item in entries]
+        granted, held_keys = self.coordinator.claim(keys, skip_processed)
+        if held is not None:
+            held.extend(entry for entry, key in zip(entries, keys) if key in held_keys)
+        return [entry for entry, key in zip(entries, keys) if key in granted]
 
-    def open_in_telegram(self, link):
+    def _claimed_blocks(self, entries):
+        """
+        Reserva una selección por bloques de 'lease_block' filas
+        
+        Las filas reservadas por otras instancias se reintentan al final de la
+        selección hasta que llega su marca o caduca la reserva (instancia caída).
+        """
+        size = self.coordinator.block_size
+        held = []
+        block = []
+        for entry in entries:
+            block.append(entry)
+            if len(block) >= size:
+                granted = self._claim_entries(block, held=held)
+                if granted:
+                    yield granted
+                block = []
+        granted = self._claim_entries(block, held=held) if block else []
+        if granted:
+            yield granted
+        while held:
+            if self._coordination_stop.wait(self.config.get('coordination_sync', 1.0)):
+                return
+            status = self.data_manager.status
+            pending, held = [entry for entry in held if not status[entry[0]]], []
+            for start in range(0, len(pending), size):
+                granted = self._claim_entries(pending[start:start + size], held=held)
+                if granted:
+                    yield granted
+
+    def _claim_row(self, index, item, job_id, link):
+        """Reserva una fila antes de operar sobre ella; False si la tiene otra instancia"""
+        if self.coordinator is None or item is None:
+            return True
+        # Volver a enviar una fila que ya consta como procesada es una petición explícita
+        if self._claim_entries([(index, item)], skip_processed=not self.data_manager.status[index]):
+            return True
+        print(f"🔒 {link}: reservada o ya procesada por otra instancia")
+        self._post_job_progress(job_id, link, 'failed')
+        return False
+
+    def _release_entries(self, entries):
+        """Libera las reservas de esos pares (índice, registro) tras terminar con ellos"""
+        if self.coordinator is not None:
+            self.coordinator.release(self._row_key(item) for _, item in entries if item is not None)
+
+    def _apply_remote_status(self, indexes, processed):
+        """Refleja marcas de otra instancia; ya están guardadas en la hoja, así que no se guarda"""
+        with self._data_lock:
+            changed = self.data_manager.update_status_many(indexes, processed)
+            self.page_cache.invalidate_indexes(changed)
+        if self._emitting:
+            for index in changed:
+                self._emit(UIEvent.ROW_STATUS, index, processed)
+        return len(changed)
+
+    @property
+    def _emitting(self):
+        return self.gui_callback is not None or self.events.has_subscribers
+
+    def _emit(self, event_type, key=None, payload=None):
+        """Publica un evento para la GUI (si la hay) y para los suscriptores del bus"""
+        if self.gui_callback is not None:
+            self.events.post(event_type, key, payload)
+        if self.events.has_subscribers:
+            self.events.broadcast(event_type, key, payload)
+
+    def _post_job_progress(self, job_id, link, state, progress=None):
+        if self._emitting:
+            self._emit(UIEvent.JOB_PROGRESS, job_id, {'link': link, 'state': state, 'progress': progress})
+
+    def _resolve_index(self, link, index=None):
+        """Índice en all_data de la fila indicada, o de la primera con ese enlace"""
+        if index is not None:
+            return index
+        return self.data_manager.find_index_by_link(link)
+
+    def open_in_telegram(self, link, index=None):
         self.telegram_operations.open_link(link)
-        item = next((item for item in self.data_manager.all_data if item['link'] == link), None)
-        if item:
-            self.mark_as_clicked(self.data_manager.all_data.index(item))
+        index = self._resolve_index(link, index)
+        if index is not None:
+            self.mark_as_clicked(index)
 
-    def download_with_tlg(self, link):
+    def download_with_tlg(self, link, index=None):
         self.telegram_operations.download_with_tlg(link)
-        item = next((item for item in self.data_manager.all_data if item['link'] == link), None)
-        if item:
-            self.mark_as_clicked(self.data_manager.all_data.index(item))
+        index = self._resolve_index(link, index)
+        if index is not None:
+            self.mark_as_clicked(index)
+
+    def forward_with_tdl(self, link, index=None):
+        """Reenvío interactivo (Opt+Click): pasa por delante de los lotes pendientes"""
+        return self._job_result(self._submit_forward(link, index, OperationQueue.INTERACTIVE))
+
+    @staticmethod
+    def _job_result(future):
+        """Resultado de un reenvío encolado; False si siguió atascado tras reprogramarlo"""
+        try:
+            return future.result()
+        except StallDetected as e:
+            print(f"⚠️ {e}")
+            return False
+
+    def _tdl_resource(self):
+        """Recurso exclusivo de la cola para la cuenta de tdl configurada"""
+        return ('tdl', self.config['data_number'])
+
+    def _job_cost(self, items, operation='forward'):
+        """Duración estimada de la operación sobre esos registros, con el mismo modelo que las proyecciones"""
+        items = list(items)
+        return self.estimator.predict(self.config['data_number'], operation, len(items),
+                                      sum(self._row_bytes(item) for item in items))
+
+    def _row_bytes(self, item):
+        """Bytes estimados de un registro (Size o, si falta, Duration), 0 si no se sabe"""
+        return self.timeouts.estimate_bytes(*row_size_and_duration(item)) or 0
+
+    def _start_eta(self, label):
+        tracker = self.estimates[label] = EtaTracker(self.estimator, label)
+        return tracker
+
+    def _publish_eta(self, tracker, finished=False):
+        """Publica la proyección de una operación; al terminar la retira (payload None)"""
+        if finished:
+            self.estimates.pop(tracker.label, None)
+        if self._emitting:
+            self._emit(UIEvent.ETA, tracker.label, None if finished else tracker.snapshot())
+
+    def eta_snapshot(self, label):
+        """Proyección actual de la operación por lotes 'forward' o 'transfer', o None si no corre"""
+        tracker = self.estimates.get(label)
+        return tracker.snapshot() if tracker is not None else None
+
+    def enqueue_forward(self, link, index=None, lane=OperationQueue.BATCH) -> Future:
+        """Encola un reenvío sin esperar a que termine; el Future devuelve el éxito"""
+        return self._submit_forward(link, index, lane)
+
+    def enqueue_download(self, link, index=None, lane=OperationQueue.BATCH, directory=None) -> Future:
+        """
+        Encola una descarga con tdl dl en directory (o 'download_dir')
+        
+        Las filas descargadas se marcan como procesadas, como las reenviadas.
+        """
+        index = self._resolve_index(link, index)
+        item = self.data_manager.get_item(index) if index is not None else None
+        directory = directory or self.download_root()
+        self._post_job_progress(('download', index if index is not None else link), link, 'queued')
+        return self.operations.submit(lambda: self._download_one(link, index, item, directory), lane,
+                                      cost=self._job_cost([item], 'download'), resource=self._tdl_resource())
+
+    def download_root(self) -> str:
+        """Carpeta de las descargas encoladas ('download_dir' o ~/Downloads/tdl)"""
+        return os.path.expanduser(self.config.get('download_dir') or "~/Downloads/tdl")
+
+    def _download_one(self, link, index, item, directory):
+        job_id = ('download', index if index is not None else link)
+        if not self._claim_row(index, item, job_id, link):
+            return False
+        try:
+            return self._download_claimed(link, index, item, directory, job_id)
+        finally:
+            self._release_entries([(index, item)])
+
+    def _download_claimed(self, link, index, item, directory, job_id):
+        size_bytes, duration_seconds = row_size_and_duration(item)
+        self._post_job_progress(job_id, link, 'running')
+        started = time.monotonic()
+        try:
+            success = self.telegram_operations.download_with_tdl(
+                link, directory, self.config['data_number'],
+                threads=self.config.get('transfer_threads', 4),
+                limit=self.config.get('transfer_limit', 2),
+                size_bytes=size_bytes,
+                duration_seconds=duration_seconds,
+                timeouts=self.timeouts,
+                on_progress=lambda progress: self._post_job_progress(job_id, link, 'running', progress),
+                stall_seconds=self.stall_seconds
+            )
+        except StallDetected:
+            self._post_job_progress(job_id, link, 'stalled')
+            raise
+        elapsed = time.monotonic() - started
+        self.estimator.observe(self.config['data_number'], 'download', 1, self._row_bytes(item), elapsed, success)
+        self._post_job_progress(job_id, link, 'done' if success else 'failed')
+        if index is not None:
+            self.data_manager.record_outcome([index], 'downloaded' if success else 'download failed', elapsed)
+            if success:
+                self.mark_as_clicked(index)
+        return success
+
+    def _submit_forward(self, link, index, lane):
+        index = self._resolve_index(link, index)
+        item = self.data_manager.get_item(index) if index is not None else None
+        self._post_job_progress(('forward', index if index is not None else link), link, 'queued')
+        return self.operations.submit(lambda: self._forward_one(link, index, item), lane,
+                                      cost=self._job_cost([item]), resource=self._tdl_resource())
+
+    def _forward_one(self, link, index, item):
+        job_id = ('forward', index if index is not None else link)
+        if not self._claim_row(index, item, job_id, link):
+            return False
+        try:
+            with self.profiler.phase('forward'):
+                return self._forward_claimed(link, index, item, job_id)
+        finally:
+            self._release_entries([(index, item)])
+
+    def _forward_claimed(self, link, index, item, job_id):
+        size_bytes, duration_seconds = row_size_and_duration(item)
+        self._post_job_progress(job_id, link, 'running')
+        started = time.monotonic()
+        report = {}
+        try:
+            success = self.telegram_operations.forward_with_tdl(
+                link, self.config['data_number'], self.config['target_chat'],
+                size_bytes=size_bytes,
+                duration_seconds=duration_seconds,
+                timeouts=self.timeouts,
+                on_progress=lambda progress: self._post_job_progress(job_id, link, 'running', progress),
+                stall_seconds=self.stall_seconds,
+                report=report
+            )
+        except StallDetected:
+            self._post_job_progress(job_id, link, 'stalled')
+            if index is not None:
+                self.data_manager.record_outcome([index], 'stalled', time.monotonic() - started)
+            raise
+        elapsed = time.monotonic() - started
+        self.estimator.observe(self.config['data_number'], 'forward', 1, self._row_bytes(item), elapsed,
+                               success, report.get('fallback', False))
+        self._post_job_progress(job_id, link, 'done' if success else 'failed')
+        if index is not None:
+            self.data_manager.record_outcome([index], 'forwarded' if success else 'failed', elapsed)
+            if success:
+                self.mark_as_clicked(index)
+        return success
+
+    def forward_selection(self, kind: str = 'unprocessed', query: Optional[str] = None,
+                          progress_callback: Optional[Callable[[int, int, Dict[str, Any], bool], None]] = None):
+        """
+        Reenvía una selección agrupada por canal de origen (un tdl por lote)
+        
+        Los lotes de un solo enlace que no es de canal privado usan la cadena de
+        fallback de forward_with_tdl. Los lotes se ejecutan en el carril de lotes
+        de la cola de operaciones, en el orden de su política ('queue_policy').
+        Las filas de un lote correcto se marcan como procesadas. Si tdl falla
+        sin haber enviado nada (no arranca o no abre su almacenamiento), los
+        posts del lote se reenvían uno a uno con el fallback de texto, saltando
+        los ya procesados. Cualquier otro fallo, timeout o atasco puede haber
+        entregado parte del lote, y tdl no dice cuál: esas filas quedan sin
+        marcar con el resultado 'unconfirmed' para revisarlas antes de
+        reintentar, y no se reenvían solas para no duplicar posts en el destino.
+        
+        Con coordinación entre instancias ('coordination_store') la selección se
+        reserva y planifica por bloques de 'lease_block' filas a medida que
+        avanza, con FORWARD_BLOCKS_AHEAD bloques en la cola, así que varias
+        instancias se reparten la misma selección sin repetir envíos.
+        
+        Args:
+            kind, query: Selección como en DataManager.iter_selection
+            progress_callback: Función opcional (lotes terminados, total de lotes, lote, éxito);
+                               con coordinación el total crece según se reservan bloques
+            
+        Returns:
+            Tupla (éxito, mensaje)
+        """
+        with self.profiler.phase('forward'):
+            return self._forward_batches(kind, query, progress_callback)
+
+    def _forward_batches(self, kind, query, progress_callback):
+        planner = BatchPlanner(self.config.get('batch_max_posts', 200))
+        entries = self.data_manager.iter_indexed_selection(kind, query)
+        if self.coordinator is None:
+            blocks = iter([planner.plan(entries)])
+        else:
+            blocks = (planner.plan(block) for block in self._claimed_blocks(entries))
+        
+        # Los lotes entran en el carril de lotes de la cola, que los ordena según
+        # su coste estimado; los reenvíos interactivos siguen pasando por delante.
+        futures = {}  # future -> (lote, bloque)
+        unfinished = Counter()  # bloque -> lotes sin terminar
+        total = 0
+        account = self.config['data_number']
+        tracker = self._start_eta('forward')
+        
+        def stage(batch):
+            """Etapa del estimador, filas y bytes de un lote"""
+            operation = 'forward' if batch['channel'] is None else 'batch'
+            return operation, len(batch['items']), sum(self._row_bytes(item) for _, item in batch['items'])
+        
+        def submit_block(block):
+            nonlocal total
+            for batch in next(blocks, ()):
+                futures[self._submit_batch(batch)] = (batch, block)
+                tracker.add(account, *stage(batch))
+                unfinished[block] += 1
+                total += 1
+        
+        try:
+            for block in range(self.FORWARD_BLOCKS_AHEAD):
+                submit_block(block)
+            next_block = self.FORWARD_BLOCKS_AHEAD
+            if not futures:
+                return False, "No hay enlaces para reenviar"
+            self._publish_eta(tracker)
+            
+            forwarded = failed = unconfirmed = finished = 0
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch, block = futures.pop(future)
+                    success = self._job_result(future)
+                    self._release_entries(batch['items'])  # las filas marcadas ya se liberaron al publicarlas
+                    tracker.finish(account, *stage(batch))
+                    if success:
+                        forwarded += len(batch['items'])
+                    elif batch.get('unconfirmed'):
+                        unconfirmed += len(batch['items'])
+                    else:
+                        delivered = sum(1 for index, _ in batch['items'] if self.data_manager.status[index])
+                        forwarded += delivered
+                        failed += len(batch['items']) - delivered
+                    finished += 1
+                    unfinished[block] -= 1
+                    if not unfinished[block]:
+                        del unfinished[block]
+                        submit_block(next_block)
+                        next_block += 1
+                    self._publish_eta(tracker)
+                    if progress_callback:
+                        progress_callback(finished, total, batch, success)
+        finally:
+            self._publish_eta(tracker, finished=True)
+        
+        message = f"{forwarded} enlaces reenviados en {total} lote(s)"
+        if failed:
+            message += f", {failed} fallidos"
+        if unconfirmed:
+            message += f", {unconfirmed} sin confirmar (revisa el chat destino antes de reintentarlos)"
+        return failed == 0 and unconfirmed == 0, message
+
+    def _submit_batch(self, batch):
+        """Encola un lote de BatchPlanner en el carril de lotes"""
+        if batch['channel'] is None:
+            index, item = batch['items'][0]
+            return self._submit_forward(item['link'], index, OperationQueue.BATCH)
+        job_id = ('batch', batch['channel'], batch['items'][0][0])
+        self._post_job_progress(job_id, f"{batch['channel']} ({len(batch['items'])} posts)", 'queued')
+        return self.operations.submit(
+            lambda: self._forward_batch(batch, job_id), OperationQueue.BATCH,
+            cost=self._job_cost((item for _, item in batch['items']), 'batch'), resource=self._tdl_resource()
+        )
+
+    def _forward_batch(self, batch, job_id):
+        with self.profiler.phase('forward'):
+            label = f"{batch['channel']} ({len(batch['items'])} posts)"
+            self._post_job_progress(job_id, label, 'running')
+            started = time.monotonic()
+            report = {}
+            try:
+                success = self.telegram_operations.forward_batch(
+                    batch, self.config['data_number'], self.config['target_chat'], timeouts=self.timeouts,
+                    on_progress=lambda progress: self._post_job_progress(job_id, label, 'running', progress),
+                    stall_seconds=self.stall_seconds, report=report
+                )
+            except StallDetected as e:
+                # No se devuelve a la cola: repetir el lote entero reenviaría los posts ya entregados
+                print(f"⚠️ {e}")
+                self._post_job_progress(job_id, label, 'stalled')
+                success = False
+            elapsed = time.monotonic() - started
+            self.estimator.observe(self.config['data_number'], 'batch', len(batch['items']),
+                                   sum(self._row_bytes(item) for _, item in batch['items']), elapsed, success)
+            self._post_job_progress(job_id, batch['channel'], 'done' if success else 'failed')
+            if not success:
+                if report.get('untouched'):
+                    return self._forward_batch_remainder(batch)
+                return self._hold_unconfirmed_batch(batch, elapsed)
+            # La duración del lote se reparte entre sus posts
+            indexes = [index for index, _ in batch['items']]
+            self.data_manager.record_outcome(indexes, 'forwarded', elapsed / len(indexes))
+            self.set_processed(indexes)
+            return True
+
+    def _hold_unconfirmed_batch(self, batch, elapsed):
+        """
+        Tras un lote que pudo entregarse en parte: deja sus filas sin marcar con
+        el resultado 'unconfirmed' y no las reenvía
+        
+        Returns:
+            False
+        """
+        batch['unconfirmed'] = True
+        indexes = [index for index, _ in batch['items'] if not self.data_manager.status[index]]
+        self.data_manager.record_outcome(indexes, 'unconfirmed', elapsed / len(batch['items']))
+        links = [item['link'] for index, item in batch['items'] if not self.data_manager.status[index]]
+        print(f"⚠️ Lote de {batch['channel']} sin confirmar: {len(links)} post(s) pueden haberse reenviado "
+              f"en parte; revisa el chat destino antes de reintentar")
+        for link in links:
+            print(f"   {link}")
+        return False
+
+    def _forward_batch_remainder(self, batch):
+        """
+        Tras un lote que tdl no llegó a enviar: reenvía sus posts uno a uno con
+        la cadena de fallback de forward_with_tdl
+        
+        Returns:
+            True si al final se entregaron todos los posts del lote
+        """
+        success = True
+        for index, item in batch['items']:
+            if self.data_manager.status[index]:
+                continue  # ya entregado por otra vía (otra instancia, un reenvío interactivo, a mano)
+            try:
+                success = self._forward_claimed(item['link'], index, item, ('forward', index)) and success
+            except StallDetected as e:
+                print(f"⚠️ {e}")
+                success = False
+        return success
+
+    def transfer_selection(self, kind: str = 'unprocessed', query: Optional[str] = None,
+                           progress_callback: Optional[Callable[[int, Dict[str, Any], str, bool], None]] = None,
+                           pipeline: Optional[TransferPipeline] = None):
+        """
+        Descarga una selección y la vuelve a subir al chat destino en modo pipeline
+        
+        Las filas cuya subida termina bien se marcan como procesadas.
+        
+        Args:
+            kind, query: Selección como en DataManager.iter_selection
+            progress_callback: Función opcional (índice, registro, etapa, éxito)
+            pipeline: TransferPipeline ya creado (p. ej. para poder cancelarlo)
+            
+        Returns:
+            Tupla (éxito, mensaje)
+        """
+        pipeline = pipeline or self.create_transfer_pipeline()
+        dl_account, up_account = pipeline.download_account, pipeline.upload_account
+        
+        # La selección se recorre una vez para proyectar la duración; la subida repite las filas
+        tracker = self._start_eta('transfer')
+        for _, item in self.data_manager.iter_indexed_selection(kind, query):
+            tracker.add(dl_account, 'download', 1, self._row_bytes(item), counted=False)
+            tracker.add(up_account, 'upload', 1, self._row_bytes(item))
+        self._publish_eta(tracker)
+        
+        download_seconds = {}
+        
+        def on_result(index, item, stage, success, seconds):
+            job_id = ('transfer', index)
+            size_bytes = self._row_bytes(item)
+            if stage == 'dl':
+                self.estimator.observe(dl_account, 'download', 1, size_bytes, seconds, success)
+                tracker.finish(dl_account, 'download', 1, size_bytes, counted=False)
+                self._post_job_progress(job_id, item['link'], 'uploading' if success else 'failed')
+                if success:
+                    download_seconds[index] = seconds
+                else:
+                    tracker.finish(up_account, 'upload', 1, size_bytes)  # no llegará a subirse
+                    self.data_manager.record_outcome([index], 'download failed', seconds)
+                    self._release_entries([(index, item)])
+            else:
+                self.estimator.observe(up_account, 'upload', 1, size_bytes, seconds, success)
+                tracker.finish(up_account, 'upload', 1, size_bytes)
+                self._post_job_progress(job_id, item['link'], 'done' if success else 'failed')
+                self.data_manager.record_outcome([index], 'uploaded' if success else 'upload failed',
+                                                 download_seconds.pop(index, 0) + seconds)
+                if success:
+                    self.set_processed([index])
+                self._release_entries([(index, item)])
+            self._publish_eta(tracker)
+            if progress_callback:
+                progress_callback(index, item, stage, success)
+        
+        def on_progress(index, item, stage, progress):
+            self._post_job_progress(('transfer', index), item['link'],
+                                    'downloading' if stage == 'dl' else 'uploading', progress)
+        
+        entries = self.data_manager.iter_indexed_selection(kind, query)
+        if self.coordinator is not None:
+            # Las filas se reservan por bloques según la etapa de descarga las va pidiendo
+            entries = (entry for block in self._claimed_blocks(entries) for entry in block)
+        try:
+            with self.profiler.phase('forward'):
+                stats = pipeline.run(entries, on_result, on_progress)
+        finally:
+            self._publish_eta(tracker, finished=True)
+        if not stats['downloaded'] and not stats['download_failed']:
+            return False, "No hay enlaces para transferir"
+        
+        megabytes = stats['bytes'] / 1024 ** 2
+        message = (f"{stats['uploaded']} archivos subidos ({megabytes:.1f} MB) en {stats['seconds']:.1f}s; "
+                   f"descarga {stats['download_seconds']:.1f}s, subida {stats['upload_seconds']:.1f}s")
+        failed = stats['download_failed'] + stats['upload_failed']
+        if failed:
+            message += f", {failed} fallidos"
+        if stats['stalls']:
+            message += f", {stats['stalls']} reinicios por atasco"
+        if stats['reused']:
+            message += f", {stats['reused']} subidas reintentadas sin volver a descargar"
+        if stats['kept']:
+            message += (f", {len(stats['kept'])} descargas conservadas en {pipeline.work_dir} "
+                        f"para reintentar la subida")
+        return failed == 0, message
 
-    def forward_with_tdl(self, link):
-        self.telegram_operations.forward_with_tdl(link, self.config['data_number'], self.config['target_chat'])
-        item = next((item for item in self.data_manager.all_data if item['link'] == link), None)
-        if item:
-            self.mark_as_clicked(self.data_manager.all_data.index(item))
+    def create_transfer_pipeline(self) -> TransferPipeline:
+        """Pipeline de descarga y subida configurado según la configuración de la aplicación"""
+        work_dir = self.config.get('transfer_dir') or os.path.join(tempfile.gettempdir(), 'telegram-excel-transfer')
+        return TransferPipeline(
+            work_dir, self.config['target_chat'],
+            download_account=self.config['data_number'],
+            upload_account=self.config.get('transfer_upload_account'),
+            threads=self.config.get('transfer_threads', 4),
+            limit=self.config.get('transfer_limit', 2),
+            disk_budget=int(self.config.get('transfer_disk_budget_mb', 2048) * 1024 ** 2),
+            remove=self.config.get('transfer_remove', True),
+            timeouts=self.timeouts,
+            stall_seconds=self.stall_seconds,
+            stall_retries=self.config.get('stall_retries', 2)
+        )
 
     def get_page_data(self, page_number, page_size):
-        return self.data_manager.get_current_page_data()
+        self.data_manager.current_page = page_number
+        return self.data_manager.get_page_data(page_number, page_size)
+
+    def get_page_rows(self, page_number, page_size):
+        """Filas formateadas de una página (desde cache) y prefetch de las vecinas"""
+        self.data_manager.current_page = page_number
+        rows = self.page_cache.get(page_number, page_size)
+        self.page_cache.prefetch(page_number, page_size)
+        return rows
+
+    def set_page_size(self, page_size):
+        self.data_manager.page_size = page_size
+        self.page_cache.clear()
 
     def get_total_records(self):
         return self.data_manager.total_rows
@@ -438,13 +5924,188 @@ class TelegramExcelFunctions:
     def get_ready_links(self):
         return [item['link'] for item in self.data_manager.get_ready_links()]
 
-    def mark_as_clicked(self, excel_row):
-        self.excel_handler.mark_as_processed(excel_row)
-        if self.gui_callback:
-            self.gui_callback.refresh_current_display()
+    def export_tdl_json(self, output_path: str, kind: str = 'ready', query: Optional[str] = None):
+        """
+        Exporta una selección como JSON de tdl-export (para 'tdl forward --from' / 'tdl dl -f')
+        
+        Returns:
+            Tupla (éxito, mensaje, rutas generadas)
+        """
+        try:
+            with TdlExportWriter(output_path) as writer:
+                writer.write_all(self.data_manager.iter_selection(kind, query))
+                paths = writer.close()
+            if not writer.written:
+                return False, "No hay enlaces de canales privados para exportar", []
+            message = f"{writer.written} enlaces exportados en {len(paths)} archivo(s)"
+            if writer.skipped:
+                message += f" ({writer.skipped} enlaces no exportables omitidos)"
+            return True, message, paths
+        except Exception as e:
+            return False, f"Error al exportar: {str(e)}", []
+
+    def export_xlsx(self, output_path: str, kind: str = 'ready', query: Optional[str] = None,
+                    outcome_columns: Optional[bool] = None):
+        """
+        Exporta una selección como xlsx nuevo (escritura en streaming)
+        
+        Args:
+            output_path: Archivo xlsx a generar
+            kind, query: Selección como en DataManager.iter_selection
+            outcome_columns: Añadir resultado, duración y hora de procesado
+                             (por defecto, config 'export_outcome_columns')
+            
+        Returns:
+            Tupla (éxito, mensaje)
+        """
+        if outcome_columns is None:
+            outcome_columns = self.config.get('export_outcome_columns', True)
+        headers = self.source.headers if self.source is not None else None
+        try:
+            with XlsxSelectionWriter(output_path, headers, outcome_columns) as writer:
+                writer.write_all(self.data_manager.iter_selection(kind, query))
+            if not writer.written:
+                os.remove(output_path)
+                return False, "No hay filas para exportar"
+            return True, f"{writer.written} filas exportadas a {os.path.basename(output_path)}"
+        except Exception as e:
+            return False, f"Error al exportar: {str(e)}"
+
+    def mark_as_clicked(self, index):
+        """Marca como procesada la fila con ese índice en all_data y avisa a la GUI"""
+        self.set_processed([index])
+
+    def set_processed(self, indexes, processed=True):
+        """
+        Marca o desmarca varias filas en una sola operación
+        
+        Solo se guardan (con un único guardado de la fuente) las filas cuyo
+        estado cambia; la GUI recibe un ROW_STATUS por fila cambiada. Las
+        filas de una fuente que no se pudo guardar no cambian de estado ni se
+        publican a las demás instancias.
+        
+        Returns:
+            Número de filas cambiadas
+        """
+        status = self.data_manager.status
+        entries = [(index, self.data_manager.get_item(index)) for index in indexes if status[index] != processed]
+        return self._apply_status(entries, processed)
+
+    def _apply_status(self, entries, processed):
+        """Guarda y publica el nuevo estado de los pares (índice, registro) dados"""
+        with self._data_lock:
+            return self._save_status(entries, processed)
+
+    def _save_status(self, entries, processed):
+        status = self.data_manager.status
+        entries = [(index, item) for index, item in entries if item is not None and status[index] != processed]
+        if not entries:
+            return 0
+        entries_by_source = OrderedDict()  # fuente -> registros a guardar
+        for index, item in entries:
+            source = self.sources.get(item.get('source_path'), self.source)
+            entries_by_source.setdefault(source, []).append((index, item))
+        # Solo se aplican, publican y notifican las filas cuya fuente se guardó de verdad
+        entries = []
+        for source, source_entries in entries_by_source.items():
+            excel_rows = [item['excel_row'] for _, item in source_entries]
+            with self._sheet_lock(source.file_path):
+                if processed:
+                    saved = source.mark_rows_as_processed(excel_rows)
+                else:
+                    saved = source.unmark_rows_as_processed(excel_rows)
+                if saved:
+                    self._remember_own_write(source.file_path)
+            if saved:
+                entries.extend(source_entries)
+            else:
+                print(f"❌ No se guardaron {len(excel_rows)} marca(s) en {source.file_path}; "
+                      f"las filas conservan su estado anterior")
+        if not entries:
+            return 0
+        indexes = [index for index, _ in entries]
+        changed = self.data_manager.update_status_many(indexes, processed)
+        self.page_cache.invalidate_indexes(changed)
+        if self.coordinator is not None:
+            try:
+                self.coordinator.publish([(*self._row_key(item), item['link']) for _, item in entries], processed)
+            except sqlite3.Error as e:
+                print(f"⚠️ Marcas guardadas pero no publicadas a las demás instancias: {str(e)}")
+        if self._emitting:
+            for index in changed:
+                self._emit(UIEvent.ROW_STATUS, index, processed)
+        return len(changed)
+
+    def _sheet_lock(self, path):
+        """Bloqueo del guardado de una hoja frente a las demás instancias (si hay coordinación)"""
+        return self.coordinator.file_lock(path) if self.coordinator is not None else nullcontext()
+
+    def set_processed_selection(self, kind: str, query: Optional[str] = None, processed: bool = True):
+        """Marca o desmarca toda una selección de DataManager.iter_selection"""
+        return self._apply_status(self.data_manager.iter_indexed_selection(kind, query), processed)
+
+    def set_processed_range(self, start: int, end: int, processed: bool = True):
+        """Marca o desmarca las filas con índice en [start, end)"""
+        return self.set_processed(range(max(0, start), min(end, self.data_manager.total_rows)), processed)
+
+    def is_processed(self, index):
+        return self.data_manager.status[index]
+
+    def next_unprocessed(self, start=0):
+        """Índice de la siguiente fila pendiente desde start (o None si no quedan)"""
+        return self.data_manager.next_unprocessed(start)
+
+    def get_status_counts(self, page_number=None, page_size=None):
+        """
+        Conteos de procesados sin recorrer los registros
+        
+        Returns:
+            Dict {'processed', 'total'} y, si se indica página, {'page_processed', 'page_total'}
+        """
+        manager = self.data_manager
+        counts = {'processed': manager.count_processed(), 'total': manager.total_rows}
+        if page_number is not None:
+            start = manager.page_start(page_number, page_size)
+            end = min(start + (page_size or manager.page_size), manager.total_rows)
+            counts['page_processed'] = manager.count_processed(start, end)
+            counts['page_total'] = max(0, end - start)
+        return counts
+
+    def get_channel_summary(self):
+        """
+        Conteos, tamaño y duración por canal de origen (mantenidos de forma incremental)
+        
+        Returns:
+            Lista de dicts de ChannelIndex.summary, en el orden de la hoja
+        """
+        return self.data_manager.channels.summary()
+
+    def get_channel_rows(self, key, page_number=0, page_size=None):
+        """Filas formateadas (índice, valores, registro) de una página de un canal"""
+        return [(index, format_row_values(item), item)
+                for index, item in self.data_manager.get_channel_page(key, page_number, page_size)]
+
+    def channel_of(self, index):
+        """Clave del canal de origen de una fila (la de channel_key)"""
+        return self.data_manager.channels.key_of(index)
+
+    def get_ready_entries(self):
+        """Pares (índice, enlace) de las filas procesadas, en orden"""
+        return [(index, item['link']) for index, item in self.data_manager.iter_indexed_selection('ready')]
 
     def set_gui_callback(self, callback):
         self.gui_callback = callback
 
     def cleanup(self):
-        pass
+        self.stop_watching()
+        self.stop_control_server()
+        self.operations.shutdown()
+        self.estimator.save()
+        if self.coordinator is not None:
+            self._coordination_stop.set()
+            self._coordination_thread.join(timeout=5)
+            self.coordinator.close()
+        self.page_cache.clear()
+        self.data_manager.close()
+        for path in self.profiler.close():
+            print(f"🔬 Perfil guardado: {path}")
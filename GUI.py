@@ -1,10 +1,63 @@
 #!/usr/bin/env python3
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import bisect
+import os
 import threading
+import time
+import traceback
+from Functions import UIEvent, describe_eta, format_channel_values
+
+class RenderScheduler:
+    """Coalesces refresh requests into a single after_idle render pass"""
+    
+    def __init__(self, root, render_func):
+        """
+        Args:
+            root: Tk root used to schedule the pass
+            render_func: Callable receiving (full, dirty_indexes) when the pass runs
+        """
+        self.root = root
+        self.render_func = render_func
+        self.dirty = set()
+        self.full = False
+        self._pending = None
+    
+    def mark_dirty(self, indexes):
+        """Schedule a re-render of the given all_data indexes"""
+        self.dirty.update(indexes)
+        self._schedule()
+    
+    def request_full(self):
+        """Schedule a re-render of the whole current page"""
+        self.full = True
+        self._schedule()
+    
+    @property
+    def pending(self):
+        """True while a render pass is scheduled and has not run yet"""
+        return self._pending is not None
+    
+    def _schedule(self):
+        if self._pending is None:
+            self._pending = self.root.after_idle(self.flush)
+    
+    def flush(self):
+        """Run the pending render pass now"""
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+            self._pending = None
+        full, dirty = self.full, self.dirty
+        self.full, self.dirty = False, set()
+        if full or dirty:
+            self.render_func(full, dirty)
 
 class TelegramExcelGUI:
+    EVENT_TICK_MS = 50  # Interval between event bus drains
+    EVENT_BATCH = 1000  # Max events handled per tick
+    PAGE_SIZES = (10, 20, 50, 100, 200)
+    
     def __init__(self, functions_handler):
         """
         Initialize GUI with reference to functions handler
@@ -19,8 +72,20 @@ class TelegramExcelGUI:
         
         # GUI State variables
         self.current_page = 0
-        self.page_size = 20
+        self.page_size = self.functions.data_manager.page_size if self.functions else 20
         self.data = []  # Current page data for tree display
+        self.row_items = []  # Treeview item ids reused across renders, one per page slot
+        self.row_values = []  # Values currently shown in each slot
+        self.rendered_page = None
+        self.renderer = RenderScheduler(self.root, self._render)
+        self.active_jobs = {}  # job id -> last progress payload
+        self.progress_job = None  # job whose tdl progress was reported last
+        self.estimates = {}  # batch operation -> latest ETA snapshot
+        self.estimates_shown_at = 0.0  # the countdown is refreshed once per second
+        self.focus_index = None  # all_data index to select once its page is rendered
+        self.ready_view = None  # open ready-links window, updated from ROW_STATUS events
+        self.channel_view = None  # open per-channel window, updated from ROW_STATUS/ROWS_ADDED events
+        self.transfer = None  # running download/upload pipeline, cancellable
         
         # UI Components
         self.progress = ttk.Progressbar(self.root, mode='indeterminate')
@@ -34,6 +99,11 @@ class TelegramExcelGUI:
         # Set functions callback for GUI updates
         if self.functions:
             self.functions.set_gui_callback(self)
+            self.root.after(self.EVENT_TICK_MS, self._drain_events)
+            if self.functions.config.get('watch_on_start'):
+                self.toggle_watch()
+            if self.functions.config.get('control_on_start'):
+                self.start_control_server()
         self.setup_bindings()
     
     def setup_ui(self):
@@ -46,20 +116,44 @@ class TelegramExcelGUI:
         button_frame.grid(row=0, column=0, sticky="ew", pady=(0, 10))
         
         # Buttons
-        load_btn = ttk.Button(button_frame, text="📁 Cargar archivo Excel", command=self.load_file)
-        load_btn.grid(row=0, column=0, padx=(0, 10))
+        self.load_btn = ttk.Button(button_frame, text="📁 Cargar archivo", command=self.load_file)
+        self.load_btn.grid(row=0, column=0, padx=(0, 10))
         
         ready_btn = ttk.Button(button_frame, text="✅ Ver links listos", command=self.view_ready_links)
         ready_btn.grid(row=0, column=1, padx=(0, 10))
         
+        export_btn = ttk.Button(button_frame, text="💾 Exportar", command=self.export_tdl_json)
+        export_btn.grid(row=0, column=2, padx=(0, 10))
+        
+        batch_btn = ttk.Button(button_frame, text="📦 Reenviar por canal", command=self.forward_batches)
+        batch_btn.grid(row=0, column=3, padx=(0, 10))
+        
+        self.transfer_btn = ttk.Button(button_frame, text="🔁 Descargar y subir", command=self.transfer_links)
+        self.transfer_btn.grid(row=0, column=4, padx=(0, 10))
+        
+        mark_btn = ttk.Button(button_frame, text="✔️ Marcar", command=lambda: self.bulk_status(True))
+        mark_btn.grid(row=0, column=5, padx=(0, 10))
+        
+        unmark_btn = ttk.Button(button_frame, text="↩️ Desmarcar", command=lambda: self.bulk_status(False))
+        unmark_btn.grid(row=0, column=6, padx=(0, 10))
+        
+        profile_btn = ttk.Button(button_frame, text="🔬 Perfilado", command=self.choose_profile_phases)
+        profile_btn.grid(row=0, column=7, padx=(0, 10))
+        
+        self.watch_btn = ttk.Button(button_frame, text="👁️ Vigilar carpeta", command=self.toggle_watch)
+        self.watch_btn.grid(row=0, column=8, padx=(0, 10))
+        
+        channels_btn = ttk.Button(button_frame, text="📊 Por canal", command=self.view_channels)
+        channels_btn.grid(row=0, column=9, padx=(0, 10))
+        
         exit_btn = ttk.Button(button_frame, text="❌ Salir", command=self.exit_app)
-        exit_btn.grid(row=0, column=2, padx=(0, 10))
+        exit_btn.grid(row=0, column=10, padx=(0, 10))
         
         # Progress bar
-        self.progress.grid(row=0, column=3, padx=(10, 0), sticky="ew")
+        self.progress.grid(row=0, column=11, padx=(10, 0), sticky="ew")
         self.progress.grid_remove()
         
-        button_frame.columnconfigure(3, weight=1)
+        button_frame.columnconfigure(11, weight=1)
         
         # Treeview setup
         self.setup_treeview(main_frame)
@@ -115,11 +209,22 @@ class TelegramExcelGUI:
         
         self.total_label = ttk.Label(pagination_frame, text="Total: 0 registros")
         self.total_label.grid(row=0, column=3, padx=(10, 0))
+        
+        ttk.Label(pagination_frame, text="Filas por página:").grid(row=0, column=4, padx=(10, 5))
+        self.page_size_var = tk.StringVar(value=str(self.page_size))
+        page_size_box = ttk.Combobox(pagination_frame, textvariable=self.page_size_var, width=5,
+                                     values=[str(size) for size in self.PAGE_SIZES])
+        page_size_box.grid(row=0, column=5)
+        page_size_box.bind('<<ComboboxSelected>>', self.on_page_size_change)
+        page_size_box.bind('<Return>', self.on_page_size_change)
+        
+        self.status_label = ttk.Label(pagination_frame, text="")
+        self.status_label.grid(row=0, column=6, padx=(10, 0))
     
     def setup_instructions(self, parent):
         """Setup instruction label"""
         instructions = ttk.Label(parent, 
-                               text="📖 Instrucciones: Click en link para abrir • Enter para abrir • Cmd+Click para descargar • Cmd+Enter para descargar • Opt+Click/Opt+Enter para reenviar")
+                               text="📖 Instrucciones: Click en link para abrir • Enter para abrir • Cmd+Click para descargar • Cmd+Enter para descargar • Opt+Click/Opt+Enter para reenviar • N siguiente pendiente • M/U marcar/desmarcar selección")
         instructions.grid(row=4, column=0, columnspan=2, pady=(10, 0), sticky="w")
     
     def setup_bindings(self):
@@ -129,6 +234,11 @@ class TelegramExcelGUI:
         self.tree.bind('<Command-Return>', self.on_command_enter)
         self.tree.bind('<Option-Return>', self.on_option_enter)
         self.tree.bind('<FocusIn>', lambda _: self.tree.focus_set())
+        self.root.bind('<Next>', lambda _: self.next_page())
+        self.root.bind('<Prior>', lambda _: self.prev_page())
+        self.tree.bind('<n>', lambda _: self.jump_to_next_unprocessed())
+        self.tree.bind('<m>', lambda _: self.set_selection_status(True))
+        self.tree.bind('<u>', lambda _: self.set_selection_status(False))
         self.tree.focus_set()
     
     # Event Handlers
@@ -168,32 +278,71 @@ class TelegramExcelGUI:
     
     # Action Methods
     def load_file(self):
-        """Initiate file loading process"""
-        self.show_progress()
-        threading.Thread(target=self._load_file_thread, daemon=True).start()
+        """Ask for a sheet (xlsx, CSV/TSV or tdl-export JSON) and load it in the background"""
+        default_path = self.functions.config.get('default_path') or ""
+        initial_dir = default_path if os.path.isdir(default_path) else os.path.dirname(default_path)
+        file_path = filedialog.askopenfilename(
+            title="Seleccionar archivo",
+            initialdir=initial_dir or None,
+            filetypes=[
+                ("Listas de enlaces", "*.xlsx *.xlsm *.csv *.tsv *.json"),
+                ("Excel files", "*.xlsx *.xlsm"),
+                ("CSV/TSV files", "*.csv *.tsv"),
+                ("tdl-export JSON", "*.json"),
+            ]
+        )
+        if not file_path:
+            return
+        self.current_page = 0
+        self.load_btn.config(text="⏹️ Cancelar carga", command=self.functions.cancel_load)
+        self.progress.config(mode='determinate', maximum=100, value=0)
+        self.progress.grid()
+        threading.Thread(target=self._load_file_thread, args=(file_path,), daemon=True).start()
+    
+    def _load_progress(self, payload):
+        """Show streamed rows as they arrive: first page, live totals and bytes read"""
+        if payload['total_bytes']:
+            self.progress.config(value=min(100, payload['bytes'] * 100 / payload['total_bytes']))
+        self.status_label.config(text=f"⏳ {payload['rows']} filas leídas")
+        if payload['first']:
+            self.current_page = 0
+            self.rendered_page = None
+        self.update_pagination()
+        if payload['first'] or len(self.data) < self.page_size:
+            self.load_current_page()
     
-    def _load_file_thread(self):
+    def _load_file_thread(self, file_path=None):
         """Background thread for file loading"""
         try:
-            success, message = self.functions.load_excel_file()
-            self.root.after(0, lambda: self._load_complete(success, message))
+            success, message = self.functions.load_excel_file(file_path)
+            self.functions.events.call(lambda: self._load_complete(success, message))
         except Exception as e:
-            self.root.after(0, lambda: self._load_error(str(e)))
+            error_msg = str(e)
+            self.functions.events.call(lambda: self._load_error(error_msg))
+    
+    def _end_load(self):
+        """Restore the load button and the indeterminate progress bar"""
+        self.load_btn.config(text="📁 Cargar archivo", command=self.load_file)
+        self.hide_progress()
+        self.progress.config(mode='indeterminate', value=0)
     
     def _load_complete(self, success, message):
         """Handle completion of file loading"""
-        self.hide_progress()
+        self._end_load()
+        self.status_label.config(text="")
         if success:
-            self.current_page = 0
+            self.rendered_page = None
             self.load_current_page()
             self.update_pagination()
+            self.refresh_channel_view()
             messagebox.showinfo("✅ Éxito", message)
         else:
             messagebox.showerror("❌ Error", message)
     
     def _load_error(self, error_msg):
         """Handle file loading errors"""
-        self.hide_progress()
+        self._end_load()
+        self.status_label.config(text="")
         messagebox.showerror("❌ Error", f"Error al cargar el archivo: {error_msg}")
     
     def open_link(self, item_id):
@@ -201,9 +350,7 @@ class TelegramExcelGUI:
         clicked_data = self.get_data_by_item(item_id)
         if clicked_data:
             try:
-                self.functions.open_in_telegram(clicked_data['link'])
-                self.functions.mark_as_clicked(clicked_data['excel_row'])
-                self.refresh_current_display()
+                self.functions.open_in_telegram(clicked_data['link'], clicked_data['index'])
             except Exception as e:
                 messagebox.showerror("❌ Error", f"Error al abrir el enlace: {str(e)}")
     
@@ -212,9 +359,7 @@ class TelegramExcelGUI:
         clicked_data = self.get_data_by_item(item_id)
         if clicked_data:
             try:
-                self.functions.download_with_tlg(clicked_data['link'])
-                self.functions.mark_as_clicked(clicked_data['excel_row'])
-                self.refresh_current_display()
+                self.functions.download_with_tlg(clicked_data['link'], clicked_data['index'])
             except Exception as e:
                 messagebox.showerror("❌ Error", f"Error al descargar: {str(e)}")
     
@@ -236,18 +381,17 @@ class TelegramExcelGUI:
     def _forward_link_thread(self, clicked_data):
         """Background thread for forwarding links"""
         try:
-            success = self.functions.forward_with_tdl(clicked_data['link'])
-            self.root.after(0, lambda: self._forward_complete(success, clicked_data))
+            success = self.functions.forward_with_tdl(clicked_data['link'], clicked_data['index'])
+            self.functions.events.call(lambda: self._forward_complete(success, clicked_data))
         except Exception as e:
-            self.root.after(0, lambda: self._forward_error(str(e)))
+            error_msg = str(e)
+            self.functions.events.call(lambda: self._forward_error(error_msg))
     
     def _forward_complete(self, success, clicked_data):
         """Handle completion of link forwarding"""
         self.hide_progress()
         if success:
             messagebox.showinfo("✅ Éxito", "Video reenviado correctamente al canal")
-            self.functions.mark_as_clicked(clicked_data['excel_row'])
-            self.refresh_current_display()
         else:
             messagebox.showerror("❌ Error", "No se pudo reenviar el video ni enviar como texto")
     
@@ -256,6 +400,270 @@ class TelegramExcelGUI:
         self.hide_progress()
         messagebox.showerror("❌ Error", f"Error durante el reenvío: {error_msg}")
     
+    # Status Methods
+    def jump_to_next_unprocessed(self):
+        """Select the next unprocessed row after the selection (or the page start), flipping pages"""
+        selection = [self.get_data_by_item(item_id) for item_id in self.tree.selection()]
+        selection = [entry for entry in selection if entry]
+        start = max(entry['index'] for entry in selection) + 1 if selection else self.current_page * self.page_size
+        index = self.functions.next_unprocessed(start)
+        if index is None:
+            self.status_label.config(text="✅ No quedan pendientes")
+            return
+        self.focus_index = index
+        page = index // self.page_size
+        if page != self.current_page:
+            self.current_page = page
+            self.update_pagination()
+        self.load_current_page()
+    
+    def set_selection_status(self, processed):
+        """Mark or unmark the rows selected in the tree"""
+        indexes = [entry['index'] for entry in map(self.get_data_by_item, self.tree.selection()) if entry]
+        if indexes:
+            self.functions.set_processed(indexes, processed)
+    
+    def bulk_status(self, processed):
+        """Ask for a selection and mark or unmark all of it"""
+        title = "✔️ Marcar" if processed else "↩️ Desmarcar"
+        self.ask_export_selection(lambda kind, query: self._start_bulk_status(kind, query, processed),
+                                  title=title, default_kind='page')
+    
+    def _start_bulk_status(self, kind, query, processed):
+        """Run a bulk mark/unmark in the background"""
+        self.show_progress()
+        threading.Thread(target=self._bulk_status_thread, args=(kind, query, processed), daemon=True).start()
+    
+    def _bulk_status_thread(self, kind, query, processed):
+        """Background thread for bulk mark/unmark"""
+        try:
+            changed = self.functions.set_processed_selection(kind, query, processed)
+            self.functions.events.call(lambda: self._bulk_status_complete(changed, processed))
+        except Exception as e:
+            error_msg = str(e)
+            self.functions.events.call(lambda: self._bulk_status_error(error_msg))
+    
+    def _bulk_status_complete(self, changed, processed):
+        """Handle completion of a bulk mark/unmark"""
+        self.hide_progress()
+        action = "marcadas" if processed else "desmarcadas"
+        self.status_label.config(text=f"✔️ {changed} filas {action}")
+    
+    def _bulk_status_error(self, error_msg):
+        """Handle bulk mark/unmark errors"""
+        self.hide_progress()
+        messagebox.showerror("❌ Error", f"Error al cambiar el estado: {error_msg}")
+    
+    # Folder Watching
+    def toggle_watch(self):
+        """Start or stop ingesting new sheets dropped into the watched folder"""
+        if self.functions.watcher is not None:
+            self.functions.stop_watching()
+            self.watch_btn.config(text="👁️ Vigilar carpeta")
+            self.status_label.config(text="⏹️ Vigilancia detenida")
+            return
+        success, message = self.functions.start_watching()
+        if success:
+            self.watch_btn.config(text="⏹️ Dejar de vigilar")
+            self.status_label.config(text=f"👁️ {message}")
+        else:
+            messagebox.showerror("❌ Error", message)
+    
+    def start_control_server(self):
+        """Open the local control API so other tools can queue links"""
+        success, message = self.functions.start_control_server()
+        if success:
+            self.status_label.config(text=f"🔌 {message}")
+        else:
+            messagebox.showerror("❌ Error", message)
+    
+    # Profiling Methods
+    def choose_profile_phases(self):
+        """Select which phases are profiled from now on and optionally write the reports"""
+        profiler = self.functions.profiler
+        dialog = tk.Toplevel(self.root)
+        dialog.title("🔬 Perfilado")
+        dialog.transient(self.root)
+        
+        frame = ttk.Frame(dialog, padding="10")
+        frame.grid(row=0, column=0, sticky="nsew")
+        
+        labels = {'load': "📁 Carga", 'render': "🖼️ Render de páginas", 'forward': "🚀 Reenvíos"}
+        phase_vars = {}
+        for row, (phase, text) in enumerate(labels.items()):
+            phase_vars[phase] = tk.BooleanVar(value=phase in profiler.phases)
+            ttk.Checkbutton(frame, text=text, variable=phase_vars[phase]).grid(row=row, column=0, sticky="w")
+        
+        def apply():
+            phases = [phase for phase, var in phase_vars.items() if var.get()]
+            if 'session' in profiler.phases:
+                phases.append('session')
+            profiler.set_phases(phases)
+            dialog.destroy()
+        
+        def write_reports():
+            paths = profiler.write_reports()
+            if paths:
+                messagebox.showinfo("🔬 Perfilado", "Informes guardados:\n" + "\n".join(paths), parent=dialog)
+            else:
+                messagebox.showinfo("🔬 Perfilado", "Todavía no hay mediciones", parent=dialog)
+        
+        ttk.Button(frame, text="✔️ Aplicar", command=apply).grid(row=len(labels), column=0, pady=(10, 0), sticky="w")
+        ttk.Button(frame, text="💾 Guardar informes", command=write_reports).grid(
+            row=len(labels), column=1, pady=(10, 0), padx=(10, 0), sticky="w")
+    
+    # Batch Forward Methods
+    def forward_batches(self):
+        """Ask for a selection and forward it grouped by source channel"""
+        self.ask_export_selection(self._start_batch_forward, title="📦 Reenviar por canal",
+                                  default_kind='unprocessed')
+    
+    def _start_batch_forward(self, kind, query=None):
+        """Run the batch forward in the background"""
+        self.show_progress()
+        threading.Thread(
+            target=self._batch_forward_thread,
+            args=(kind, query),
+            daemon=True
+        ).start()
+    
+    def _batch_forward_thread(self, kind, query):
+        """Background thread for channel-grouped forwards"""
+        try:
+            success, message = self.functions.forward_selection(kind, query)
+            self.functions.events.call(lambda: self._batch_forward_complete(success, message))
+        except Exception as e:
+            error_msg = str(e)
+            self.functions.events.call(lambda: self._forward_error(error_msg))
+    
+    def _batch_forward_complete(self, success, message):
+        """Handle completion of a batch forward"""
+        self.hide_progress()
+        if success:
+            messagebox.showinfo("✅ Reenviado", message)
+        else:
+            messagebox.showerror("❌ Error", message)
+    
+    # Transfer Methods
+    def transfer_links(self):
+        """Ask for a selection and download/re-upload it, or cancel the running transfer"""
+        if self.transfer is not None:
+            self.transfer.cancel()
+            self.transfer_btn.config(text="⏳ Cancelando...", state="disabled")
+            return
+        self.ask_export_selection(self._start_transfer, title="🔁 Descargar y subir",
+                                  default_kind='unprocessed')
+    
+    def _start_transfer(self, kind, query=None):
+        """Run the download/upload pipeline in the background"""
+        self.transfer = self.functions.create_transfer_pipeline()
+        self.transfer_btn.config(text="⏹️ Cancelar transferencia")
+        self.show_progress()
+        threading.Thread(
+            target=self._transfer_thread,
+            args=(kind, query, self.transfer),
+            daemon=True
+        ).start()
+    
+    def _transfer_thread(self, kind, query, pipeline):
+        """Background thread for the download/upload pipeline"""
+        try:
+            success, message = self.functions.transfer_selection(kind, query, pipeline=pipeline)
+            self.functions.events.call(lambda: self._transfer_complete(success, message))
+        except Exception as e:
+            error_msg = str(e)
+            self.functions.events.call(lambda: self._transfer_complete(False, error_msg))
+    
+    def _transfer_complete(self, success, message):
+        """Handle completion of the download/upload pipeline"""
+        self.transfer = None
+        self.transfer_btn.config(text="🔁 Descargar y subir", state="normal")
+        self.hide_progress()
+        if success:
+            messagebox.showinfo("✅ Transferido", message)
+        else:
+            messagebox.showerror("❌ Error", message)
+    
+    # Export Methods
+    def export_tdl_json(self):
+        """Ask for a selection and export it as tdl-export JSON or as a new xlsx"""
+        self.ask_export_selection(self._start_tdl_export)
+    
+    def ask_export_selection(self, on_selected, title="💾 Exportar", default_kind='ready'):
+        """
+        Show a dialog to choose which rows to export (or act on)
+        
+        Args:
+            on_selected: Callback receiving (kind, query) once the user confirms
+            title: Dialog title, also used for the confirm button
+            default_kind: Selection checked when the dialog opens
+        """
+        dialog = tk.Toplevel(self.root)
+        dialog.title(title)
+        dialog.transient(self.root)
+        
+        frame = ttk.Frame(dialog, padding="10")
+        frame.grid(row=0, column=0, sticky="nsew")
+        
+        kind_var = tk.StringVar(value=default_kind)
+        options = [
+            ('✅ Links listos', 'ready'),
+            ('⏳ Pendientes', 'unprocessed'),
+            ('🕒 Procesados hoy', 'today'),
+            ('📄 Página actual', 'page'),
+            ('📚 Todos', 'all'),
+            ('🔍 Búsqueda', 'search'),
+        ]
+        for row, (text, value) in enumerate(options):
+            ttk.Radiobutton(frame, text=text, variable=kind_var, value=value).grid(row=row, column=0, sticky="w")
+        
+        query_entry = ttk.Entry(frame, width=30)
+        query_entry.grid(row=len(options), column=0, pady=(5, 0), sticky="ew")
+        
+        def confirm():
+            kind, query = kind_var.get(), query_entry.get().strip()
+            if kind == 'search' and not query:
+                messagebox.showwarning("🔍 Búsqueda", "Escribe un texto para buscar", parent=dialog)
+                return
+            dialog.destroy()
+            on_selected(kind, query or None)
+        
+        ttk.Button(frame, text=title, command=confirm).grid(row=len(options) + 1, column=0, pady=(10, 0), sticky="w")
+    
+    def _start_tdl_export(self, kind, query=None):
+        """Ask for the output file and run the export in the background (format from the extension)"""
+        output_path = filedialog.asksaveasfilename(
+            title="Guardar exportación",
+            initialdir=self.functions.config.get('default_path'),
+            initialfile=f"tdl-export-{kind}.json",
+            defaultextension=".json",
+            filetypes=[("tdl-export JSON", "*.json"), ("Excel files", "*.xlsx")]
+        )
+        if not output_path:
+            return
+        self.show_progress()
+        threading.Thread(
+            target=self._export_thread,
+            args=(output_path, kind, query),
+            daemon=True
+        ).start()
+    
+    def _export_thread(self, output_path, kind, query):
+        """Background thread for exports"""
+        if output_path.lower().endswith('.xlsx'):
+            success, message = self.functions.export_xlsx(output_path, kind, query)
+        else:
+            success, message, _ = self.functions.export_tdl_json(output_path, kind, query)
+        self.functions.events.call(lambda: self._export_complete(success, message))
+    
+    def _export_complete(self, success, message):
+        """Handle completion of an export"""
+        self.hide_progress()
+        if success:
+            messagebox.showinfo("✅ Exportado", message)
+        else:
+            messagebox.showerror("❌ Error", message)
+    
     # Pagination Methods
     def prev_page(self):
         """Navigate to previous page"""
@@ -272,38 +680,101 @@ class TelegramExcelGUI:
             self.load_current_page()
             self.update_pagination()
     
+    def on_page_size_change(self, _=None):
+        """Apply a new page size, keeping the first visible row on screen"""
+        try:
+            page_size = int(self.page_size_var.get())
+        except ValueError:
+            page_size = 0
+        if page_size <= 0:
+            self.page_size_var.set(str(self.page_size))
+            return
+        if page_size == self.page_size:
+            return
+        first_row = self.current_page * self.page_size
+        self.page_size = page_size
+        self.current_page = first_row // page_size
+        self.functions.set_page_size(page_size)
+        self.load_current_page()
+        self.update_pagination()
+    
     def get_total_pages(self):
         """Calculate total number of pages"""
         total_records = self.functions.get_total_records()
         return (total_records + self.page_size - 1) // self.page_size if total_records > 0 else 0
     
     def load_current_page(self):
-        """Load and display current page data"""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        self.data = []
-        
-        # Get page data from functions
-        page_data = self.functions.get_page_data(self.current_page, self.page_size)
-        
-        for data_item in page_data:
-            row_data = data_item['data']
-            item_id = self.tree.insert('', tk.END, values=row_data)
-            
-            # Mark clicked items visually
-            if data_item['is_clicked']:
-                current_values = list(row_data)
-                current_values[0] = f"✅ {data_item['link']}"
-                self.tree.item(item_id, values=current_values)
-            
-            self.data.append({
-                'tree_item': item_id,
-                'excel_row': data_item['excel_row'],
-                'link': data_item['link'],
-                'is_clicked': data_item['is_clicked']
-            })
+        """Schedule a render of the current page data"""
+        self.renderer.request_full()
+    
+    def _render(self, full, dirty):
+        """
+        Update the tree in place
+        
+        A full pass re-reads the page and only touches slots whose values
+        changed; a dirty pass only re-formats the given rows.
+        """
+        with self.functions.profiler.phase('render'):
+            self._render_page(full, dirty)
+    
+    def _render_page(self, full, dirty):
+        page_rows = self.functions.get_page_rows(self.current_page, self.page_size)
+        if full:
+            if self.rendered_page != self.current_page and self.tree.selection():
+                self.tree.selection_remove(self.tree.selection())
+            self.rendered_page = self.current_page
+            self.data = []
+            for slot, row in enumerate(page_rows):
+                self._render_slot(slot, row)
+            for item_id in self.row_items[len(page_rows):]:
+                self.tree.delete(item_id)
+            del self.row_items[len(page_rows):]
+            del self.row_values[len(page_rows):]
+            self._apply_focus()
+            return
+        
+        start = self.current_page * self.page_size
+        for index in dirty:
+            slot = index - start
+            if 0 <= slot < min(len(self.data), len(page_rows)):
+                self._render_slot(slot, page_rows[slot])
+    
+    def _apply_focus(self):
+        """Select the row requested by jump_to_next_unprocessed if it is on screen"""
+        if self.focus_index is None:
+            return
+        slot = self.focus_index - self.current_page * self.page_size
+        if 0 <= slot < len(self.row_items):
+            item_id = self.row_items[slot]
+            self.tree.selection_set(item_id)
+            self.tree.focus(item_id)
+            self.tree.see(item_id)
+        self.focus_index = None
+    
+    def _render_slot(self, slot, row):
+        """Show a cached page row in the given slot, touching the tree only if it changed"""
+        index, values, data_item = row
+        if slot < len(self.row_items):
+            item_id = self.row_items[slot]
+            if self.row_values[slot] != values:
+                self.tree.item(item_id, values=values)
+                self.row_values[slot] = values
+        else:
+            item_id = self.tree.insert('', tk.END, values=values)
+            self.row_items.append(item_id)
+            self.row_values.append(values)
+        
+        entry = {
+            'tree_item': item_id,
+            'excel_row': data_item['excel_row'],
+            'link': data_item['link'],
+            'is_clicked': data_item['is_clicked'],
+            'index': index
+        }
+        if slot < len(self.data):
+            self.data[slot] = entry
+        else:
+            self.data.append(entry)
     
     def update_pagination(self):
         """Update pagination display and button states"""
@@ -312,21 +783,127 @@ class TelegramExcelGUI:
         current_page_display = self.current_page + 1 if total_records > 0 else 0
         
         self.page_label.config(text=f"Página {current_page_display} de {total_pages}")
-        self.total_label.config(text=f"Total: {total_records} registros")
+        self.update_status_counts()
         
         self.prev_btn.config(state="normal" if self.current_page > 0 else "disabled")
         self.next_btn.config(state="normal" if self.current_page < total_pages - 1 else "disabled")
     
+    def update_status_counts(self):
+        """Show processed counts for the whole list and the current page"""
+        counts = self.functions.get_status_counts(self.current_page, self.page_size)
+        self.total_label.config(
+            text=f"Total: {counts['total']} registros • ✅ {counts['processed']} procesados "
+                 f"({counts['page_processed']}/{counts['page_total']} en la página)"
+        )
+    
     def refresh_current_display(self):
         """Refresh the current page display"""
-        self.load_current_page()
+        self.renderer.request_full()
+    
+    def mark_rows_dirty(self, indexes):
+        """Schedule a re-render of the given all_data indexes"""
+        self.renderer.mark_dirty(indexes)
+    
+    # Event Bus
+    def _drain_events(self):
+        """
+        Handle a batch of worker events on the Tk thread
+        
+        The next tick is scheduled before anything runs, so a failing handler
+        cannot stop the loop. Each event and each view update runs in its own
+        try, and callables posted by workers run as separate Tk callbacks.
+        """
+        self.root.after(self.EVENT_TICK_MS, self._drain_events)
+        dirty = set()
+        rows_added = None
+        jobs_changed = False
+        for event_type, key, payload in self.functions.events.drain(self.EVENT_BATCH):
+            try:
+                if event_type == UIEvent.ROW_STATUS:
+                    dirty.add(key)
+                elif event_type == UIEvent.JOB_PROGRESS:
+                    if payload.get('state') in ('done', 'failed'):
+                        self.active_jobs.pop(key, None)
+                    else:
+                        self.active_jobs[key] = payload
+                        if payload.get('progress'):
+                            self.progress_job = key
+                    jobs_changed = True
+                elif event_type == UIEvent.LOAD_PROGRESS:
+                    self._load_progress(payload)
+                elif event_type == UIEvent.ROWS_ADDED:
+                    rows_added = payload
+                elif event_type == UIEvent.ETA:
+                    if payload is None:
+                        self.estimates.pop(key, None)
+                    else:
+                        self.estimates[key] = payload
+                    jobs_changed = True
+                elif event_type == UIEvent.CALL:
+                    self.root.after(0, payload)
+            except Exception as e:
+                self._handler_failed(event_type, e)
+        if rows_added is not None:
+            self._run_handler('rows_added', self.update_pagination)
+            self._run_handler('rows_added', self.renderer.request_full)
+            self._run_handler('rows_added', lambda: self.status_label.config(text=f"📥 {rows_added['message']}"))
+            self._run_handler('rows_added', self.refresh_channel_view)
+        if dirty:
+            self._run_handler('row_status', lambda: self.renderer.mark_dirty(dirty))
+            self._run_handler('row_status', self.update_status_counts)
+            self._run_handler('row_status', lambda: self.update_ready_view(dirty))
+            self._run_handler('row_status', lambda: self.update_channel_view(dirty))
+        if jobs_changed or (self.estimates and time.monotonic() - self.estimates_shown_at >= 1):
+            self._run_handler('job_progress', self.update_jobs_status)
+    
+    def _run_handler(self, event_type, handler):
+        try:
+            handler()
+        except Exception as e:
+            self._handler_failed(event_type, e)
+    
+    @staticmethod
+    def _handler_failed(event_type, error):
+        """Report a failing event handler on the console; the event loop keeps running"""
+        print(f"⚠️ Error handling {event_type} event: {error}")
+        traceback.print_exc()
+    
+    def update_jobs_status(self):
+        """Show running and queued jobs, the live progress of the latest transfer and batch ETAs"""
+        queued = sum(1 for job in self.active_jobs.values() if job.get('state') == 'queued')
+        stalled = sum(1 for job in self.active_jobs.values() if job.get('state') == 'stalled')
+        running = len(self.active_jobs) - queued - stalled
+        self.estimates_shown_at = time.monotonic()
+        if not self.active_jobs and not self.estimates:
+            self.status_label.config(text="")
+            return
+        text = f"🚀 {running} trabajos en curso"
+        if queued:
+            text += f", {queued} en cola"
+        if stalled:
+            text += f", ⚠️ {stalled} atascados (reprogramados)"
+        job = self.active_jobs.get(self.progress_job)
+        if job and job.get('progress') and job.get('state') != 'stalled':
+            text += " · " + self.format_progress(job['progress'])
+        for label, estimate in self.estimates.items():
+            name = "Reenvío" if label == 'forward' else "Transferencia"
+            text += f"\n{name}: {estimate['done']}/{estimate['total']} · {describe_eta(estimate)}"
+        self.status_label.config(text=text)
+    
+    @staticmethod
+    def format_progress(progress):
+        """Describe a parsed tdl progress line: file, percent, rate and ETA"""
+        rate = progress['rate'] / 1024 ** 2
+        name = progress['name'] if len(progress['name']) <= 40 else progress['name'][:37] + "..."
+        return f"{name} {progress['percent']:.0f}% · {rate:.1f} MB/s · ETA {progress['eta']:.0f}s"
     
     # Utility Methods
     def get_data_by_item(self, item_id):
         """Get data associated with a tree item"""
-        for data_item in self.data:
-            if data_item['tree_item'] == item_id:
-                return data_item
+        if item_id in self.row_items:
+            slot = self.row_items.index(item_id)
+            if slot < len(self.data):
+                return self.data[slot]
         return None
     
     def show_progress(self):
@@ -341,15 +918,19 @@ class TelegramExcelGUI:
     
     # Ready Links Window
     def view_ready_links(self):
-        """Display window with processed/ready links"""
+        """Display window with processed/ready links, kept up to date from status events"""
+        if self.ready_view is not None:
+            self.ready_view['window'].lift()
+            return
+        
         ready_window = tk.Toplevel(self.root)
         ready_window.title("✅ Links Listos")
         ready_window.geometry("600x400")
-
+        
         ready_frame = ttk.Frame(ready_window, padding="10")
         ready_frame.grid(row=0, column=0, sticky="nsew")
-
-        # Treeview for ready links
+        
+        # Treeview for ready links (item ids are all_data indexes)
         ready_tree = ttk.Treeview(ready_frame, columns=('Link', 'Status'), show='headings')
         ready_tree.heading('Link', text='Link')
         ready_tree.heading('Status', text='Status')
@@ -370,32 +951,250 @@ class TelegramExcelGUI:
         ready_window.columnconfigure(0, weight=1)
         ready_window.rowconfigure(0, weight=1)
         
-        # Load ready links
-        ready_links = self.functions.get_ready_links()
-        for link in ready_links:
-            ready_tree.insert('', tk.END, values=(link, '✅ Visto'))
-        
         # Add refresh button
         refresh_btn = ttk.Button(ready_frame, text="🔄 Actualizar", 
                                command=lambda: self.refresh_ready_links(ready_tree))
         refresh_btn.grid(row=1, column=0, pady=(10, 0), sticky="w")
         
+        # Add export button
+        export_btn = ttk.Button(ready_frame, text="💾 Exportar JSON",
+                              command=lambda: self._start_tdl_export('ready'))
+        export_btn.grid(row=1, column=0, pady=(10, 0), sticky="e")
+        
         # Add count label
-        count_label = ttk.Label(ready_frame, text=f"Total links vistos: {len(ready_links)}")
+        count_label = ttk.Label(ready_frame, text="")
         count_label.grid(row=2, column=0, pady=(5, 0), sticky="w")
+        
+        self.ready_view = {'window': ready_window, 'tree': ready_tree, 'count_label': count_label, 'shown': []}
+        ready_window.protocol("WM_DELETE_WINDOW", self.close_ready_view)
+        self._fill_ready_tree(ready_tree)
+    
+    def close_ready_view(self):
+        """Forget the ready window so status events stop updating it"""
+        if self.ready_view is not None:
+            self.ready_view['window'].destroy()
+            self.ready_view = None
+    
+    def _fill_ready_tree(self, ready_tree):
+        """Load the full ready list into the tree"""
+        ready_tree.delete(*ready_tree.get_children())
+        entries = self.functions.get_ready_entries()
+        for index, link in entries:
+            ready_tree.insert('', tk.END, iid=str(index), values=(link, '✅ Visto'))
+        if self.ready_view is not None:
+            self.ready_view['shown'] = [index for index, _ in entries]
+        self._update_ready_count()
+        return len(entries)
+    
+    def _update_ready_count(self):
+        if self.ready_view is not None:
+            count = self.functions.get_status_counts()['processed']
+            self.ready_view['count_label'].config(text=f"Total links vistos: {count}")
+    
+    def update_ready_view(self, indexes):
+        """
+        Apply status changes to the open ready window without rescanning
+        
+        The window keeps the sorted indexes it shows, and each new row goes at
+        its position among those. The live bitset can already hold changes
+        whose events have not been drained yet, so its rank is not used here.
+        """
+        if self.ready_view is None:
+            return
+        ready_tree = self.ready_view['tree']
+        shown = self.ready_view['shown']
+        additions = []
+        for index in indexes:
+            position = bisect.bisect_left(shown, index)
+            visible = position < len(shown) and shown[position] == index
+            processed = self.functions.is_processed(index)
+            if visible and not processed:
+                ready_tree.delete(str(index))
+                del shown[position]
+            elif processed and not visible:
+                additions.append(index)
+        for index in sorted(additions):
+            position = bisect.bisect_left(shown, index)
+            item = self.functions.data_manager.get_item(index)
+            ready_tree.insert('', position, iid=str(index), values=(item['link'], '✅ Visto'))
+            shown.insert(position, index)
+        self._update_ready_count()
     
     def refresh_ready_links(self, ready_tree):
         """Refresh the ready links display"""
-        # Clear existing items
-        for item in ready_tree.get_children():
-            ready_tree.delete(item)
+        count = self._fill_ready_tree(ready_tree)
+        messagebox.showinfo("🔄 Actualizado", f"Se encontraron {count} links vistos")
+    
+    # Channel Summary Window
+    CHANNEL_PAGE = 100  # Rows per page in the channel drill-down
+    CHANNEL_SORT = {'Canal': 'label', 'Filas': 'total', 'Procesadas': 'processed', 'Pendientes': 'unprocessed',
+                    'Tamaño': 'size_bytes', 'Duración': 'duration'}
+    
+    def view_channels(self):
+        """Display one row per source channel (kept up to date from events) and the rows of the selected one"""
+        if self.channel_view is not None:
+            self.channel_view['window'].lift()
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("📊 Por canal")
+        window.geometry("900x600")
+        
+        frame = ttk.Frame(window, padding="10")
+        frame.grid(row=0, column=0, sticky="nsew")
         
-        # Reload ready links
-        ready_links = self.functions.get_ready_links()
-        for link in ready_links:
-            ready_tree.insert('', tk.END, values=(link, '✅ Visto'))
+        # Treeview for channels (item ids are 'ch:' + channel key)
+        channel_tree = ttk.Treeview(frame, columns=tuple(self.CHANNEL_SORT), show='headings',
+                                    height=10, selectmode='browse')
+        for column in self.CHANNEL_SORT:
+            channel_tree.heading(column, text=column, command=lambda column=column: self._sort_channels(column))
+            channel_tree.column(column, width=260 if column == 'Canal' else 100,
+                                anchor='w' if column == 'Canal' else 'e')
+        channel_scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=channel_tree.yview)
+        channel_tree.configure(yscrollcommand=channel_scrollbar.set)
+        channel_tree.grid(row=0, column=0, sticky="nsew")
+        channel_scrollbar.grid(row=0, column=1, sticky="ns")
         
-        messagebox.showinfo("🔄 Actualizado", f"Se encontraron {len(ready_links)} links vistos")
+        # Treeview for the rows of the selected channel (item ids are all_data indexes)
+        row_columns = ('Link', 'Duration', 'Size', 'File')
+        rows_tree = ttk.Treeview(frame, columns=row_columns, show='headings')
+        for column in row_columns:
+            rows_tree.heading(column, text=column)
+            rows_tree.column(column, width=360 if column == 'Link' else 120)
+        rows_scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=rows_tree.yview)
+        rows_tree.configure(yscrollcommand=rows_scrollbar.set)
+        rows_tree.grid(row=1, column=0, sticky="nsew", pady=(10, 0))
+        rows_scrollbar.grid(row=1, column=1, sticky="ns", pady=(10, 0))
+        
+        # Drill-down controls
+        controls = ttk.Frame(frame)
+        controls.grid(row=2, column=0, pady=(10, 0), sticky="ew")
+        ttk.Button(controls, text="⬅️", width=3, command=lambda: self._channel_page(-1)).grid(row=0, column=0)
+        page_label = ttk.Label(controls, text="")
+        page_label.grid(row=0, column=1, padx=10)
+        ttk.Button(controls, text="➡️", width=3, command=lambda: self._channel_page(1)).grid(row=0, column=2)
+        forward_btn = ttk.Button(controls, text="📦 Reenviar pendientes del canal", state="disabled",
+                                 command=self._forward_channel)
+        forward_btn.grid(row=0, column=3, padx=(20, 0))
+        count_label = ttk.Label(controls, text="")
+        count_label.grid(row=0, column=4, padx=(20, 0))
+        
+        # Configure expansion
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(0, weight=1)
+        frame.rowconfigure(1, weight=2)
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(0, weight=1)
+        
+        self.channel_view = {
+            'window': window, 'tree': channel_tree, 'rows_tree': rows_tree, 'page_label': page_label,
+            'forward_btn': forward_btn, 'count_label': count_label,
+            'key': None, 'page': 0, 'sort': 'Pendientes', 'descending': True,
+        }
+        channel_tree.bind('<<TreeviewSelect>>', lambda _: self._select_channel())
+        rows_tree.bind('<Double-1>', lambda _: self._show_channel_row())
+        window.protocol("WM_DELETE_WINDOW", self.close_channel_view)
+        self.refresh_channel_view()
+    
+    def close_channel_view(self):
+        """Forget the channel window so events stop updating it"""
+        if self.channel_view is not None:
+            self.channel_view['window'].destroy()
+            self.channel_view = None
+    
+    def refresh_channel_view(self):
+        """Re-fill the channel list from the incremental aggregates, keeping the sort and selection"""
+        if self.channel_view is None:
+            return
+        view = self.channel_view
+        channel_tree = view['tree']
+        field = self.CHANNEL_SORT[view['sort']]
+        entries = sorted(self.functions.get_channel_summary(), key=lambda entry: entry[field],
+                         reverse=view['descending'])
+        channel_tree.delete(*channel_tree.get_children())
+        for entry in entries:
+            channel_tree.insert('', tk.END, iid=f"ch:{entry['key']}", values=format_channel_values(entry))
+        view['count_label'].config(text=f"{len(entries)} canales")
+        if view['key'] is not None and channel_tree.exists(f"ch:{view['key']}"):
+            channel_tree.selection_set(f"ch:{view['key']}")
+        self._render_channel_rows()
+    
+    def _sort_channels(self, column):
+        """Sort the channel list by a column (again on the same column flips the order)"""
+        view = self.channel_view
+        view['descending'] = not view['descending'] if view['sort'] == column else column != 'Canal'
+        view['sort'] = column
+        self.refresh_channel_view()
+    
+    def update_channel_view(self, indexes):
+        """Refresh only the channels of the rows whose status changed, and the drill-down page"""
+        if self.channel_view is None:
+            return
+        view = self.channel_view
+        channels = self.functions.data_manager.channels
+        keys = {self.functions.channel_of(index) for index in indexes}
+        for key in keys:
+            entry = channels.get(key) if key is not None else None
+            if entry is not None and view['tree'].exists(f"ch:{key}"):
+                view['tree'].item(f"ch:{key}", values=format_channel_values(entry))
+        if view['key'] in keys:
+            self._render_channel_rows()
+    
+    def _select_channel(self):
+        """Show the first page of the selected channel's rows"""
+        selection = self.channel_view['tree'].selection()
+        key = selection[0][len('ch:'):] if selection else None
+        if key != self.channel_view['key']:
+            self.channel_view['key'] = key
+            self.channel_view['page'] = 0
+            self._render_channel_rows()
+    
+    def _channel_page(self, step):
+        """Move the drill-down one page back or forward"""
+        view = self.channel_view
+        entry = self.functions.data_manager.channels.get(view['key']) if view['key'] is not None else None
+        if entry is None:
+            return
+        pages = (entry['total'] + self.CHANNEL_PAGE - 1) // self.CHANNEL_PAGE
+        page = min(max(view['page'] + step, 0), pages - 1)
+        if page != view['page']:
+            view['page'] = page
+            self._render_channel_rows()
+    
+    def _render_channel_rows(self):
+        """Fill the drill-down with the current page of the selected channel"""
+        view = self.channel_view
+        rows_tree = view['rows_tree']
+        rows_tree.delete(*rows_tree.get_children())
+        entry = self.functions.data_manager.channels.get(view['key']) if view['key'] is not None else None
+        if entry is None:
+            view['page_label'].config(text="")
+            view['forward_btn'].config(state="disabled")
+            return
+        for index, values, _ in self.functions.get_channel_rows(view['key'], view['page'], self.CHANNEL_PAGE):
+            rows_tree.insert('', tk.END, iid=str(index), values=(values[0], values[2], values[3], values[4]))
+        pages = (entry['total'] + self.CHANNEL_PAGE - 1) // self.CHANNEL_PAGE
+        view['page_label'].config(text=f"{entry['label']} · página {view['page'] + 1} de {pages}")
+        view['forward_btn'].config(state="normal" if entry['unprocessed'] else "disabled")
+    
+    def _show_channel_row(self):
+        """Jump the main table to the row double-clicked in the drill-down"""
+        selection = self.channel_view['rows_tree'].selection()
+        if not selection:
+            return
+        self.focus_index = int(selection[0])
+        page = self.focus_index // self.page_size
+        if page != self.current_page:
+            self.current_page = page
+            self.update_pagination()
+        self.load_current_page()
+        self.root.lift()
+    
+    def _forward_channel(self):
+        """Forward the pending rows of the selected channel"""
+        key = self.channel_view['key']
+        if key is not None:
+            self._start_batch_forward('channel_unprocessed', key)
     
     def exit_app(self):
         """Handle application exit"""
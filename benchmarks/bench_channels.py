@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Cost of the per-channel view kept by ChannelIndex.
+
+Loads synthetic rows (as bench_gui generates them, spread over --channels
+source channels) into a DataManager, then times:
+
+  load:      set_data with the aggregates built in the same pass
+  open:      the channel summary (what the 📊 window reads when it opens)
+  drill:     one page of a channel's rows
+  update:    status changes of --batch random rows, aggregates included
+  rescan:    the same summary computed by walking every row, for reference
+
+and checks that the incremental aggregates match the rescan after the
+updates.
+
+Usage:
+    python benchmarks/bench_channels.py --rows 100000 1000000 [--backend sqlite]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_gui import synthetic_rows  # noqa: E402
+from Functions import DataManager, SQLiteDataManager, channel_key, row_size_and_duration  # noqa: E402
+
+
+def rows_for(count, channels):
+    for item in synthetic_rows(count):
+        channel = 1000000000 + item['excel_row'] % channels
+        link = f"https://t.me/c/{channel}/{item['excel_row']}"
+        item['link'] = link
+        item['data'] = (link,) + tuple(item['data'][1:])
+        yield item
+
+
+def rescan(manager):
+    """Summary computed the naive way: one pass over every row"""
+    groups = defaultdict(lambda: {'total': 0, 'processed': 0, 'size_bytes': 0, 'duration': 0.0})
+    for index, item in manager.iter_indexed_selection('all'):
+        group = groups[channel_key(item)]
+        size_bytes, duration = row_size_and_duration(item)
+        group['total'] += 1
+        group['processed'] += manager.status[index]
+        group['size_bytes'] += size_bytes or 0
+        group['duration'] += duration or 0.0
+    return groups
+
+
+def timed(func, repeat=1):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def run(count, args):
+    manager = SQLiteDataManager(20) if args.backend == 'sqlite' else DataManager(20)
+    _, load = timed(lambda: manager.set_data(rows_for(count, args.channels)))
+    summary, opened = timed(manager.channels.summary, repeat=5)
+    busiest = max(summary, key=lambda entry: entry['total'])
+    _, drill = timed(lambda: manager.get_channel_page(busiest['key'], busiest['total'] // 200, 100), repeat=5)
+
+    generator = random.Random(count)
+    latencies = []
+    for round_number in range(args.updates):
+        indexes = generator.sample(range(count), args.batch)
+        started = time.perf_counter()
+        manager.update_status_many(indexes, round_number % 3 != 2)
+        latencies.append(time.perf_counter() - started)
+
+    expected, rescanned = timed(lambda: rescan(manager))
+    incremental = {entry['key']: {name: entry[name] for name in ('total', 'processed', 'size_bytes', 'duration')}
+                   for entry in manager.channels.summary()}
+    mismatches = sum(1 for key in set(expected) | set(incremental) if expected.get(key) != incremental.get(key))
+    latencies.sort()
+    print(f"rows: {count}  channels: {len(summary)}  backend: {args.backend}")
+    print(f"  load {load:.2f}s ({count / load:,.0f} rows/s, aggregates included)")
+    print(f"  open {opened * 1000:.2f}ms  drill-down page {drill * 1000:.2f}ms  "
+          f"rescan {rescanned * 1000:.0f}ms ({rescanned / opened:,.0f}x the open)")
+    print(f"  update {args.batch} rows: p50 {latencies[len(latencies) // 2] * 1000:.2f}ms  "
+          f"max {latencies[-1] * 1000:.2f}ms  mismatches {mismatches}")
+    manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--channels', type=int, default=300, help="Distinct source channels")
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='memory')
+    parser.add_argument('--batch', type=int, default=500, help="Rows per status update")
+    parser.add_argument('--updates', type=int, default=50, help="Status updates before the check")
+    args = parser.parse_args()
+    for count in args.rows:
+        run(count, args)
+
+
+if __name__ == '__main__':
+    main()
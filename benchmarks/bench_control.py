@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark of the local control API.
+
+Starts TelegramExcelFunctions with a ControlServer on a free localhost port
+(or a Unix socket with --unix), with benchmarks/fakebin first on PATH, and
+drives it with a local client:
+
+  1. submit: POST /forward in batches of --batch links, honouring 429 +
+     Retry-After when the operation queue holds --max-pending jobs
+  2. drain: follow GET /events until every job has finished
+  3. mark: POST /mark for all rows, in batches
+
+Usage:
+    FAKE_TDL_LATENCY=0.005 python benchmarks/bench_control.py --links 2000 --batch 500 --max-pending 300
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_gui import percentiles, synthetic_rows  # noqa: E402
+from Functions import TelegramExcelFunctions  # noqa: E402
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=60):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def connect(url):
+    if url.startswith('unix:'):
+        return UnixHTTPConnection(url[len('unix:'):])
+    host, port = url[len('http://'):].rsplit(':', 1)
+    return http.client.HTTPConnection(host, int(port), timeout=60)
+
+
+def request(connection, method, path, token, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    headers = {'Authorization': f"Bearer {token}"}
+    if data is not None:
+        headers['Content-Type'] = 'application/json'
+    connection.request(method, path, body=data, headers=headers)
+    response = connection.getresponse()
+    return response.status, dict(response.getheaders()), json.loads(response.read())
+
+
+def follow_events(url, token, counts, finished, stop):
+    """Count job_progress end states from the NDJSON event stream"""
+    connection = connect(url)
+    connection.request('GET', '/events?types=job_progress', headers={'Authorization': f"Bearer {token}"})
+    response = connection.getresponse()
+    while not stop.is_set():
+        line = response.readline()
+        if not line:
+            break
+        event = json.loads(line)
+        if event['type'] == 'heartbeat':
+            counts['dropped'] = event['dropped']
+            continue
+        state = event['payload']['state']
+        if state in ('done', 'failed'):
+            counts[state] = counts.get(state, 0) + 1
+            if counts.get('done', 0) + counts.get('failed', 0) >= counts['expected']:
+                finished.set()
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--links', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=500, help="Links per request")
+    parser.add_argument('--max-pending', type=int, default=300, help="Queue depth before 429")
+    parser.add_argument('--unix', action='store_true', help="Serve on a Unix socket instead of localhost TCP")
+    parser.add_argument('--verbose', action='store_true', help="Keep the per-job tdl output")
+    args = parser.parse_args()
+
+    state_dir = tempfile.mkdtemp(prefix='fake-tdl-')
+    os.environ['FAKE_TDL_STATE_DIR'] = state_dir
+    os.environ['PATH'] = os.path.join(HERE, 'fakebin') + os.pathsep + os.environ['PATH']
+
+    address = f"unix:{os.path.join(state_dir, 'control.sock')}" if args.unix else '127.0.0.1:0'
+    config = {'page_size': 20, 'target_chat': '1', 'data_number': 1, 'timeout_floor': 5,
+              'control_address': address, 'control_max_pending': args.max_pending}
+    functions = TelegramExcelFunctions(config)
+    rows = list(synthetic_rows(args.links, processed_every=args.links + 1))
+    functions.data_manager.set_data(rows)
+    links = [row['link'] for row in rows]
+    success, message = functions.start_control_server()
+    print(("✅ " if success else "❌ ") + message)
+    url = functions.control_server.url
+    token = functions.control_server.token
+
+    counts = {'expected': len(links)}
+    finished, stop = threading.Event(), threading.Event()
+    follower = threading.Thread(target=follow_events, args=(url, token, counts, finished, stop), daemon=True)
+    follower.start()
+    time.sleep(0.2)
+
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    connection = connect(url)
+    latencies, throttled, requests = [], 0.0, 0
+    with quiet:
+        started = time.monotonic()
+        position = 0
+        while position < len(links):
+            chunk = links[position:position + args.batch]
+            sent = time.monotonic()
+            status, headers, body = request(connection, 'POST', '/forward', token, {'links': chunk})
+            latencies.append(time.monotonic() - sent)
+            requests += 1
+            position += body['accepted']
+            if status == 429:
+                wait = float(headers.get('Retry-After', 1))
+                throttled += wait
+                time.sleep(wait)
+        submitted = time.monotonic() - started
+        finished.wait()
+        drained = time.monotonic() - started
+
+        _, _, status_body = request(connection, 'GET', '/status', token)
+        mark_started = time.monotonic()
+        request(connection, 'POST', '/mark', token, {'links': links, 'processed': False})
+        unmarked = time.monotonic() - mark_started
+        mark_started = time.monotonic()
+        for start in range(0, len(links), args.batch):
+            request(connection, 'POST', '/mark', token, {'links': links[start:start + args.batch], 'processed': True})
+        marked = time.monotonic() - mark_started
+    stop.set()
+    connection.close()
+
+    stats = percentiles(latencies)
+    print(f"transport: {'unix socket' if args.unix else 'localhost tcp'}  links: {len(links)}  "
+          f"batch: {args.batch}  max pending: {args.max_pending}")
+    print(f"submit: {requests} requests in {submitted:.1f}s ({len(links) / submitted:.0f} links/s accepted), "
+          f"throttled {throttled:.0f}s by 429  request p50 {stats['p50_ms']:.1f}ms p90 {stats['p90_ms']:.1f}ms")
+    print(f"drain: all jobs finished after {drained:.1f}s ({len(links) / drained * 60:.0f} jobs/min)  "
+          f"done {counts.get('done', 0)}  failed {counts.get('failed', 0)}  "
+          f"events dropped {counts.get('dropped', 0)}")
+    print(f"server view: jobs {status_body['jobs']}  rows {status_body['rows']}")
+    print(f"mark: {len(links)} rows unmarked in one request {unmarked * 1000:.0f}ms, "
+          f"re-marked in batches {marked * 1000:.0f}ms ({len(links) / marked:.0f} rows/s)")
+
+    functions.cleanup()
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Accuracy of the batch ETA projected by ThroughputEstimator.
+
+Forwards a selection of public links whose Size column varies, with
+benchmarks/fakebin first on PATH and FAKE_TDL_SIZES making each forward take
+size / FAKE_TDL_BYTES_PER_SEC on top of the per-call latency. The projected
+finish time is sampled when the run starts and after each job, and compared
+with the real finish. The naive projection (rows done per elapsed second)
+is shown for reference.
+
+The run is repeated --sessions times with the same estimator file, so the
+first session starts from the built-in prior and the next ones from the
+model persisted by the previous session.
+
+Usage:
+    python benchmarks/bench_eta.py --rows 40 --sessions 2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from Functions import TelegramExcelFunctions  # noqa: E402
+
+
+def make_rows(rows, seed, max_mb):
+    generator = random.Random(seed)
+    items, sizes = [], {}
+    for i in range(rows):
+        megabytes = generator.uniform(1, max_mb)
+        link = f"https://t.me/etabench{seed}/{i + 1}"
+        sizes[link] = int(megabytes * 1024 ** 2)
+        items.append({'excel_row': i + 2, 'link': link, 'is_clicked': False,
+                      'data': (link, 'mp4', '00:05:00', f"{megabytes:.1f} MB", f"video_{i}.mp4", "")})
+    return items, sizes
+
+
+def session(number, args, state_dir, estimator_path):
+    items, sizes = make_rows(args.rows, number, args.max_mb)
+    sizes_path = os.path.join(state_dir, f"sizes-{number}.json")
+    with open(sizes_path, 'w', encoding='utf-8') as handle:
+        json.dump(sizes, handle)
+    os.environ['FAKE_TDL_SIZES'] = sizes_path
+
+    config = {'page_size': 20, 'target_chat': '1', 'data_number': 1, 'timeout_floor': 30,
+              'estimator_path': estimator_path, 'stall_seconds': None}
+    functions = TelegramExcelFunctions(config)
+    functions.data_manager.set_data(items)
+
+    samples = []  # (fraction done, projected finish, naive finish)
+    started = time.time()
+
+    def report(number_done, total, batch, ok):
+        estimate = functions.eta_snapshot('forward')
+        now = time.time()
+        naive = now + (now - started) / number_done * (total - number_done)
+        samples.append((number_done / total, estimate['finish_at'], naive))
+
+    def sample_start():
+        while functions.eta_snapshot('forward') is None:
+            time.sleep(0.01)
+        samples.append((0.0, functions.eta_snapshot('forward')['finish_at'], None))
+
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        watcher = threading.Thread(target=sample_start, daemon=True)
+        watcher.start()
+        functions.forward_selection('unprocessed', progress_callback=report)
+        finished = time.time()
+    functions.cleanup()
+
+    duration = finished - started
+    print(f"session {number + 1}: {args.rows} forwards in {duration:.1f}s")
+    for checkpoint in (0.0, 0.1, 0.25, 0.5, 0.75):
+        fraction, projected, naive = next(sample for sample in samples if sample[0] >= checkpoint)
+        line = f"  at {fraction:4.0%} done: ETA error {abs(projected - finished) / duration:6.1%}"
+        if naive is not None:
+            line += f"   naive {abs(naive - finished) / duration:6.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=40)
+    parser.add_argument('--sessions', type=int, default=2)
+    parser.add_argument('--max-mb', type=float, default=40.0, help="Largest Size in the generated rows")
+    parser.add_argument('--verbose', action='store_true', help="Keep the per-job tdl output")
+    args = parser.parse_args()
+
+    state_dir = tempfile.mkdtemp(prefix='fake-tdl-')
+    os.environ['FAKE_TDL_STATE_DIR'] = state_dir
+    os.environ.setdefault('FAKE_TDL_BYTES_PER_SEC', str(20 * 1024 ** 2))
+    os.environ['PATH'] = os.path.join(HERE, 'fakebin') + os.pathsep + os.environ['PATH']
+    estimator_path = os.path.join(state_dir, 'throughput.json')
+    for number in range(args.sessions):
+        session(number, args, state_dir, estimator_path)
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Measure GUI event-to-idle latency under a virtual X display.
+
+Drives TelegramExcelGUI with synthetic rows (no sheet on disk) and times
+each scripted action from the call until the event bus is drained, no
+render pass is pending and Tk is idle. Results are reported as latency
+percentiles per action and saved as JSON tagged with --label, so runs of
+different rendering strategies can be compared with --compare.
+
+Usage:
+    python benchmarks/bench_gui.py [--rows 10000 100000 1000000] [--label NAME] [--json OUT]
+    python benchmarks/bench_gui.py --compare base.json other.json
+
+Needs a display: DISPLAY must point to one, or Xvfb must be on PATH so a
+virtual one can be started. Without either (or without tkinter) the
+benchmark prints why and is skipped with exit status 0; --compare works
+anywhere.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+ACTIONS = ('page_next', 'page_jump', 'click_mark', 'bulk_status', 'next_unprocessed',
+           'ready_open', 'ready_update')
+
+
+def skip_reason():
+    """Why the benchmark cannot run here, or None if it can"""
+    try:
+        import tkinter  # noqa: F401
+    except ImportError:
+        return "tkinter is not available"
+    if not os.environ.get('DISPLAY') and shutil.which('Xvfb') is None:
+        return "DISPLAY is not set and Xvfb is not on PATH"
+    return None
+
+
+def start_xvfb():
+    """Start Xvfb on a free display and return the process (None if DISPLAY is set)"""
+    if os.environ.get('DISPLAY'):
+        return None
+    for number in range(90, 200):
+        if os.path.exists(f"/tmp/.X{number}-lock"):
+            continue
+        process = subprocess.Popen(['Xvfb', f':{number}', '-screen', '0', '1600x1000x24', '-nolisten', 'tcp'],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                os.environ['DISPLAY'] = f':{number}'
+                return process
+            time.sleep(0.1)
+        process.terminate()
+    raise SystemExit("Could not start Xvfb")
+
+
+def synthetic_rows(count, processed_every=5):
+    for i in range(count):
+        yield {
+            'excel_row': i + 2,
+            'data': (f"https://t.me/c/{1000000000 + i % 50}/{i + 1}", 'mp4',
+                     f"00:{i % 60:02d}:{(i * 7) % 60:02d}", f"{(i % 2000) / 10:.1f} MB",
+                     f"video_{i}.mp4", f"Descripción {i}"),
+            'link': f"https://t.me/c/{1000000000 + i % 50}/{i + 1}",
+            'is_clicked': i % processed_every == 0,
+        }
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        'n': len(ordered),
+        'p50_ms': pick(0.50),
+        'p90_ms': pick(0.90),
+        'p99_ms': pick(0.99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+class GuiBench:
+    """Build a GUI around synthetic data and time scripted actions"""
+
+    def __init__(self, rows, backend, page_size):
+        from Functions import TelegramExcelFunctions
+        from GUI import TelegramExcelGUI
+
+        config = {'page_size': page_size, 'data_backend': backend, 'target_chat': '0', 'data_number': 1}
+        self.functions = TelegramExcelFunctions(config)
+        self.functions.data_manager.set_data(synthetic_rows(rows))
+        self.gui = TelegramExcelGUI(self.functions)
+        self.gui.root.geometry("1200x700")
+        self.rows = rows
+        self.random = random.Random(rows)
+        self.gui.load_current_page()
+        self.gui.update_pagination()
+        self.wait_idle()
+
+    def wait_idle(self):
+        """Pump Tk until the bus is empty, no render is pending and idle tasks ran"""
+        root = self.gui.root
+        while True:
+            root.update()
+            if not len(self.functions.events) and not self.gui.renderer.pending:
+                root.update_idletasks()
+                return
+
+    def timed(self, action):
+        started = time.perf_counter()
+        action()
+        self.wait_idle()
+        return time.perf_counter() - started
+
+    # Scripted actions
+    def page_next(self):
+        if self.gui.current_page >= self.gui.get_total_pages() - 1:
+            self.gui.current_page = 0
+        self.gui.next_page()
+
+    def page_jump(self):
+        self.gui.current_page = self.random.randrange(self.gui.get_total_pages())
+        self.gui.load_current_page()
+        self.gui.update_pagination()
+
+    def click_mark(self):
+        if self.gui.row_items:
+            item_id = self.random.choice(self.gui.row_items)
+            self.gui.tree.selection_set(item_id)
+            entry = self.gui.get_data_by_item(item_id)
+            self.functions.set_processed([entry['index']], not entry['is_clicked'])
+
+    def bulk_status(self):
+        start = self.gui.current_page * self.gui.page_size
+        processed = self.random.random() < 0.5
+        self.functions.set_processed_range(start, start + self.gui.page_size, processed)
+
+    def next_unprocessed(self):
+        self.gui.jump_to_next_unprocessed()
+
+    def ready_open(self):
+        self.gui.view_ready_links()
+
+    def ready_update(self):
+        if self.gui.ready_view is None:
+            self.gui.view_ready_links()
+            self.wait_idle()
+        index = self.random.randrange(self.rows)
+        self.functions.set_processed([index], not self.functions.is_processed(index))
+
+    def run(self, repeat):
+        results = {}
+        for name in ACTIONS:
+            samples = []
+            for _ in range(repeat if name != 'ready_open' else max(1, repeat // 10)):
+                samples.append(self.timed(getattr(self, name)))
+                if name == 'ready_open':
+                    self.gui.close_ready_view()
+                    self.wait_idle()
+            results[name] = percentiles(samples)
+        if self.gui.ready_view is not None:
+            self.gui.close_ready_view()
+        return results
+
+    def close(self):
+        self.gui.root.destroy()
+        self.functions.cleanup()
+
+
+def print_report(report):
+    print(f"label: {report['label']}  backend: {report['backend']}  page size: {report['page_size']}")
+    for rows, results in report['results'].items():
+        print(f"\n{int(rows):,} rows")
+        print(f"  {'action':<18}{'n':>5}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, stats in results.items():
+            print(f"  {name:<18}{stats['n']:>5}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}"
+                  f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+
+
+def compare(base_path, other_path):
+    with open(base_path, encoding='utf-8') as handle:
+        base = json.load(handle)
+    with open(other_path, encoding='utf-8') as handle:
+        other = json.load(handle)
+    print(f"{base['label']} -> {other['label']} (p50 / p99, ms)")
+    for rows, results in base['results'].items():
+        if rows not in other['results']:
+            continue
+        print(f"\n{int(rows):,} rows")
+        for name, stats in results.items():
+            new = other['results'][rows].get(name)
+            if new is None:
+                continue
+            print(f"  {name:<18}{stats['p50_ms']:>8.1f} -> {new['p50_ms']:<8.1f}"
+                  f"{stats['p99_ms']:>8.1f} -> {new['p99_ms']:<8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=100, help="Samples per action")
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='memory')
+    parser.add_argument('--label', default='current', help="Name of the rendering strategy under test")
+    parser.add_argument('--json', help="Write the report as JSON")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'OTHER'), help="Compare two JSON reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    reason = skip_reason()
+    if reason:
+        print(f"Skipping GUI benchmark: {reason}")
+        return
+
+    xvfb = start_xvfb()
+    try:
+        report = {'label': args.label, 'backend': args.backend, 'page_size': args.page_size, 'results': {}}
+        for rows in args.rows:
+            bench = GuiBench(rows, args.backend, args.page_size)
+            try:
+                report['results'][str(rows)] = bench.run(args.repeat)
+            finally:
+                bench.close()
+        print_report(report)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+
+if __name__ == '__main__':
+    main()
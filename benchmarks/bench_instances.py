@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Several instances forwarding the same sheet through a shared lease store.
+
+For each instance count, generates a sheet of public links (one tdl forward
+per row), then starts that many headless worker processes with
+benchmarks/fakebin first on PATH. Each worker loads the sheet, forwards the
+'unprocessed' selection with coordination enabled and waits until marks from
+the other instances have reached it. Afterwards the fake tdl call log and the
+saved sheet are checked:
+
+  duplicates: links forwarded successfully more than once
+  missing:    rows never forwarded
+  lost marks: forwarded rows that are not green in the sheet
+
+With --crash the first worker is killed (SIGKILL) part way through, so its
+leases have to expire and be reclaimed by the others.
+
+Usage:
+    python benchmarks/bench_instances.py --rows 600 --instances 1 2 4
+    python benchmarks/bench_instances.py --rows 600 --instances 3 --crash 2 --lease-seconds 3
+"""
+
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import openpyxl
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from generate_workbooks import HEADER  # noqa: E402
+from Functions import ExcelHandler, TelegramExcelFunctions  # noqa: E402
+
+
+def generate(path, rows):
+    """Sheet of public links, none processed"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(HEADER)
+    for i in range(rows):
+        sheet.append([f"https://t.me/benchchannel{i % 20}/{i + 1}", 'mp4', '00:01:00', '10 MB',
+                      f"video_{i}.mp4", f"Vídeo {i}"])
+    workbook.save(path)
+
+
+def worker(args):
+    """One instance: load, forward the pending rows, wait for everyone else's marks"""
+    config = {
+        'default_path': args.sheet, 'page_size': 20, 'target_chat': '1',
+        'data_number': args.worker + 1,  # one tdl account per operator
+        'timeout_floor': 5, 'coordination_store': args.store, 'instance_id': f"bench-{args.worker}",
+        'lease_seconds': args.lease_seconds, 'lease_block': args.lease_block, 'coordination_sync': 0.5,
+    }
+    functions = TelegramExcelFunctions(config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        functions.load_excel_file()
+        started = time.monotonic()
+        success, message = functions.forward_selection('unprocessed')
+        forwarded_at = time.monotonic()
+        total = functions.get_total_records()
+        while functions.get_status_counts()['processed'] < total and time.monotonic() - forwarded_at < 30:
+            time.sleep(0.1)
+        converged_at = time.monotonic()
+    stats = functions.coordinator.stats
+    functions.cleanup()
+    print(json.dumps({
+        'worker': args.worker, 'message': message, 'forward_seconds': forwarded_at - started,
+        'converge_seconds': converged_at - forwarded_at, 'claimed': stats['claimed'],
+        'denied': stats['denied'], 'reclaimed': stats['reclaimed'], 'received': stats['received'],
+        'lag_ms': stats['lag_seconds'] / stats['received'] * 1000 if stats['received'] else 0.0,
+    }))
+
+
+def run(rows, instances, args):
+    work_dir = tempfile.mkdtemp(prefix='bench-instances-')
+    sheet = os.path.join(work_dir, 'links.xlsx')
+    store = os.path.join(work_dir, 'leases.sqlite')
+    generate(sheet, rows)
+    env = dict(os.environ, FAKE_TDL_STATE_DIR=work_dir,
+               PATH=os.path.join(HERE, 'fakebin') + os.pathsep + os.environ['PATH'])
+    env.setdefault('FAKE_TDL_LATENCY', str(args.latency))
+
+    started = time.monotonic()
+    processes = [
+        subprocess.Popen([sys.executable, __file__, '--worker', str(number), '--sheet', sheet, '--store', store,
+                          '--lease-seconds', str(args.lease_seconds), '--lease-block', str(args.lease_block)],
+                         stdout=subprocess.PIPE, text=True, env=env)
+        for number in range(instances)
+    ]
+    if args.crash:
+        time.sleep(args.crash)
+        processes[0].send_signal(signal.SIGKILL)
+    reports = []
+    for process in processes:
+        output, _ = process.communicate()
+        if output.strip():
+            reports.append(json.loads(output.strip().splitlines()[-1]))
+    elapsed = time.monotonic() - started
+
+    forwards = collections.Counter()
+    with open(os.path.join(work_dir, 'calls.jsonl'), encoding='utf-8') as handle:
+        for line in handle:
+            call = json.loads(line)
+            if call.get('command') == 'forward' and call.get('outcome') == 'ok':
+                argv = call['argv']
+                forwards[argv[argv.index('--from') + 1]] += 1
+    handler = ExcelHandler(keep_workbook=False, fast_reader=True)
+    green = {item['link'] for item in handler.iter_records(sheet) if item['is_clicked']}
+
+    duplicates = sum(count - 1 for count in forwards.values() if count > 1)
+    missing = rows - len(forwards)
+    lost = len(set(forwards) - green)
+    print(f"instances: {instances}  rows: {rows}  wall {elapsed:.1f}s  "
+          f"{rows / elapsed * 60:.0f} rows/min  duplicates {duplicates}  missing {missing}  lost marks {lost}")
+    for report in sorted(reports, key=lambda report: report['worker']):
+        print(f"  bench-{report['worker']}: claimed {report['claimed']}  denied {report['denied']}  "
+              f"reclaimed {report['reclaimed']}  marks received {report['received']} "
+              f"(lag {report['lag_ms']:.0f}ms)  forward {report['forward_seconds']:.1f}s  "
+              f"converged +{report['converge_seconds']:.1f}s")
+    if args.crash:
+        print(f"  bench-0 killed after {args.crash:.1f}s")
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=600)
+    parser.add_argument('--instances', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--latency', type=float, default=0.05, help="FAKE_TDL_LATENCY when not set")
+    parser.add_argument('--lease-seconds', type=float, default=60)
+    parser.add_argument('--lease-block', type=int, default=20)
+    parser.add_argument('--crash', type=float, help="Kill the first instance after this many seconds")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--sheet', help=argparse.SUPPRESS)
+    parser.add_argument('--store', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        return worker(args)
+    for instances in args.instances:
+        run(args.rows, instances, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark of the forward job pipeline.
+
+Puts benchmarks/fakebin first on PATH and pushes thousands of synthetic rows
+through TelegramExcelFunctions, either one tdl call per link with a pool of
+worker threads (the Opt+Click path) or channel-grouped batches
+(forward_selection). The fake tdl is configured with the FAKE_TDL_*
+variables described in benchmarks/fakebin/fake_tdl.py.
+
+Usage:
+    FAKE_TDL_FAIL_RATE=0.1 FAKE_TDL_FAIL_MODES=direct \\
+        python benchmarks/bench_jobs.py --jobs 2000 --mode single --workers 4
+    python benchmarks/bench_jobs.py --jobs 5000 --mode batch
+    python benchmarks/bench_jobs.py --jobs 200 --mode mixed --policy sjf
+
+The mixed mode forwards a heavy-tailed selection (mostly small posts, a few
+multi-GB videos) through the operation queue while Opt+Click forwards arrive
+every --interactive-every seconds, and reports batch completion times and
+interactive latency. --no-lanes sends the interactive forwards through the
+batch lane to show what the priority lane buys.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_gui import percentiles, synthetic_rows  # noqa: E402
+from Functions import OperationQueue, TelegramExcelFunctions  # noqa: E402
+
+
+def summarize_calls(state_dir):
+    """tdl outcomes, forward modes and text fallbacks (the first clone --edit of each fallback chain)"""
+    path = os.path.join(state_dir, 'calls.jsonl')
+    outcomes, modes = Counter(), Counter()
+    fallbacks = 0
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                record = json.loads(line)
+                outcomes[record.get('outcome')] += 1
+                if record.get('command') == 'forward':
+                    modes[record.get('mode')] += 1
+                    fallbacks += '--edit' in record.get('argv', ())
+    return outcomes, modes, fallbacks
+
+
+def mixed_rows(count, interactive, seed=7):
+    """Public links (one tdl per post) with 5% of multi-GB videos; interactive rows come last, pre-marked"""
+    generator = random.Random(seed)
+    rows, sizes = [], {}
+    for i in range(count + interactive):
+        large = i < count and generator.random() < 0.05
+        size = generator.uniform(1024 ** 3, 4 * 1024 ** 3) if large else generator.uniform(1, 30) * 1024 ** 2
+        link = f"https://t.me/benchmix/{i + 1}"
+        sizes[link] = int(size)
+        rows.append({
+            'excel_row': i + 2,
+            'data': (link, 'mp4', '', f"{size / 1024 ** 2:.1f} MB", f"video_{i}.mp4", f"Descripción {i}"),
+            'link': link,
+            'is_clicked': i >= count,
+        })
+    return rows, sizes
+
+
+def run_mixed(args, functions, rows, count):
+    """Forward the batch selection while interactive forwards arrive; return the metrics"""
+    completions, latencies = [], []
+    started = time.monotonic()
+    finished = threading.Event()
+
+    def report(number, total, batch, ok):
+        completions.append(time.monotonic() - started)
+
+    def interactive():
+        index = count
+        while not finished.wait(args.interactive_every) and index < len(rows):
+            submitted = time.monotonic()
+            if args.no_lanes:
+                functions._submit_forward(rows[index]['link'], index, OperationQueue.BATCH).result()
+            else:
+                functions.forward_with_tdl(rows[index]['link'], index)
+            latencies.append(time.monotonic() - submitted)
+            index += 1
+
+    clicker = threading.Thread(target=interactive)
+    clicker.start()
+    success, message = functions.forward_selection('unprocessed', progress_callback=report)
+    finished.set()
+    clicker.join()
+    elapsed = time.monotonic() - started
+    print(("✅ " if success else "❌ ") + message)
+
+    window = min(args.window, elapsed)
+    early = sum(1 for seconds in completions if seconds <= window)
+    print(f"policy: {functions.operations.policy}  lanes: {not args.no_lanes}  jobs: {count}")
+    print(f"elapsed: {elapsed:.1f}s  completed jobs/min: {len(completions) / elapsed * 60:.0f}  "
+          f"first {window:.0f}s: {early / window * 60:.0f} jobs/min")
+    print(f"batch completion: mean {sum(completions) / len(completions):.1f}s  "
+          f"p50 {percentiles(completions)['p50_ms'] / 1000:.1f}s")
+    if latencies:
+        stats = percentiles(latencies)
+        print(f"interactive latency: n={stats['n']}  p50 {stats['p50_ms']:.0f}ms  "
+              f"p90 {stats['p90_ms']:.0f}ms  max {stats['max_ms']:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--jobs', type=int, default=1000)
+    parser.add_argument('--mode', choices=['single', 'batch', 'mixed'], default='single')
+    parser.add_argument('--workers', type=int, default=1, help="Concurrent single-link jobs")
+    parser.add_argument('--policy', choices=OperationQueue.POLICIES, default='sjf', help="Batch lane order")
+    parser.add_argument('--no-lanes', action='store_true', help="Mixed mode: interactive jobs use the batch lane")
+    parser.add_argument('--interactive-every', type=float, default=2.0, help="Mixed mode: seconds between clicks")
+    parser.add_argument('--window', type=float, default=30.0, help="Mixed mode: early throughput window")
+    args = parser.parse_args()
+
+    state_dir = tempfile.mkdtemp(prefix='fake-tdl-')
+    os.environ['FAKE_TDL_STATE_DIR'] = state_dir
+    os.environ['PATH'] = os.path.join(HERE, 'fakebin') + os.pathsep + os.environ['PATH']
+
+    config = {'page_size': 20, 'target_chat': '1', 'data_number': 1, 'timeout_floor': 5,
+              'queue_policy': args.policy}
+    functions = TelegramExcelFunctions(config)
+    if args.mode == 'mixed':
+        rows, sizes = mixed_rows(args.jobs, interactive=1000)
+        sizes_path = os.path.join(state_dir, 'sizes.json')
+        with open(sizes_path, 'w', encoding='utf-8') as handle:
+            json.dump(sizes, handle)
+        os.environ['FAKE_TDL_SIZES'] = sizes_path
+        os.environ.setdefault('FAKE_TDL_BYTES_PER_SEC', str(1024 ** 3))
+    else:
+        rows = list(synthetic_rows(args.jobs, processed_every=args.jobs + 1))
+    functions.data_manager.set_data(rows)
+    processed_before = functions.get_status_counts()['processed']
+
+    started = time.monotonic()
+    if args.mode == 'mixed':
+        run_mixed(args, functions, rows, args.jobs)
+        functions.cleanup()
+        shutil.rmtree(state_dir, ignore_errors=True)
+        return
+    if args.mode == 'batch':
+        attempted = args.jobs - processed_before
+        success, message = functions.forward_selection('unprocessed')
+        print(("✅ " if success else "❌ ") + message)
+        # Only rows marked during the run count; synthetic_rows pre-marks some
+        completed = functions.get_status_counts()['processed'] - processed_before
+    else:
+        def job(index):
+            return functions.forward_with_tdl(rows[index]['link'], index)
+
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(job, range(args.jobs)))
+        attempted, completed = len(results), sum(results)
+        print(f"{completed}/{len(results)} jobs succeeded")
+    elapsed = time.monotonic() - started
+
+    outcomes, modes, fallbacks = summarize_calls(state_dir)
+    print(f"mode: {args.mode}  workers: {args.workers}  jobs: {args.jobs}")
+    print(f"elapsed: {elapsed:.1f}s  completed jobs/min: {completed / elapsed * 60:.0f}")
+    print(f"tdl invocations: {sum(outcomes.values())}  outcomes: {dict(outcomes)}")
+    if modes:
+        print(f"forward modes: {dict(modes)}  fallback rate: {fallbacks / max(1, attempted):.1%} "
+              f"({fallbacks} of {attempted} links sent as text)")
+    print(f"adaptive timeouts fired: {len(functions.timeouts.kills)}")
+
+    functions.cleanup()
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Cost and round trip of saving processed marks into an xlsx.
+
+For each size, generates a workbook (benchmarks/generate_workbooks.py), then
+marks and unmarks --marks random rows twice: once with the zip patch
+(ExcelHandler with zip_saves, XlsxStylePatcher) and once with workbook.save.
+After every zip save the file is checked:
+
+  testzip:  every member of the archive passes its CRC check
+  fills:    reloaded with openpyxl, exactly the expected rows are green in A
+  values:   the cell values are the same as before the save
+
+Usage:
+    python benchmarks/bench_mark_saves.py --rows 10000 200000 [--marks 2 500]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+import openpyxl
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from generate_workbooks import excel_layout, generate  # noqa: E402
+from Functions import ExcelHandler  # noqa: E402
+
+GREEN = '90EE90'
+
+
+def snapshot(path):
+    """(values of every row, excel rows whose A cell is green) as openpyxl reads them"""
+    workbook = openpyxl.load_workbook(path)
+    try:
+        sheet = workbook.active
+        values = [tuple(cell.value for cell in row) for row in sheet.iter_rows()]
+        green = {row[0].row for row in sheet.iter_rows(min_row=2)
+                 if row[0].fill.fill_type == 'solid' and (row[0].fill.fgColor.rgb or '').upper().endswith(GREEN)}
+        return values, green
+    finally:
+        workbook.close()
+
+
+def save(path, rows, processed, zip_saves):
+    handler = ExcelHandler(zip_saves=zip_saves)
+    handler.load_file(path)
+    started = time.perf_counter()
+    if processed:
+        saved = handler.mark_rows_as_processed(rows)
+    else:
+        saved = handler.unmark_rows_as_processed(rows)
+    elapsed = time.perf_counter() - started
+    if not saved:
+        raise SystemExit(f"Saving marks failed for {path}")
+    return elapsed
+
+
+def run(count, marks, directory):
+    base = os.path.join(directory, f"marks-{count}.xlsx")
+    generate(base, count)
+    excel_layout(base, count)
+    values, green = snapshot(base)
+    generator = random.Random(count)
+    for size in marks:
+        rows = generator.sample(range(2, count + 2), min(size, count))
+        timings = {}
+        for zip_saves in (True, False):
+            path = os.path.join(directory, f"marks-{count}-{'zip' if zip_saves else 'openpyxl'}.xlsx")
+            shutil.copyfile(base, path)
+            expected = set(green)
+            for processed in (True, False):
+                elapsed = save(path, rows, processed, zip_saves)
+                timings.setdefault(zip_saves, []).append(elapsed)
+                expected = expected | set(rows) if processed else expected - set(rows)
+                if zip_saves:
+                    with zipfile.ZipFile(path) as archive:
+                        broken = archive.testzip()
+                    new_values, new_green = snapshot(path)
+                    problems = []
+                    if broken is not None:
+                        problems.append(f"testzip: {broken}")
+                    if new_green != expected:
+                        problems.append(f"fills: {len(new_green ^ expected)} rows differ")
+                    if new_values != values:
+                        problems.append("values changed")
+                    if problems:
+                        raise SystemExit(f"Round trip failed ({count} rows, {size} marks): {', '.join(problems)}")
+            os.remove(path)
+        zip_time, openpyxl_time = sum(timings[True]) / 2, sum(timings[False]) / 2
+        print(f"rows: {count}  marks: {len(rows)}  zip patch {zip_time:.2f}s  "
+              f"workbook.save {openpyxl_time:.2f}s  ({openpyxl_time / zip_time:.1f}x)  round trip OK")
+    os.remove(base)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 200000])
+    parser.add_argument('--marks', type=int, nargs='+', default=[2, 500], help="Rows marked per save")
+    parser.add_argument('--out', default=None, help="Working directory (default: a temporary one)")
+    args = parser.parse_args()
+    directory = args.out or tempfile.mkdtemp(prefix='bench-marks-')
+    os.makedirs(directory, exist_ok=True)
+    try:
+        for count in args.rows:
+            run(count, args.marks, directory)
+    finally:
+        if args.out is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
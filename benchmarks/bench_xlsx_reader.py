@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Compare the openpyxl reader with FastXlsxReader (sequential and parallel).
+
+The fast reader output is checked row for row against ExcelHandler.load_file
+(every column, excel_row and processed state) before timings are shown.
+
+Usage: python benchmarks/bench_xlsx_reader.py WORKBOOK [WORKBOOK ...] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from Functions import ExcelHandler, FastXlsxReader  # noqa: E402
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def normalize(record):
+    return record['excel_row'], tuple(record['data']), record['is_clicked']
+
+
+def compare(expected, actual, label):
+    if len(expected) != len(actual):
+        raise SystemExit(f"{label}: {len(actual)} rows, expected {len(expected)}")
+    for want, got in zip(expected, actual):
+        if normalize(want) != normalize(got):
+            raise SystemExit(f"{label}: mismatch at row {want['excel_row']}: {got} != {want}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('workbooks', nargs='+')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    for path in args.workbooks:
+        result, baseline = timed(lambda: ExcelHandler(keep_workbook=False).load_file(path))
+        expected = result['data']
+        print(f"{path}: {len(expected)} rows")
+        print(f"  openpyxl read-only   {baseline:8.2f}s")
+
+        sequential = FastXlsxReader(parallel=False)
+        rows, elapsed = timed(lambda: list(sequential.iter_records(path)))
+        compare(expected, rows, 'sequential')
+        print(f"  fast sequential      {elapsed:8.2f}s  x{baseline / elapsed:.1f}")
+
+        parallel = FastXlsxReader(workers=args.workers)
+        parallel.PARALLEL_MIN_BYTES = 0
+        rows, elapsed = timed(lambda: list(parallel.iter_records(path)))
+        compare(expected, rows, 'parallel')
+        print(f"  fast parallel ({args.workers:2d})   {elapsed:8.2f}s  x{baseline / elapsed:.1f}")
+
+
+if __name__ == '__main__':
+    main()
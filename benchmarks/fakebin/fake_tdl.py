@@ -0,0 +1,284 @@
+"""
+Offline stand-ins for the tdl and tlg binaries used by TelegramOperations.
+
+Put benchmarks/fakebin first on PATH to run the forward/download/upload
+pipeline without a Telegram account. Accepted command shapes:
+
+    tdl forward --storage type=bolt,path=P --from LINK|EXPORT.json|file://F --to CHAT --mode direct|clone [--edit T]
+    tdl dl --storage ... (-u URL ... | -f EXPORT.json) [-d DIR] [-t N] [-l N]
+    tdl up --storage ... -p PATH [-p PATH ...] -c CHAT [-t N] [-l N] [--rm]
+    tlg ACCOUNT LINK
+
+Behaviour is configured through environment variables:
+
+    FAKE_TDL_LATENCY        seconds per invocation, "x" or "min-max" (default 0.05)
+    FAKE_TDL_PER_ITEM       extra seconds per message / file (default 0.01)
+    FAKE_TDL_BYTES_PER_SEC  transfer rate for dl/up (default 50 MB/s)
+    FAKE_TDL_FILE_BYTES     size of each downloaded file (default 1 MB)
+    FAKE_TDL_FAIL_RATE      probability of a failed run (exit 1)
+    FAKE_TDL_FAIL_MODES     comma list limiting failures to forward modes / commands (e.g. "direct,dl")
+    FAKE_TDL_FLOOD_RATE     probability of a FLOOD_WAIT
+    FAKE_TDL_FLOOD_WAIT     seconds of the flood wait (default 5)
+    FAKE_TDL_FLOOD_MODE     "sleep" (wait and continue, like tdl) or "fail" (exit 1 after printing)
+    FAKE_TDL_HANG_RATE      probability of hanging until killed (exercises timeouts)
+    FAKE_TDL_STALL_RATE     probability of progress stopping half way while the process stays alive
+    FAKE_TDL_LOCK_TIMEOUT   seconds to wait for the bolt storage lock before failing (default 2)
+    FAKE_TDL_SIZES          JSON file {link: bytes}; forwarding a listed link takes bytes / BYTES_PER_SEC more
+    FAKE_TDL_STATE_DIR      lock files and invocation log (default /tmp/fake-tdl)
+    FAKE_TDL_SEED           seed for reproducible runs (mixed with the pid)
+
+Every invocation is appended to $FAKE_TDL_STATE_DIR/calls.jsonl with its
+arguments, outcome and timings.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+STATE_DIR = os.environ.get('FAKE_TDL_STATE_DIR', '/tmp/fake-tdl')
+
+
+def env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return float(default)
+
+
+def latency():
+    value = os.environ.get('FAKE_TDL_LATENCY', '0.05')
+    if '-' in value:
+        low, high = (float(part) for part in value.split('-', 1))
+        return RANDOM.uniform(low, high)
+    return float(value)
+
+
+seed = os.environ.get('FAKE_TDL_SEED')
+RANDOM = random.Random(f"{seed}-{os.getpid()}" if seed else None)
+
+
+def parse_options(argv):
+    """Split tdl style options into a dict of lists plus flags"""
+    options, flags = {}, set()
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg.startswith('-'):
+            name = arg.lstrip('-')
+            if '=' in name:
+                name, value = name.split('=', 1)
+                options.setdefault(name, []).append(value)
+            elif i + 1 < len(argv) and not argv[i + 1].startswith('-'):
+                options.setdefault(name, []).append(argv[i + 1])
+                i += 1
+            else:
+                flags.add(name)
+        i += 1
+    return options, flags
+
+
+def log_call(record):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(os.path.join(STATE_DIR, 'calls.jsonl'), 'a', encoding='utf-8') as handle:
+        handle.write(json.dumps(record) + '\n')
+
+
+def acquire_storage(storage):
+    """Hold an exclusive lock per storage path, like bolt does on its database file"""
+    path = storage.split('path=', 1)[-1] if storage else 'default'
+    os.makedirs(STATE_DIR, exist_ok=True)
+    lock_path = os.path.join(STATE_DIR, hashlib.sha1(path.encode()).hexdigest()[:16] + '.lock')
+    handle = open(lock_path, 'w')
+    deadline = time.monotonic() + env_float('FAKE_TDL_LOCK_TIMEOUT', 2)
+    while True:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return handle
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                handle.close()
+                return None
+            time.sleep(0.02)
+
+
+def count_messages(source):
+    """Messages referenced by a --from / -f value"""
+    path = source[len('file://'):] if source.startswith('file://') else source
+    if path.endswith('.json') and os.path.exists(path):
+        with open(path, encoding='utf-8') as handle:
+            return max(1, len(json.load(handle).get('messages', [])))
+    return 1
+
+
+def link_bytes(sources):
+    """Bytes of the --from links listed in $FAKE_TDL_SIZES"""
+    path = os.environ.get('FAKE_TDL_SIZES')
+    if not path:
+        return 0
+    with open(path, encoding='utf-8') as handle:
+        sizes = json.load(handle)
+    return sum(sizes.get(source, 0) for source in sources)
+
+
+def human(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.2f} {unit}"
+        size /= 1024
+
+
+def transfer(name, total_bytes, stall):
+    """Sleep for the simulated transfer, printing tdl-like progress lines"""
+    rate = env_float('FAKE_TDL_BYTES_PER_SEC', 50 * 1024 ** 2)
+    started = time.monotonic()
+    done = 0
+    step = max(1, total_bytes // 20)
+    while done < total_bytes:
+        if stall and done >= total_bytes // 2:
+            while True:  # progress stops; the caller's stall detector has to kill us
+                time.sleep(1)
+        chunk = min(step, total_bytes - done)
+        time.sleep(chunk / rate)
+        done += chunk
+        elapsed = time.monotonic() - started
+        speed = done / elapsed if elapsed else rate
+        eta = (total_bytes - done) / speed if speed else 0
+        print(f"{name} ... {done * 100 / total_bytes:.1f}% [{human(done)} in {elapsed:.1f}s; "
+              f"~ETA: {eta:.0f}s; {human(speed)}/s]", flush=True)
+
+
+def should_fail(kind):
+    modes = [mode for mode in os.environ.get('FAKE_TDL_FAIL_MODES', '').split(',') if mode]
+    if modes and kind not in modes:
+        return False
+    return RANDOM.random() < env_float('FAKE_TDL_FAIL_RATE', 0)
+
+
+def run_tdl(argv):
+    if not argv:
+        print("Usage: tdl [command]", file=sys.stderr)
+        return 1
+    command, rest = argv[0], argv[1:]
+    options, flags = parse_options(rest)
+    started = time.monotonic()
+    record = {'tool': 'tdl', 'command': command, 'argv': argv, 'pid': os.getpid(), 'start': time.time()}
+
+    def finish(code, outcome):
+        record.update(code=code, outcome=outcome, elapsed=time.monotonic() - started)
+        log_call(record)
+        return code
+
+    lock = acquire_storage((options.get('storage') or [''])[0])
+    if lock is None:
+        print("Error: open storage: timeout (database is locked by another tdl)", file=sys.stderr)
+        return finish(1, 'lock_timeout')
+    record['lock_wait'] = time.monotonic() - started
+
+    if RANDOM.random() < env_float('FAKE_TDL_HANG_RATE', 0):
+        record.update(outcome='hang')
+        log_call(record)
+        while True:
+            time.sleep(1)
+
+    if RANDOM.random() < env_float('FAKE_TDL_FLOOD_RATE', 0):
+        wait = env_float('FAKE_TDL_FLOOD_WAIT', 5)
+        print(f"rpc error code 420: FLOOD_WAIT ({int(wait)})", file=sys.stderr, flush=True)
+        if os.environ.get('FAKE_TDL_FLOOD_MODE', 'sleep') == 'fail':
+            return finish(1, 'flood_wait')
+        time.sleep(wait)
+        record['flood_wait'] = wait
+
+    per_item = env_float('FAKE_TDL_PER_ITEM', 0.01)
+    stall = RANDOM.random() < env_float('FAKE_TDL_STALL_RATE', 0)
+
+    if command == 'forward':
+        mode = (options.get('mode') or ['direct'])[0]
+        items = sum(count_messages(source) for source in options.get('from', []))
+        size = link_bytes(options.get('from', []))
+        record.update(mode=mode, items=items, bytes=size)
+        time.sleep(latency() + per_item * items + size / env_float('FAKE_TDL_BYTES_PER_SEC', 50 * 1024 ** 2))
+        if should_fail(mode):
+            print(f"Error: forward ({mode}) failed: CHAT_FORWARDS_RESTRICTED", file=sys.stderr)
+            return finish(1, 'failed')
+        print(f"Forwarded {items} message(s) to {(options.get('to') or ['?'])[0]}")
+        return finish(0, 'ok')
+
+    if command == 'dl':
+        sources = options.get('u', []) + options.get('url', [])
+        items = len(sources) + sum(count_messages(path) for path in options.get('f', []) + options.get('file', []))
+        directory = (options.get('d') or options.get('dir') or ['downloads'])[0]
+        size = int(env_float('FAKE_TDL_FILE_BYTES', 1024 ** 2))
+        record.update(items=items, bytes=items * size)
+        time.sleep(latency())
+        if should_fail('dl'):
+            print("Error: download failed: FILE_REFERENCE_EXPIRED", file=sys.stderr)
+            return finish(1, 'failed')
+        os.makedirs(directory, exist_ok=True)
+        for n in range(items):
+            name = f"fake-{os.getpid()}-{n}.mp4"
+            transfer(name, size, stall)
+            time.sleep(per_item)
+            with open(os.path.join(directory, name), 'wb') as handle:
+                handle.truncate(size)
+        return finish(0, 'ok')
+
+    if command in ('up', 'upload'):
+        paths = options.get('p', []) + options.get('path', [])
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)))
+            elif os.path.exists(path):
+                files.append(path)
+        record.update(items=len(files), bytes=sum(os.path.getsize(path) for path in files))
+        time.sleep(latency())
+        if not files:
+            print("Error: no files to upload", file=sys.stderr)
+            return finish(1, 'failed')
+        if should_fail('up'):
+            print("Error: upload failed: FILE_PARTS_INVALID", file=sys.stderr)
+            return finish(1, 'failed')
+        for path in files:
+            transfer(os.path.basename(path), max(1, os.path.getsize(path)), stall)
+            time.sleep(per_item)
+            if 'rm' in flags:
+                os.remove(path)
+        return finish(0, 'ok')
+
+    print(f"Error: unknown command \"{command}\" for \"tdl\"", file=sys.stderr)
+    return finish(1, 'unknown_command')
+
+
+def run_tlg(argv):
+    """tlg ACCOUNT LINK: download one link into $FAKE_TLG_DIR"""
+    started = time.monotonic()
+    if len(argv) < 2:
+        print("Usage: tlg ACCOUNT LINK", file=sys.stderr)
+        return 1
+    directory = os.environ.get('FAKE_TLG_DIR', os.path.join(STATE_DIR, 'tlg'))
+    size = int(env_float('FAKE_TDL_FILE_BYTES', 1024 ** 2))
+    time.sleep(latency())
+    code, outcome = 0, 'ok'
+    if should_fail('tlg'):
+        print("Error: download failed", file=sys.stderr)
+        code, outcome = 1, 'failed'
+    else:
+        os.makedirs(directory, exist_ok=True)
+        name = argv[1].rstrip('/').replace('/', '_').replace(':', '') + '.mp4'
+        transfer(name, size, False)
+        with open(os.path.join(directory, name), 'wb') as handle:
+            handle.truncate(size)
+    log_call({'tool': 'tlg', 'argv': argv, 'pid': os.getpid(), 'start': time.time(),
+              'code': code, 'outcome': outcome, 'elapsed': time.monotonic() - started})
+    return code
+
+
+def main(tool):
+    try:
+        sys.exit(run_tdl(sys.argv[1:]) if tool == 'tdl' else run_tlg(sys.argv[1:]))
+    except KeyboardInterrupt:
+        sys.exit(130)
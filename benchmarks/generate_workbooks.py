@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Generate benchmark workbooks with the same layout as the real link lists.
+
+Each sheet has a header row and the columns Link, Formato, Duration, Size,
+File and Text; every fifth row is marked green as already processed.
+
+openpyxl's write-only mode leaves out <dimension> and always writes text as
+inline strings, while Excel declares the dimension and keeps text in the
+shared strings table. The saved package is rewritten to the Excel layout
+(<dimension>, xl/sharedStrings.xml and t="s" cells) so the readers go through
+shared string resolution; --inline keeps the inline strings.
+
+Usage: python benchmarks/generate_workbooks.py [--rows 10000 100000 1000000] [--out DIR] [--inline]
+"""
+
+import argparse
+import codecs
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill
+
+HEADER = ('Link', 'Formato', 'Duration', 'Size', 'File', 'Text')
+SHEET = 'xl/worksheets/sheet1.xml'
+INLINE_CELL = re.compile(r'(<c r="[A-Z]+\d+"(?: s="\d+")?) t="inlineStr"><is><t>([^<]*)</t></is></c>')
+
+
+def generate(path, rows):
+    """Write a workbook with the given number of data rows"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    green = PatternFill(start_color='90EE90', end_color='90EE90', fill_type='solid')
+    sheet.append(HEADER)
+    for i in range(rows):
+        link = WriteOnlyCell(sheet, f"https://t.me/c/{1000000000 + i % 50}/{i + 1}")
+        if i % 5 == 0:
+            link.fill = green
+        sheet.append([
+            link,
+            'mp4' if i % 3 else 'mkv',
+            f"{i % 3:02d}:{i % 60:02d}:{(i * 7) % 60:02d}",
+            f"{(i % 2000) / 10:.1f} MB",
+            f"video_{i}.mp4",
+            f"Descripción del vídeo {i}",
+        ])
+    workbook.save(path)
+
+
+def excel_layout(path, rows, shared_strings=True):
+    """Add the sheet dimension and move its inline strings into a shared strings table, as Excel saves them"""
+    index = {}
+    dimension = f'<dimension ref="A1:F{rows + 1}" />'
+
+    def shared(match):
+        position = index.setdefault(match.group(2), len(index))
+        return f'{match.group(1)} t="s"><v>{position}</v></c>'
+
+    rewritten = path + '.tmp'
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(rewritten, 'w', zipfile.ZIP_DEFLATED) as target:
+        with source.open(SHEET) as reader, target.open(SHEET, 'w', force_zip64=True) as writer:
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            pending = ''
+            while True:
+                block = reader.read(1024 ** 2)
+                pending += decoder.decode(block, final=not block)
+                if dimension and '<sheetViews>' in pending:
+                    pending = pending.replace('<sheetViews>', dimension + '<sheetViews>', 1)
+                    dimension = None
+                # Only whole rows are rewritten; the rest waits for the next block
+                cut = len(pending) if not block else max(pending.rfind('</row>') + len('</row>'), 0)
+                chunk = INLINE_CELL.sub(shared, pending[:cut]) if shared_strings else pending[:cut]
+                writer.write(chunk.encode('utf-8'))
+                pending = pending[cut:]
+                if not block:
+                    break
+
+        for info in source.infolist():
+            if info.filename == SHEET:
+                continue
+            data = source.read(info)
+            if shared_strings and info.filename == '[Content_Types].xml':
+                data = data.replace(b'</Types>', b'<Override PartName="/xl/sharedStrings.xml" ContentType='
+                                    b'"application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+                                    b'</Types>')
+            elif shared_strings and info.filename == 'xl/_rels/workbook.xml.rels':
+                data = data.replace(b'</Relationships>', b'<Relationship Id="rIdShared" Target="sharedStrings.xml" '
+                                    b'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+                                    b'sharedStrings"/></Relationships>')
+            target.writestr(info, data)
+
+        if shared_strings:
+            with target.open('xl/sharedStrings.xml', 'w', force_zip64=True) as writer:
+                writer.write(f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                             f'count="{len(index)}" uniqueCount="{len(index)}">'.encode('utf-8'))
+                for text in index:
+                    writer.write(f'<si><t>{text}</t></si>'.encode('utf-8'))
+                writer.write(b'</sst>')
+    shutil.move(rewritten, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--out', default=os.path.join(tempfile.gettempdir(), 'telegram-excel-bench'))
+    parser.add_argument('--inline', action='store_true', help="Keep the text as inline strings")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for rows in args.rows:
+        path = os.path.join(args.out, f"links-{rows}.xlsx")
+        generate(path, rows)
+        excel_layout(path, rows, shared_strings=not args.inline)
+        print(f"{path}: {rows} rows, {os.path.getsize(path) / 1024 ** 2:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
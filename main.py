@@ -6,8 +6,10 @@ This module serves as the coordination layer between GUI and Functions modules.
 It handles application initialization, configuration, and the main execution flow.
 """
 
+import argparse
 import os
 import sys
+import time
 from pathlib import Path
 
 # Add the current directory to the Python path for relative imports
@@ -15,22 +17,77 @@ current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
 try:
-from GUI import TelegramExcelGUI
-from Functions import ExcelHandler, TelegramOperations, DataManager
+    from GUI import TelegramExcelGUI
+    from Functions import TelegramExcelFunctions, describe_eta, format_channel_values
 except ImportError as e:
     print(f"❌ Error importing modules: {e}")
     print("Please ensure GUI.py and Functions.py are in the same directory as Main.py")
     sys.exit(1)
 
+def parse_profile_phases(value):
+    """Split a comma separated list of profiled phases ('session', 'load', 'render', 'forward', 'all')"""
+    return [phase.strip() for phase in (value or '').split(',') if phase.strip()]
+
+def load_default_config():
+    """Load default application configuration"""
+    return {
+        'default_path': os.path.expanduser("~/Downloads/Porno/Descargar/CanalesUnidos"),
+        'page_size': 20,
+        'window_geometry': "1200x700",
+        'app_title': "Telegram Excel Viewer",
+        'target_chat': "2532518781",  # Default target chat for forwarding
+        'data_number': 1,  # Default tdl data number
+        'timeout_seconds': 60,  # Default timeout for operations
+        'timeout_floor': 15,  # Minimum adaptive timeout for tdl commands
+        'timeout_ceiling': 900,  # Maximum adaptive timeout for tdl commands
+        'batch_max_posts': 200,  # Posts per tdl invocation when forwarding by channel
+        'queue_workers': 2,  # Operation queue threads (one is kept free for interactive forwards)
+        'queue_policy': 'sjf',  # Batch lane order: 'sjf' (shortest estimated job first) or 'fifo' (sheet order)
+        'queue_aging': 1.0,  # Seconds of priority a queued batch job gains per second waited
+        'stall_seconds': 20,  # Kill a tdl transfer whose progress has not moved for this long (None disables)
+        'stall_retries': 2,  # Times a stalled job is rescheduled before it counts as failed
+        'data_backend': os.environ.get('TELEGRAM_EXCEL_BACKEND', 'memory'),  # 'memory' or 'sqlite' (out-of-core)
+        'data_store_path': None,  # SQLite file for the out-of-core backend (temporary if None)
+        'data_cache_rows': 4096,  # Rows kept in memory by the out-of-core backend
+        'fast_xlsx_reader': os.environ.get('TELEGRAM_EXCEL_FAST_XLSX') == '1',  # Parse xlsx XML directly
+        'xlsx_workers': None,  # Processes for parallel xlsx parsing (CPU count if None)
+        'xlsx_zip_saves': True,  # Save marks by patching the xlsx archive instead of re-saving the workbook
+        'profile_phases': parse_profile_phases(os.environ.get('TELEGRAM_EXCEL_PROFILE', '')),  # Profiled phases
+        'profile_dir': os.environ.get('TELEGRAM_EXCEL_PROFILE_DIR'),  # Profiling reports (./profile-<date> if None)
+        'export_outcome_columns': True,  # Add outcome/seconds/processed-at columns to xlsx exports
+        'transfer_dir': None,  # Staging folder for download/upload transfers (temporary if None)
+        'transfer_upload_account': None,  # tdl account for uploads (data_number if None; a second one overlaps fully)
+        'transfer_threads': 4,  # tdl -t: threads per transfer
+        'transfer_limit': 2,  # tdl -l: concurrent files per transfer
+        'transfer_disk_budget_mb': 2048,  # Downloaded-but-not-uploaded bytes allowed on disk
+        'transfer_remove': True,  # Delete files once uploaded (tdl up --rm)
+        'watch_directory': None,  # Folder watched for new sheets (default_path's folder if None)
+        'watch_on_start': False,  # Start the folder watcher when the GUI opens
+        'watch_debounce': 2.0,  # Seconds a new file must stay unchanged before it is ingested
+        'download_dir': None,  # Folder for downloads queued through the control API (~/Downloads/tdl if None)
+        'control_address': os.environ.get('TELEGRAM_EXCEL_CONTROL', '127.0.0.1:8765'),  # 'host:port' or 'unix:/path'
+        'control_on_start': False,  # Open the local control API when the GUI starts
+        'control_max_pending': 20000,  # Queued jobs above which the control API answers 429
+        'control_token': os.environ.get('TELEGRAM_EXCEL_CONTROL_TOKEN'),  # Required bearer token (random if None)
+        'coordination_store': os.environ.get('TELEGRAM_EXCEL_COORDINATION'),  # Shared SQLite for several instances
+        'instance_id': None,  # Name of this instance in the shared store ('host-pid' if None)
+        'lease_seconds': 60,  # How long a claimed row stays reserved without renewal
+        'lease_block': 100,  # Rows claimed at once while forwarding or transferring a selection
+        'coordination_sync': 1.0,  # Seconds between lease renewals/polls for other instances' marks
+        'estimator_path': os.path.expanduser("~/.telegram-excel/throughput.json"),  # Learned throughput model
+    }
+
 class TelegramExcelApplication:
     """
     Main application coordinator class.
     Manages the lifecycle and coordination between GUI and Functions modules.
     """
     
-    def __init__(self):
+    def __init__(self, args=None):
         """Initialize the application with default configuration"""
         self.config = self._load_default_config()
+        if args is not None:
+            apply_arguments(self.config, args)
         self.functions = None
         self.gui = None
         
@@ -39,15 +96,7 @@ class TelegramExcelApplication:
     
     def _load_default_config(self):
         """Load default application configuration"""
-        return {
-            'default_path': os.path.expanduser("~/Downloads/Porno/Descargar/CanalesUnidos"),
-            'page_size': 20,
-            'window_geometry': "1200x700",
-            'app_title': "Telegram Excel Viewer",
-            'target_chat': "2532518781",  # Default target chat for forwarding
-            'data_number': 1,  # Default tdl data number
-            'timeout_seconds': 60,  # Default timeout for operations
-        }
+        return load_default_config()
     
     def _initialize_components(self):
         """Initialize Functions and GUI components"""
@@ -82,7 +131,9 @@ class TelegramExcelApplication:
             os.makedirs(self.config['default_path'], exist_ok=True)
             
             # Start the GUI main loop
-            self.gui.run()
+            with self.functions.profiler.phase('session'):
+                self.gui.run()
+            self._cleanup()
             
         except KeyboardInterrupt:
             print("\n🔴 Application interrupted by user")
@@ -101,6 +152,198 @@ class TelegramExcelApplication:
         except Exception as e:
             print(f"⚠️ Warning during cleanup: {e}")
 
+SELECTIONS = ['ready', 'unprocessed', 'today', 'all', 'search', 'channel', 'channel_unprocessed']
+COORDINATION_STORE = '.telegram-excel-leases.sqlite'  # default shared store, next to the sheet
+
+def parse_arguments(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Telegram Excel Viewer")
+    parser.add_argument('--file', help="Sheet to load in headless mode")
+    parser.add_argument('--export-tdl', choices=SELECTIONS,
+                        help="Export a selection as tdl-export JSON without opening the GUI")
+    parser.add_argument('--export-xlsx', choices=SELECTIONS,
+                        help="Export a selection as a new xlsx (same columns and green fills) to --output")
+    parser.add_argument('--no-outcome-columns', action='store_true',
+                        help="Leave the outcome/timing columns out of --export-xlsx")
+    parser.add_argument('--forward', choices=SELECTIONS,
+                        help="Forward a selection grouped by source channel without opening the GUI")
+    parser.add_argument('--queue-policy', choices=['sjf', 'fifo'],
+                        help="Order of batch forwards: shortest estimated job first or sheet order")
+    parser.add_argument('--stall-seconds', type=float, metavar='SECONDS',
+                        help="Restart tdl transfers whose progress stops for this long (0 disables)")
+    parser.add_argument('--transfer', choices=SELECTIONS,
+                        help="Download a selection and re-upload it to the target chat, pipelined")
+    parser.add_argument('--disk-budget', type=int, metavar='MB',
+                        help="Disk space for downloaded files waiting to be uploaded")
+    parser.add_argument('--keep-files', action='store_true',
+                        help="Keep transferred files instead of deleting them after upload")
+    parser.add_argument('--query', help="Search text for --export-tdl/--forward/--transfer search, "
+                                        "or the channel (id or @username) for the channel selections")
+    parser.add_argument('--channels', action='store_true',
+                        help="Print rows, processed/pending counts, size and duration per source channel")
+    parser.add_argument('--output', help="Output path for exports (tdl-export.json / export.xlsx)")
+    parser.add_argument('--backend', choices=['memory', 'sqlite'],
+                        help="Dataset backend; 'sqlite' keeps rows on disk for very large sheets")
+    parser.add_argument('--profile', metavar='PHASES',
+                        help="Profile phases: comma list of session, load, render, forward or all")
+    parser.add_argument('--profile-dir', help="Directory for profiling reports")
+    parser.add_argument('--fast-xlsx', action='store_true',
+                        help="Read xlsx files with the fast streaming reader (columns A-F only)")
+    parser.add_argument('--xlsx-workers', type=int,
+                        help="Processes used by the fast reader for very large sheets")
+    parser.add_argument('--watch', nargs='?', const=True, metavar='DIR',
+                        help="Watch a folder (the default one if omitted) and ingest new sheets")
+    parser.add_argument('--control', nargs='?', const=True, metavar='ADDRESS',
+                        help="Open the local control API (host:port or unix:/path) alongside the GUI")
+    parser.add_argument('--serve', nargs='?', const=True, metavar='ADDRESS',
+                        help="Run only the local control API, without the GUI, until interrupted")
+    parser.add_argument('--coordinate', nargs='?', const=True, metavar='STORE',
+                        help="Share the sheet with other instances through a SQLite store "
+                             "(next to the sheet if omitted)")
+    parser.add_argument('--instance-id', help="Name of this instance in the coordination store")
+    return parser.parse_args(argv)
+
+def apply_arguments(config, args):
+    """Apply command line overrides to the configuration"""
+    if args.backend:
+        config['data_backend'] = args.backend
+    if args.profile:
+        config['profile_phases'] = parse_profile_phases(args.profile)
+    if args.profile_dir:
+        config['profile_dir'] = args.profile_dir
+    if args.fast_xlsx:
+        config['fast_xlsx_reader'] = True
+    if args.xlsx_workers:
+        config['xlsx_workers'] = args.xlsx_workers
+    if args.queue_policy:
+        config['queue_policy'] = args.queue_policy
+    if args.stall_seconds is not None:
+        config['stall_seconds'] = args.stall_seconds or None
+    if args.disk_budget:
+        config['transfer_disk_budget_mb'] = args.disk_budget
+    if args.keep_files:
+        config['transfer_remove'] = False
+    if args.watch:
+        config['watch_on_start'] = True
+        if args.watch is not True:
+            config['watch_directory'] = os.path.expanduser(args.watch)
+    for address in (args.control, args.serve):
+        if address:
+            config['control_on_start'] = True
+            if address is not True:
+                config['control_address'] = address
+    if args.file:
+        config['default_path'] = os.path.expanduser(args.file)
+    if args.coordinate:
+        if args.coordinate is True:
+            sheet = config['default_path']
+            folder = sheet if os.path.isdir(sheet) else os.path.dirname(sheet)
+            config['coordination_store'] = os.path.join(folder, COORDINATION_STORE)
+        else:
+            config['coordination_store'] = os.path.expanduser(args.coordinate)
+    if args.instance_id:
+        config['instance_id'] = args.instance_id
+
+def run_headless(args):
+    """
+    Run a one-shot operation without the GUI
+    
+    Returns:
+        Process exit code
+    """
+    config = load_default_config()
+    apply_arguments(config, args)
+    functions = TelegramExcelFunctions(config)
+    with functions.profiler.phase('session'):
+        success = _run_headless_steps(functions, args)
+    functions.cleanup()
+    return 0 if success else 1
+
+def _run_headless_steps(functions, args):
+    """Load the sheet and run the requested headless operations"""
+    success, message = functions.load_excel_file()
+    print(("✅ " if success else "❌ ") + message)
+    if args.serve:
+        # Links sent by other tools do not need to be in the sheet
+        return serve_control_api(functions)
+    if not success:
+        return False
+    
+    succeeded = True
+    if args.channels:
+        print_channel_summary(functions)
+    
+    if args.forward:
+        def report(number, total, batch, ok):
+            state = "✅" if ok else "❌"
+            print(f"  {state} [{number}/{total}] {batch['channel'] or 'link'}: {len(batch['items'])} posts"
+                  + eta_suffix(functions, 'forward'))
+        
+        success, message = functions.forward_selection(args.forward, args.query, report)
+        print(("✅ " if success else "❌ ") + message)
+        succeeded = succeeded and success
+    
+    if args.transfer:
+        def report_transfer(index, item, stage, ok):
+            state = "✅" if ok else "❌"
+            print(f"  {state} {'⬇️' if stage == 'dl' else '⬆️'} {item['link']}" + eta_suffix(functions, 'transfer'))
+        
+        success, message = functions.transfer_selection(args.transfer, args.query, report_transfer)
+        print(("✅ " if success else "❌ ") + message)
+        succeeded = succeeded and success
+    
+    # Exports run last so they include the rows marked by --forward / --transfer
+    if args.export_tdl:
+        output = args.output or "tdl-export.json"
+        success, message, paths = functions.export_tdl_json(output, args.export_tdl, args.query)
+        print(("✅ " if success else "❌ ") + message)
+        succeeded = succeeded and success
+        for path in paths:
+            print(f"  {path}")
+    
+    if args.export_xlsx:
+        output = args.output or "export.xlsx"
+        success, message = functions.export_xlsx(output, args.export_xlsx, args.query,
+                                                 outcome_columns=not args.no_outcome_columns)
+        print(("✅ " if success else "❌ ") + message)
+        succeeded = succeeded and success
+    
+    if functions.coordinator is not None:
+        stats = functions.coordinator.stats
+        print(f"🔒 {functions.coordinator.instance_id}: {stats['claimed']} rows claimed, "
+              f"{stats['denied']} held or done elsewhere, {stats['reclaimed']} reclaimed, "
+              f"{stats['received']} marks received")
+    return succeeded
+
+def print_channel_summary(functions):
+    """Print the per-channel aggregates, most pending rows first"""
+    entries = sorted(functions.get_channel_summary(), key=lambda entry: entry['unprocessed'], reverse=True)
+    print(f"📊 {len(entries)} channels")
+    print(f"  {'channel':<28} {'rows':>9} {'done':>9} {'pending':>9} {'size':>10} {'duration':>10}")
+    for entry in entries:
+        label, total, processed, unprocessed, size, duration = format_channel_values(entry)
+        print(f"  {label:<28} {total:>9} {processed:>9} {unprocessed:>9} {size:>10} {duration:>10}")
+
+def eta_suffix(functions, label):
+    """Rows left and projected finish of a running batch operation, for the progress lines"""
+    estimate = functions.eta_snapshot(label)
+    if estimate is None:
+        return ""
+    return f"  ({estimate['total'] - estimate['done']} left, {describe_eta(estimate)})"
+
+def serve_control_api(functions):
+    """Run the control API until interrupted"""
+    success, message = functions.start_control_server()
+    print(("✅ " if success else "❌ ") + message)
+    if not success:
+        return False
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n🔴 Control server stopped")
+    return True
+
 def main():
     """
     Main entry point for the application.
@@ -108,9 +351,13 @@ def main():
     This function creates and runs the TelegramExcelApplication instance.
     It also handles any top-level exceptions and provides user-friendly error messages.
     """
+    args = parse_arguments()
     try:
+        if args.export_tdl or args.export_xlsx or args.forward or args.transfer or args.serve or args.channels:
+            sys.exit(run_headless(args))
+        
         # Create and run the application
-        app = TelegramExcelApplication()
+        app = TelegramExcelApplication(args)
         app.run()
         
     except ImportError as e: